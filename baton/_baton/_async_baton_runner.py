@@ -0,0 +1,113 @@
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import time
+from abc import ABCMeta
+from datetime import timedelta
+from typing import Any, List, Dict
+
+from baton._baton._baton_runner import BatonRunner, BatonBinary
+
+_logger = logging.getLogger(__name__)
+
+
+class AsyncBatonRunner(metaclass=ABCMeta):
+    """
+    Baton query runner that runs baton using asyncio subprocesses, without blocking the event loop.
+    """
+    def __init__(self, baton_binaries_directory: str, skip_baton_binaries_validation: bool=False,
+                 timeout_queries_after: timedelta=None, semaphore: asyncio.Semaphore=None):
+        """
+        Constructor.
+        :param baton_binaries_directory: the host of baton's binaries
+        :param skip_baton_binaries_validation: skips validation of baton binaries (intending for testing only)
+        :param timeout_queries_after: time after which queries should be timed out
+        :param semaphore: semaphore, which may be shared with other runners, that limits the number of baton queries
+        that can run concurrently (`None` if unlimited)
+        """
+        if not skip_baton_binaries_validation:
+            exception = BatonRunner.validate_baton_binaries_location(baton_binaries_directory)
+            if exception is not None:
+                raise exception
+
+        self._baton_binaries_directory = baton_binaries_directory
+        self.timeout_queries_after = timeout_queries_after
+        self._semaphore = semaphore
+
+    async def run_baton_query(self, baton_binary: BatonBinary, program_arguments: List[str]=None,
+                              input_data: Any=None) -> List[Dict]:
+        """
+        Runs a baton query.
+
+        If the coroutine is cancelled, the baton process is killed.
+        :param baton_binary: the baton binary to use
+        :param program_arguments: arguments to give to the baton binary
+        :param input_data: input data to the baton binary
+        :return: parsed serialization returned by baton
+        """
+        if program_arguments is None:
+            program_arguments = []
+
+        baton_binary_location = os.path.join(self._baton_binaries_directory, baton_binary.value)
+        program_arguments = [baton_binary_location] + program_arguments
+
+        if self._semaphore is not None:
+            await self._semaphore.acquire()
+        try:
+            _logger.info("Running baton command: '%s' with data '%s'" % (program_arguments, input_data))
+            start_at = time.monotonic()
+            baton_out = await self._run_command(program_arguments, input_data=input_data)
+            time_taken_to_run_query = time.monotonic() - start_at
+        finally:
+            if self._semaphore is not None:
+                self._semaphore.release()
+        _logger.debug("baton output (took %s seconds, wall time): %s" % (time_taken_to_run_query, baton_out))
+
+        return BatonRunner._parse_baton_out(baton_out)
+
+    async def _run_command(self, arguments: List[str], input_data: Any=None, output_encoding: str="utf-8") -> str:
+        """
+        Run a command as an asyncio subprocess.
+
+        Ignores errors given over stderr if there is output on stdout (see `BatonRunner._run_command`).
+        :param arguments: the arguments to run
+        :param input_data: the input data to pass to the subprocess
+        :param output_encoding: optional specification of the output encoding to expect
+        :return: the process' standard out
+        """
+        input_data = b"".join(str.encode(json.dumps(to_write)) for to_write in BatonRunner._input_items(input_data))
+
+        process = await asyncio.create_subprocess_exec(
+            *arguments, stdout=subprocess.PIPE, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+        timeout_in_seconds = self.timeout_queries_after.total_seconds() if self.timeout_queries_after is not None \
+            else None
+        try:
+            out, error = await asyncio.wait_for(process.communicate(input=input_data), timeout_in_seconds)
+        except asyncio.TimeoutError:
+            await AsyncBatonRunner._kill(process)
+            raise subprocess.TimeoutExpired(arguments, timeout_in_seconds)
+        except BaseException:
+            # Includes cancellation of the coroutine
+            await AsyncBatonRunner._kill(process)
+            raise
+
+        if len(out) == 0 and len(error) > 0:
+            raise RuntimeError(error)
+
+        return out.decode(output_encoding).rstrip()
+
+    @staticmethod
+    async def _kill(process: asyncio.subprocess.Process):
+        """
+        Kills the given process, if it is still running, and waits for it to exit.
+        :param process: the process to kill
+        """
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+        await process.wait()
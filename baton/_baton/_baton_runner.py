@@ -1,16 +1,24 @@
+import codecs
 import json
 import logging
 import os
+import select
 import subprocess
 import time
 from abc import ABCMeta
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import timedelta
 from enum import Enum
-from typing import Any, List, Dict, Optional
+from queue import Full
+from threading import Condition, Thread
+from typing import Any, List, Dict, Optional, Tuple, Iterator, Iterable, Sequence, Callable
 
 from baton._baton._constants import BATON_ERROR_MESSAGE_KEY, IRODS_ERROR_USER_FILE_DOES_NOT_EXIST, BATON_ERROR_PROPERTY,\
     BATON_ERROR_CODE_KEY, IRODS_ERROR_CATALOG_ALREADY_HAS_ITEM_BY_THAT_NAME, IRODS_ERROR_CAT_SUCCESS_BUT_WITH_NO_INFO, \
     IRODS_ERROR_CAT_INVALID_ARGUMENT
+from baton.models import BatchResult
 
 _logger = logging.getLogger(__name__)
 
@@ -28,6 +36,287 @@ class BatonBinary(Enum):
     BATON_CHMOD = "baton-chmod"
 
 
+# baton binaries that can be kept open and sent one request at a time (each request gets exactly one line of output)
+PERSISTENT_WORKER_BATON_BINARIES = {BatonBinary.BATON_LIST, BatonBinary.BATON_METAQUERY, BatonBinary.BATON_METAMOD}
+
+# Flag that makes baton flush its output after each request has been processed
+BATON_UNBUFFERED_FLAG = "--unbuffered"
+
+
+class BatonWorker:
+    """
+    Long-lived baton process that is sent one JSON document per request over stdin and replies to each request with a
+    line of JSON over stdout, in the same order as the requests were made.
+    """
+    _READ_SIZE = 65536
+    _STANDARD_ERROR_LINES_KEPT = 20
+
+    def __init__(self, arguments: List[str], max_requests: int=None):
+        """
+        Constructor.
+        :param arguments: the arguments used to start the baton process (including the location of the binary)
+        :param max_requests: number of requests after which the worker should be recycled (`None` if never)
+        """
+        self.arguments = arguments
+        self.max_requests = max_requests
+        self.requests_served = 0
+        self._buffer = b""
+        self._standard_error = deque(maxlen=BatonWorker._STANDARD_ERROR_LINES_KEPT)
+        self._process = subprocess.Popen(arguments, stdout=subprocess.PIPE, stdin=subprocess.PIPE,
+                                         stderr=subprocess.PIPE, bufsize=0)
+        # stderr must be drained else baton will block once the pipe's buffer fills
+        self._standard_error_reader = Thread(target=self._read_standard_error, daemon=True)
+        self._standard_error_reader.start()
+
+    def is_healthy(self) -> bool:
+        """
+        Gets whether the worker can be used to process another request.
+        :return: whether the worker is usable
+        """
+        if self._process.poll() is not None:
+            return False
+        return self.max_requests is None or self.requests_served < self.max_requests
+
+    def query(self, input_data: Any, timeout: float=None) -> Any:
+        """
+        Sends a single request to the baton process and waits for the reply.
+
+        A `RuntimeError` is raised if the baton process dies whilst handling the request and a
+        `subprocess.TimeoutExpired` if no reply is received within the given timeout. In both cases, the worker is
+        stopped and cannot be used further.
+        :param input_data: the (JSON serializable) request
+        :param timeout: the maximum number of seconds to wait for the reply (`None` if there is no limit)
+        :return: the parsed JSON reply
+        """
+        try:
+            self._process.stdin.write(str.encode("%s\n" % json.dumps(input_data)))
+            self._process.stdin.flush()
+        except (BrokenPipeError, ValueError) as e:
+            self.stop()
+            raise RuntimeError("baton worker %s died: %s" % (self.arguments, self._get_standard_error())) from e
+
+        line = self._read_line(timeout)
+        self.requests_served += 1
+        return json.loads(line.decode("utf-8"))
+
+    def stop(self):
+        """
+        Stops the worker's baton process.
+        """
+        try:
+            self._process.stdin.close()
+        except BrokenPipeError:
+            pass
+        try:
+            self._process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+        self._process.stdout.close()
+
+    def _read_line(self, timeout: Optional[float]) -> bytes:
+        """
+        Reads a line from the baton process' standard out, waiting at most the given timeout.
+        :param timeout: the maximum number of seconds to wait for the line (`None` if there is no limit)
+        :return: the line without the trailing new line character
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        file_descriptor = self._process.stdout.fileno()
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.monotonic() if deadline is not None else None
+            if remaining is not None and remaining <= 0:
+                self.stop()
+                raise subprocess.TimeoutExpired(self.arguments, timeout)
+            readable, _, _ = select.select([file_descriptor], [], [], remaining)
+            if len(readable) == 0:
+                continue
+            chunk = os.read(file_descriptor, BatonWorker._READ_SIZE)
+            if len(chunk) == 0:
+                self.stop()
+                raise RuntimeError("baton worker %s died: %s" % (self.arguments, self._get_standard_error()))
+            self._buffer += chunk
+
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return line
+
+    def _read_standard_error(self):
+        """
+        Keeps the last lines written to standard error by the baton process.
+        """
+        for line in self._process.stderr:
+            self._standard_error.append(line.decode("utf-8", "replace").rstrip())
+        self._process.stderr.close()
+
+    def _get_standard_error(self) -> str:
+        """
+        Gets the last lines that the baton process wrote to standard error.
+        :return: the lines, joined with new line characters
+        """
+        return "\n".join(self._standard_error)
+
+
+class BatonExecutor:
+    """
+    Executes baton queries one at a time, keeping any persistent workers that it starts for use in later queries.
+    """
+    def __init__(self):
+        self._workers = dict()     # type: Dict[Tuple[str, ...], BatonWorker]
+
+    def get_worker(self, arguments: List[str], max_requests: int=None) -> BatonWorker:
+        """
+        Gets a healthy persistent worker that runs baton with the given arguments, recycling the existing worker if it
+        has crashed or has served its maximum number of requests.
+        :param arguments: the arguments to run baton with (including the location of the binary)
+        :param max_requests: number of requests after which a newly started worker should be recycled
+        :return: the worker
+        """
+        key = tuple(arguments)
+        worker = self._workers.get(key)
+        if worker is not None and not worker.is_healthy():
+            _logger.info("Recycling baton worker %s after %d requests" % (arguments, worker.requests_served))
+            worker.stop()
+            worker = None
+        if worker is None:
+            worker = BatonWorker(arguments + [BATON_UNBUFFERED_FLAG], max_requests)
+            self._workers[key] = worker
+        return worker
+
+    def close(self):
+        """
+        Stops all of the persistent workers that the executor has started.
+        """
+        for worker in self._workers.values():
+            worker.stop()
+        self._workers.clear()
+
+
+class BatonExecutorPool:
+    """
+    Pool of baton executors that limits the number of baton queries that run concurrently. Callers wanting an executor
+    are queued and served in the order in which they arrived.
+    """
+    def __init__(self, size: int=None, max_waiting: int=None, max_wait_time: timedelta=None):
+        """
+        Constructor.
+        :param size: the maximum number of baton queries that can run concurrently (`None` if unlimited)
+        :param max_waiting: the maximum number of callers that can be queued waiting for an executor (`None` if
+        unlimited). A `queue.Full` exception is raised when an executor is requested whilst the queue is full
+        :param max_wait_time: the maximum time a caller waits for an executor before a `TimeoutError` is raised (`None`
+        if no limit)
+        """
+        if size is not None and size < 1:
+            raise ValueError("Pool size must be at least 1: %d given" % size)
+        self.size = size
+        self.max_waiting = max_waiting
+        self.max_wait_time = max_wait_time
+        self._idle = []    # type: List[BatonExecutor]
+        self._active = 0
+        self._waiting = deque()
+        self._condition = Condition()
+        self._closed = False
+
+    @property
+    def active(self) -> int:
+        """
+        Gets the number of executors that are currently in use.
+        :return: the number of executors in use
+        """
+        return self._active
+
+    @property
+    def waiting(self) -> int:
+        """
+        Gets the number of callers that are queued waiting for an executor.
+        :return: the number of queued callers
+        """
+        return len(self._waiting)
+
+    @contextmanager
+    def executor(self) -> Iterator[BatonExecutor]:
+        """
+        Context manager that provides exclusive use of an executor from the pool.
+        :return: the executor
+        """
+        executor = self._acquire()
+        try:
+            yield executor
+        finally:
+            self._release(executor)
+
+    def close(self):
+        """
+        Stops the persistent workers of all executors in the pool. Executors in use are closed when they are returned.
+        """
+        with self._condition:
+            self._closed = True
+            idle = self._idle
+            self._idle = []
+        for executor in idle:
+            executor.close()
+
+    def _acquire(self) -> BatonExecutor:
+        """
+        Waits for an executor to become available then takes it from the pool.
+        :return: the executor
+        """
+        timeout = self.max_wait_time.total_seconds() if self.max_wait_time is not None else None
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        with self._condition:
+            if len(self._waiting) == 0 and self._has_capacity():
+                return self._take()
+            if self.max_waiting is not None and len(self._waiting) >= self.max_waiting:
+                raise Full("%d callers are already waiting for a baton executor" % len(self._waiting))
+
+            ticket = object()
+            self._waiting.append(ticket)
+            try:
+                while self._waiting[0] is not ticket or not self._has_capacity():
+                    remaining = deadline - time.monotonic() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("Timed out after waiting %s for a baton executor" % self.max_wait_time)
+                    self._condition.wait(remaining)
+                self._waiting.popleft()
+                return self._take()
+            except BaseException:
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                raise
+            finally:
+                # The next caller in the queue may now be able to proceed
+                self._condition.notify_all()
+
+    def _release(self, executor: BatonExecutor):
+        """
+        Returns the given executor to the pool.
+        :param executor: the executor to return
+        """
+        with self._condition:
+            self._active -= 1
+            if not self._closed:
+                self._idle.append(executor)
+            self._condition.notify_all()
+        if self._closed:
+            executor.close()
+
+    def _has_capacity(self) -> bool:
+        """
+        Gets whether another executor can be taken from the pool. Must be called whilst holding the pool's condition.
+        :return: whether an executor can be taken
+        """
+        return self.size is None or self._active < self.size
+
+    def _take(self) -> BatonExecutor:
+        """
+        Takes an executor from the pool, creating a new one if there are no idle executors. Must be called whilst
+        holding the pool's condition.
+        :return: the executor
+        """
+        self._active += 1
+        # Most recently used executors are the most likely to have running workers
+        return self._idle.pop() if len(self._idle) > 0 else BatonExecutor()
+
+
 class BatonRunner(metaclass=ABCMeta):
     """
     Baton query runner.
@@ -62,29 +351,171 @@ class BatonRunner(metaclass=ABCMeta):
             baton_out_as_json = [baton_out_as_json]
 
         for baton_item_as_json in baton_out_as_json:
-            if BATON_ERROR_PROPERTY in baton_item_as_json:
-                error = baton_item_as_json[BATON_ERROR_PROPERTY]
-                error_message = error[BATON_ERROR_MESSAGE_KEY]
-                error_code = error[BATON_ERROR_CODE_KEY]
-
-                # Working around baton issue: https://github.com/wtsi-npg/baton/issues/155
-                if error_code == IRODS_ERROR_USER_FILE_DOES_NOT_EXIST or \
-                        (error_code == IRODS_ERROR_CAT_INVALID_ARGUMENT and "Failed to modify permissions" in error_message):
-                    raise FileNotFoundError(error_message)
-                elif error_code == IRODS_ERROR_CATALOG_ALREADY_HAS_ITEM_BY_THAT_NAME \
-                        or error_code == IRODS_ERROR_CAT_SUCCESS_BUT_WITH_NO_INFO:
-                    raise KeyError(error_message)
-                else:
-                    raise RuntimeError(error_message)
+            error = BatonRunner._get_error_given_in_baton_item(baton_item_as_json)
+            if error is not None:
+                raise error
+
+    @staticmethod
+    def _get_error_given_in_baton_item(baton_item_as_json: Dict) -> Optional[Exception]:
+        """
+        Gets the error that baton has expressed in an item of its output.
+        :param baton_item_as_json: the output item as parsed serialization
+        :return: exception equivalent to the error else `None` if baton did not express an error
+        """
+        if BATON_ERROR_PROPERTY not in baton_item_as_json:
+            return None
+
+        error = baton_item_as_json[BATON_ERROR_PROPERTY]
+        error_message = error[BATON_ERROR_MESSAGE_KEY]
+        error_code = error[BATON_ERROR_CODE_KEY]
+
+        # Working around baton issue: https://github.com/wtsi-npg/baton/issues/155
+        if error_code == IRODS_ERROR_USER_FILE_DOES_NOT_EXIST or \
+                (error_code == IRODS_ERROR_CAT_INVALID_ARGUMENT and "Failed to modify permissions" in error_message):
+            return FileNotFoundError(error_message)
+        elif error_code == IRODS_ERROR_CATALOG_ALREADY_HAS_ITEM_BY_THAT_NAME \
+                or error_code == IRODS_ERROR_CAT_SUCCESS_BUT_WITH_NO_INFO:
+            return KeyError(error_message)
+        else:
+            return RuntimeError(error_message)
+
+    @staticmethod
+    def _create_batch_result(paths: Sequence[str], baton_out_as_json: List[Dict],
+                             baton_item_converter: Callable[[Dict], Any]) -> BatchResult:
+        """
+        Creates the result of an operation on a batch of paths from baton's output, which must contain an item for
+        each path, in the same order as the paths.
+        :param paths: the paths that the operation was done on
+        :param baton_out_as_json: the output baton gave as parsed serialization
+        :param baton_item_converter: converts an output item in which baton has not expressed an error to the result
+        for the corresponding path
+        :return: the batch result
+        """
+        assert len(baton_out_as_json) == len(paths)
+        batch_result = BatchResult()
+        for path, baton_item_as_json in zip(paths, baton_out_as_json):
+            error = BatonRunner._get_error_given_in_baton_item(baton_item_as_json)
+            if error is not None:
+                batch_result.errors[path] = error
+            else:
+                batch_result.successes[path] = baton_item_converter(baton_item_as_json)
+        return batch_result
+
+    @staticmethod
+    def _input_items(input_data: Any) -> Iterable[Any]:
+        """
+        Gets the items of the given baton input, each of which is sent to baton as a separate JSON document. Lists,
+        tuples and iterators (e.g. generators) are considered to be sequences of items; anything else is a single item.
+        :param input_data: the input data to baton
+        :return: the items of the input, which are not consumed ahead of use if given as an iterator
+        """
+        if isinstance(input_data, (list, tuple, Iterator)):
+            return input_data
+        return [input_data]
+
+    @staticmethod
+    def _parse_baton_out(baton_out: str, raise_errors: bool=True) -> List[Dict]:
+        """
+        Parses the output of a baton process, raising any errors that baton has expressed in it.
+        :param baton_out: the output baton gave
+        :param raise_errors: whether errors that baton has expressed in its output should be raised
+        :return: parsed serialization of the output
+        """
+        if len(baton_out) == 0:
+            return []
+        if len(baton_out) > 0 and baton_out[0] != '[':
+            # If information about multiple files is returned, baton does not return valid JSON - it returns a line
+            # separated list of JSON, where each line corresponds to a different file
+            baton_out = "[%s]" % baton_out.replace('\n', ',')
+
+        baton_out_as_json = json.loads(baton_out)
+        if raise_errors:
+            BatonRunner._raise_any_errors_given_in_baton_out(baton_out_as_json)
+
+        return baton_out_as_json
+
+    @staticmethod
+    def _iter_parse_baton_out(baton_out_chunks: Iterable[bytes], encoding: str="utf-8") -> Iterator[Dict]:
+        """
+        Incrementally parses the output of a baton process, yielding each item as soon as it has been read. Items are
+        either line separated JSON documents or the elements of JSON arrays, which are yielded individually. Raises
+        any error that baton has expressed in an item when the item is reached.
+        :param baton_out_chunks: the output baton gave, in chunks of arbitrary size
+        :param encoding: the encoding of the output
+        :return: iterator of the parsed serialization of each item
+        """
+        decoder = json.JSONDecoder()
+        text_decoder = codecs.getincrementaldecoder(encoding)()
+        chunks = iter(baton_out_chunks)
+        buffer = ""
+        index = 0
+        in_array = False
+        end_of_output = False
+
+        while True:
+            while index < len(buffer) and (buffer[index].isspace() or (in_array and buffer[index] == ",")):
+                index += 1
+
+            value_complete = False
+            if index < len(buffer):
+                if not in_array and buffer[index] == "[":
+                    in_array = True
+                    index += 1
+                    continue
+                if in_array and buffer[index] == "]":
+                    in_array = False
+                    index += 1
+                    continue
+                try:
+                    value, end = decoder.raw_decode(buffer, index)
+                    # A value at the very end of the buffer (e.g. a number) may continue in the next chunk
+                    value_complete = end < len(buffer) or end_of_output
+                except ValueError:
+                    if end_of_output:
+                        raise
+            elif end_of_output:
+                if in_array:
+                    raise ValueError("baton output ended part way through a JSON array")
+                return
+
+            if value_complete:
+                BatonRunner._raise_any_errors_given_in_baton_out(value)
+                yield value
+                index = end
+            else:
+                # Read at least as much again as is pending so that re-parsing large items has linear cost overall
+                buffer = buffer[index:]
+                index = 0
+                pending = len(buffer)
+                while not end_of_output and len(buffer) - pending <= pending:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        buffer += text_decoder.decode(b"", final=True)
+                        end_of_output = True
+                    else:
+                        buffer += text_decoder.decode(chunk)
 
     def __init__(self, baton_binaries_directory: str, skip_baton_binaries_validation: bool=False,
-                 timeout_queries_after: timedelta=None):
+                 timeout_queries_after: timedelta=None, use_persistent_workers: bool=False,
+                 max_requests_per_worker: int=None, executor_pool: BatonExecutorPool=None, chunk_size: int=None):
         """
         Constructor.
         :param baton_binaries_directory: the host of baton's binaries
         :param irods_query_zone: the iRODS zone to query
         :param skip_baton_binaries_validation: skips validation of baton binaries (intending for testing only)
+        :param timeout_queries_after: time after which queries should be timed out
+        :param use_persistent_workers: whether long-lived baton processes should be used to run queries with the
+        binaries in `PERSISTENT_WORKER_BATON_BINARIES`, instead of starting a new process for every query
+        :param max_requests_per_worker: number of requests after which a persistent worker is recycled (`None` if
+        workers should only be recycled if they crash)
+        :param executor_pool: pool of executors, which may be shared with other runners, used to run baton queries.
+        If `None`, the runner uses a pool of its own with no limit on the number of concurrent queries
+        :param chunk_size: maximum number of input items sent to a single baton process (`None` if unlimited). Queries
+        with more input items are split into chunks, which are run in parallel (limited by the size of the executor
+        pool or, if the pool is unbounded, the number of CPUs). The outputs of the chunks are joined in input order
         """
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError("Chunk size must be at least 1: %d given" % chunk_size)
         if not skip_baton_binaries_validation:
             exception = BatonRunner.validate_baton_binaries_location(baton_binaries_directory)
             if exception is not None:
@@ -92,14 +523,21 @@ class BatonRunner(metaclass=ABCMeta):
 
         self._baton_binaries_directory = baton_binaries_directory
         self.timeout_queries_after = timeout_queries_after
+        self.use_persistent_workers = use_persistent_workers
+        self.max_requests_per_worker = max_requests_per_worker
+        self._owns_executor_pool = executor_pool is None
+        self._executor_pool = executor_pool if executor_pool is not None else BatonExecutorPool()
+        self.chunk_size = chunk_size
 
-    def run_baton_query(self, baton_binary: BatonBinary, program_arguments: List[str]=None, input_data: Any=None) \
-            -> List[Dict]:
+    def run_baton_query(self, baton_binary: BatonBinary, program_arguments: List[str]=None, input_data: Any=None,
+                        raise_errors: bool=True) -> List[Dict]:
         """
         Runs a baton query.
         :param baton_binary: the baton binary to use
         :param program_arguments: arguments to give to the baton binary
         :param input_data: input data to the baton binary
+        :param raise_errors: whether errors that baton expresses in its output should be raised. If not, the items of
+        the output that express errors are returned with the other items
         :return: parsed serialization returned by baton
         """
         if program_arguments is None:
@@ -108,23 +546,137 @@ class BatonRunner(metaclass=ABCMeta):
         baton_binary_location = os.path.join(self._baton_binaries_directory, baton_binary.value)
         program_arguments = [baton_binary_location] + program_arguments
 
-        _logger.info("Running baton command: '%s' with data '%s'" % (program_arguments, input_data))
-        start_at = time.monotonic()
-        baton_out = self._run_command(program_arguments, input_data=input_data)
-        time_taken_to_run_query = time.monotonic() - start_at
+        if self.chunk_size is not None and isinstance(input_data, (list, tuple)) and len(input_data) > self.chunk_size:
+            return self._run_baton_query_in_chunks(baton_binary, program_arguments, input_data, raise_errors)
+        return self._run_baton_query(baton_binary, program_arguments, input_data, raise_errors)
+
+    def _run_baton_query(self, baton_binary: BatonBinary, program_arguments: List[str], input_data: Any,
+                         raise_errors: bool=True) -> List[Dict]:
+        """
+        Runs a baton query using a single baton process.
+        :param baton_binary: the baton binary to use
+        :param program_arguments: the arguments to run baton with (including the location of the binary)
+        :param input_data: input data to the baton binary
+        :param raise_errors: see `run_baton_query`
+        :return: parsed serialization returned by baton
+        """
+        with self._executor_pool.executor() as executor:
+            if self.use_persistent_workers and baton_binary in PERSISTENT_WORKER_BATON_BINARIES \
+                    and input_data is not None:
+                return self._run_baton_query_with_worker(executor, program_arguments, input_data, raise_errors)
+
+            _logger.info("Running baton command: '%s' with data '%s'" % (program_arguments, input_data))
+            start_at = time.monotonic()
+            baton_out = self._run_command(program_arguments, input_data=input_data)
+            time_taken_to_run_query = time.monotonic() - start_at
         _logger.debug("baton output (took %s seconds, wall time): %s" % (time_taken_to_run_query, baton_out))
 
-        if len(baton_out) == 0:
-            return []
-        if len(baton_out) > 0 and baton_out[0] != '[':
-            # If information about multiple files is returned, baton does not return valid JSON - it returns a line
-            # separated list of JSON, where each line corresponds to a different file
-            baton_out = "[%s]" % baton_out.replace('\n', ',')
+        return BatonRunner._parse_baton_out(baton_out, raise_errors)
 
-        baton_out_as_json = json.loads(baton_out)
-        BatonRunner._raise_any_errors_given_in_baton_out(baton_out_as_json)
+    def iter_baton_query(self, baton_binary: BatonBinary, program_arguments: List[str]=None, input_data: Any=None) \
+            -> Iterator[Dict]:
+        """
+        Runs a baton query, yielding each item of baton's output as soon as it has been read and parsed, so that the
+        whole of the output is never held in memory.
 
-        return baton_out_as_json
+        A new baton process is always used, even if the runner uses persistent workers. The executor used to run the
+        query is held until the iterator has been exhausted or closed, including whilst the caller handles each item.
+        Other queries made using the same executor pool before then therefore need another executor to be free: if
+        the pool only allows one concurrent query, they are queued until the pool's maximum queue time (or forever, if
+        there is no maximum), as the iterator cannot progress whilst its caller waits on them.
+        :param baton_binary: the baton binary to use
+        :param program_arguments: arguments to give to the baton binary
+        :param input_data: input data to the baton binary
+        :return: iterator of the parsed serialization of each item returned by baton
+        """
+        if program_arguments is None:
+            program_arguments = []
+
+        baton_binary_location = os.path.join(self._baton_binaries_directory, baton_binary.value)
+        program_arguments = [baton_binary_location] + program_arguments
+
+        with self._executor_pool.executor():
+            _logger.info("Streaming baton command: '%s' with data '%s'" % (program_arguments, input_data))
+            yield from BatonRunner._iter_parse_baton_out(self._iter_command_out(program_arguments, input_data))
+
+    def _iter_command_out(self, arguments: List[str], input_data: Any=None) -> Iterator[bytes]:
+        """
+        Runs a command as a subprocess, yielding its standard out in chunks as it is produced.
+
+        The input is written and standard error is drained in separate threads, concurrently with standard out being
+        read, so the process cannot block on a full pipe and input given as an iterator is consumed only as fast as
+        the process reads it. The process is killed if the iterator is closed before the process has finished.
+
+        Ignores errors given over stderr if there is output on stdout (see `_run_command`).
+        :param arguments: the arguments to run
+        :param input_data: the input data to pass to the subprocess (see `_input_items`)
+        :return: iterator of chunks of the process' standard out
+        """
+        process = subprocess.Popen(arguments, stdout=subprocess.PIPE, stdin=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   bufsize=0)
+        errors = []     # type: List[bytes]
+        input_errors = []   # type: List[Exception]
+        input_writer = Thread(target=BatonRunner._write_input, args=(process, input_data, input_errors), daemon=True)
+        error_reader = Thread(target=lambda: errors.append(process.stderr.read()), daemon=True)
+        input_writer.start()
+        error_reader.start()
+
+        timeout_in_seconds = self.timeout_queries_after.total_seconds() if self.timeout_queries_after is not None \
+            else None
+        deadline = time.monotonic() + timeout_in_seconds if timeout_in_seconds is not None else None
+        file_descriptor = process.stdout.fileno()
+        output_produced = False
+        try:
+            while True:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    raise subprocess.TimeoutExpired(arguments, timeout_in_seconds)
+                readable, _, _ = select.select([file_descriptor], [], [], remaining)
+                if len(readable) == 0:
+                    continue
+                chunk = os.read(file_descriptor, BatonWorker._READ_SIZE)
+                if len(chunk) == 0:
+                    break
+                output_produced = True
+                yield chunk
+
+            process.wait()
+            input_writer.join()
+            error_reader.join()
+            if len(input_errors) > 0:
+                raise input_errors[0]
+            if not output_produced and len(errors[0]) > 0:
+                raise RuntimeError(errors[0])
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            input_writer.join()
+            error_reader.join()
+            process.stdout.close()
+            process.stderr.close()
+
+    @staticmethod
+    def _write_input(process: subprocess.Popen, input_data: Any, input_errors: List[Exception]):
+        """
+        Writes the given input data to the standard in of the given process then closes it.
+        :param process: the process to write to
+        :param input_data: the input data, where each item is written as a separate JSON document (see `_input_items`)
+        :param input_errors: list to which any exception raised whilst producing or serialising the input is appended
+        """
+        try:
+            for to_write in BatonRunner._input_items(input_data):
+                process.stdin.write(str.encode(json.dumps(to_write)))
+        except BrokenPipeError:
+            # The process has exited without reading all of its input; its output will tell why
+            pass
+        except Exception as e:
+            input_errors.append(e)
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
 
     def _run_command(self, arguments: List[str], input_data: Any=None, output_encoding: str="utf-8") -> str:
         """
@@ -134,24 +686,83 @@ class BatonRunner(metaclass=ABCMeta):
         correctly and has expressed the error in it's JSON out, which can be handled more appropriately upstream to this
         method.)
         :param arguments: the arguments to run
-        :param input_data: the input data to pass to the subprocess
+        :param input_data: the input data to pass to the subprocess. Input given as an iterator is written as it is
+        produced, whilst the process' output is being read (see `_iter_command_out`)
         :param output_encoding: optional specification of the output encoding to expect
         :return: the process' standard out
         """
-        process = subprocess.Popen(arguments, stdout=subprocess.PIPE, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        out = b"".join(self._iter_command_out(arguments, input_data))
+        return out.decode(output_encoding).rstrip()
 
-        if isinstance(input_data, List):
-            for to_write in input_data:
-                to_write_as_json = json.dumps(to_write)
-                process.stdin.write(str.encode(to_write_as_json))
-            input_data = None
-        else:
-            input_data = str.encode(json.dumps(input_data))
+    def close(self):
+        """
+        Stops any persistent workers that the runner has started. Workers in a pool that was given to the runner on
+        construction are not stopped, as the pool may be shared.
+        """
+        if self._owns_executor_pool:
+            self._executor_pool.close()
+
+    def _run_baton_query_in_chunks(self, baton_binary: BatonBinary, arguments: List[str], input_data: Sequence[Any],
+                                   raise_errors: bool=True) -> List[Dict]:
+        """
+        Runs a baton query by splitting its input into chunks of `chunk_size` items and running the chunks in parallel.
+        If the query of any chunk fails, the error of the first failed chunk (in input order) is raised.
+        :param baton_binary: the baton binary to use
+        :param arguments: the arguments to run baton with (including the location of the binary)
+        :param input_data: the input items
+        :param raise_errors: see `run_baton_query`
+        :return: parsed serialization returned by baton for all chunks, in input order
+        """
+        chunks = [input_data[i:i + self.chunk_size] for i in range(0, len(input_data), self.chunk_size)]
+        _logger.info("Running baton command '%s' as %d chunks of up to %d items"
+                     % (arguments, len(chunks), self.chunk_size))
+
+        with ThreadPoolExecutor(max_workers=min(len(chunks), self._get_max_parallel_queries())) as thread_pool:
+            futures = [thread_pool.submit(self._run_baton_query, baton_binary, arguments, chunk, raise_errors)
+                       for chunk in chunks]
+            try:
+                baton_out_as_json = []
+                for future in futures:
+                    baton_out_as_json.extend(future.result())
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        return baton_out_as_json
+
+    def _get_max_parallel_queries(self) -> int:
+        """
+        Gets the number of baton queries that are worth running in parallel.
+        :return: the size of the executor pool or, if the pool is unbounded, the number of CPUs
+        """
+        return self._executor_pool.size if self._executor_pool.size is not None else (os.cpu_count() or 1)
 
+    def _run_baton_query_with_worker(self, executor: BatonExecutor, arguments: List[str], input_data: Any,
+                                     raise_errors: bool=True) -> List[Dict]:
+        """
+        Runs a baton query using a persistent worker, sending each input item as a separate request.
+        :param executor: the executor that has been acquired to run the query
+        :param arguments: the arguments to run baton with (including the location of the binary)
+        :param input_data: input data to the baton binary
+        :param raise_errors: see `run_baton_query`
+        :return: parsed serialization returned by baton
+        """
+        input_data = BatonRunner._input_items(input_data)
         timeout_in_seconds = self.timeout_queries_after.total_seconds() if self.timeout_queries_after is not None \
             else None
-        out, error = process.communicate(input=input_data, timeout=timeout_in_seconds)
-        if len(out) == 0 and len(error) > 0:
-            raise RuntimeError(error)
 
-        return out.decode(output_encoding).rstrip()
+        _logger.info("Running baton command with persistent worker: '%s' with data '%s'" % (arguments, input_data))
+        start_at = time.monotonic()
+        worker = executor.get_worker(arguments, self.max_requests_per_worker)
+        baton_out_as_json = [worker.query(item, timeout_in_seconds) for item in input_data]
+        time_taken_to_run_query = time.monotonic() - start_at
+        _logger.debug("baton output (took %s seconds, wall time): %s" % (time_taken_to_run_query, baton_out_as_json))
+
+        if len(baton_out_as_json) == 1 and isinstance(baton_out_as_json[0], list):
+            # Equivalent to a single line of output that is a JSON array
+            baton_out_as_json = baton_out_as_json[0]
+        if raise_errors:
+            BatonRunner._raise_any_errors_given_in_baton_out(baton_out_as_json)
+
+        return baton_out_as_json
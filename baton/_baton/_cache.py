@@ -0,0 +1,197 @@
+import time
+from collections import OrderedDict, Counter
+from datetime import timedelta
+from threading import Lock
+from typing import Dict, Hashable, Any, Callable, Sequence, Tuple, Iterable
+
+from baton.models import BatchResult, CacheStatistics
+
+METADATA_CACHE_KIND = "metadata"
+ACCESS_CONTROLS_CACHE_KIND = "access_controls"
+METADATA_QUERY_CACHE_KIND = "metadata_query"
+ENTITY_TYPE_CACHE_KIND = "entity_type"
+
+# Sentinel for values that are not cached, as `None` may be cached
+_MISSING = object()
+
+
+class TimedLruCache:
+    """
+    Thread-safe, size-bounded cache in which the least recently used entries are evicted first and entries expire after
+    a time to live that depends on their kind (e.g. metadata or access controls).
+    """
+    def __init__(self, time_to_live: Dict[str, timedelta], max_size: int=None,
+                 clock: Callable[[], float]=time.monotonic):
+        """
+        Constructor.
+        :param time_to_live: the time for which entries of each kind are kept, keyed by kind. Entries of kinds that are
+        not given are never cached
+        :param max_size: the maximum number of entries, of all kinds, that are kept (`None` if unbounded)
+        :param clock: the clock used to expire entries, which returns a time in seconds
+        """
+        if max_size is not None and max_size < 1:
+            raise ValueError("Maximum cache size must be at least 1: %d given" % max_size)
+        self.max_size = max_size
+        self._time_to_live = {kind: ttl.total_seconds() for kind, ttl in time_to_live.items()}
+        self._clock = clock
+        self._entries = OrderedDict()     # type: Dict[Tuple[str, Hashable], Tuple[float, Any]]
+        self._invalidations = 0
+        self._hits = Counter()     # type: Dict[str, int]
+        self._misses = Counter()   # type: Dict[str, int]
+        self._lock = Lock()
+
+    def caches(self, kind: str) -> bool:
+        """
+        Gets whether entries of the given kind are cached.
+        :param kind: the kind of entry
+        :return: whether the kind is cached
+        """
+        return kind in self._time_to_live
+
+    def get(self, kind: str, key: Hashable, default: Any=None) -> Any:
+        """
+        Gets the cached value of the given kind with the given key.
+        :param kind: the kind of value
+        :param key: the value's key
+        :param default: what to return if the value is not cached (or has expired)
+        :return: the cached value or the default
+        """
+        with self._lock:
+            entry = self._entries.get((kind, key))
+            if entry is None:
+                self._misses[kind] += 1
+                return default
+            expires_at, value = entry
+            if self._clock() >= expires_at:
+                del self._entries[(kind, key)]
+                self._misses[kind] += 1
+                return default
+            self._entries.move_to_end((kind, key))
+            self._hits[kind] += 1
+            return value
+
+    def set(self, kind: str, key: Hashable, value: Any):
+        """
+        Caches the given value of the given kind under the given key, evicting the least recently used entries if the
+        cache is full. Does nothing if the kind is not cached.
+        :param kind: the kind of value
+        :param key: the value's key
+        :param value: the value to cache
+        """
+        with self._lock:
+            self._set(kind, key, value)
+
+    def get_or_load(self, kind: str, keys: Sequence[Hashable],
+                    load: Callable[[Sequence[Hashable]], BatchResult], copy: Callable[[Any], Any]) -> BatchResult:
+        """
+        Gets the values of the given kind with the given keys, loading (and caching) those that are not cached.
+
+        Loaded values are not cached if the cache is invalidated whilst they are being loaded, as they may then be
+        stale.
+        :param kind: the kind of value
+        :param keys: the keys of the values
+        :param load: loads the values with the given keys, returning the loaded values and the errors for the keys that
+        could not be loaded
+        :param copy: copies a value, such that the values returned are not those held in the cache
+        :return: the values (and any errors) in the same order as the given keys
+        """
+        cached = {}    # type: Dict[Hashable, Any]
+        keys_to_load = OrderedDict()     # type: Dict[Hashable, None]
+        for key in keys:
+            if key not in cached and key not in keys_to_load:
+                value = self.get(kind, key, _MISSING)
+                if value is not _MISSING:
+                    cached[key] = value
+                else:
+                    keys_to_load[key] = None
+
+        loaded = BatchResult()
+        if len(keys_to_load) > 0:
+            invalidations_before_load = self._invalidations
+            loaded = load(list(keys_to_load))
+            with self._lock:
+                if self._invalidations == invalidations_before_load:
+                    for key, value in loaded.successes.items():
+                        self._set(kind, key, copy(value))
+
+        batch_result = BatchResult()
+        for key in keys:
+            if key in cached:
+                batch_result.successes[key] = copy(cached[key])
+            elif key in loaded.successes:
+                batch_result.successes[key] = loaded.successes[key]
+            else:
+                batch_result.errors[key] = loaded.errors[key]
+        return batch_result
+
+    def invalidate(self, kind: str, keys: Iterable[Hashable]):
+        """
+        Removes the values of the given kind with the given keys from the cache.
+        :param kind: the kind of value
+        :param keys: the keys of the values to remove
+        """
+        with self._lock:
+            self._invalidations += 1
+            for key in keys:
+                self._entries.pop((kind, key), None)
+
+    def invalidate_all(self, kind: str):
+        """
+        Removes all values of the given kind from the cache.
+        :param kind: the kind of value
+        """
+        with self._lock:
+            self._invalidations += 1
+            for entry_kind, key in list(self._entries.keys()):
+                if entry_kind == kind:
+                    del self._entries[(entry_kind, key)]
+
+    def invalidate_paths_in(self, kind: str, collection_paths: Iterable[str]):
+        """
+        Removes the values of the given kind that are keyed by the paths of entities within the given collections (at any
+        depth) from the cache.
+        :param kind: the kind of value
+        :param collection_paths: the paths of the collections
+        """
+        prefixes = tuple("%s/" % collection_path.rstrip("/") for collection_path in collection_paths)
+        with self._lock:
+            self._invalidations += 1
+            for entry_kind, key in list(self._entries.keys()):
+                if entry_kind == kind and isinstance(key, str) and key.startswith(prefixes):
+                    del self._entries[(entry_kind, key)]
+
+    def clear(self):
+        """
+        Removes all values from the cache.
+        """
+        with self._lock:
+            self._invalidations += 1
+            self._entries.clear()
+
+    def get_statistics(self) -> Dict[str, CacheStatistics]:
+        """
+        Gets statistics about the use of the cache, for each kind of value that is cached.
+        :return: the statistics, keyed by kind
+        """
+        with self._lock:
+            statistics = {kind: CacheStatistics(self._hits[kind], self._misses[kind])
+                          for kind in self._time_to_live.keys()}
+            for entry_kind, _ in self._entries.keys():
+                statistics[entry_kind].size += 1
+            return statistics
+
+    def _set(self, kind: str, key: Hashable, value: Any):
+        """
+        See `set`. Must be called whilst holding the lock.
+        """
+        time_to_live = self._time_to_live.get(kind)
+        if time_to_live is None:
+            return
+        self._entries[(kind, key)] = (self._clock() + time_to_live, value)
+        self._entries.move_to_end((kind, key))
+        if self.max_size is not None:
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
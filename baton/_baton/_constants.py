@@ -1,6 +1,6 @@
 from hgicommon.enums import ComparisonOperator
 
-from baton.models import AccessControl
+from baton.models import AccessControl, IrodsEntity
 
 BATON_DATA_OBJECT_PROPERTY = "data_object"
 BATON_COLLECTION_PROPERTY = "collection"
@@ -14,6 +14,9 @@ BATON_REPLICA_CHECKSUM_PROPERTY = "checksum"
 BATON_REPLICA_LOCATION_PROPERTY = "location"
 BATON_REPLICA_RESOURCE_PROPERTY = "resource"
 
+BATON_SIZE_PROPERTY = "size"
+BATON_CHECKSUM_PROPERTY = "checksum"
+
 BATON_TIMESTAMP_PROPERTY = "timestamps"
 BATON_TIMESTAMP_CREATED_PROPERTY = "created"
 BATON_TIMESTAMP_LAST_MODIFIED_PROPERTY = "modified"
@@ -30,6 +33,14 @@ BATON_ACL_LEVELS = {
     AccessControl.Level.WRITE: "write"
 }
 
+# Flags with which baton-list and baton-metaquery load each property of entities, in the order they are given to baton
+BATON_ENTITY_PROPERTY_FLAGS = [
+    (IrodsEntity.Property.ACCESS_CONTROLS, "--acl"),
+    (IrodsEntity.Property.REPLICAS, "--replicate"),
+    (IrodsEntity.Property.TIMESTAMPS, "--timestamp"),
+    (IrodsEntity.Property.METADATA, "--avu")
+]
+
 BATON_AVU_PROPERTY = "avus"
 BATON_AVU_ATTRIBUTE_PROPERTY = "attribute"
 BATON_AVU_VALUE_PROPERTY = "value"
@@ -0,0 +1,193 @@
+import collections
+import operator
+from typing import List, Tuple, FrozenSet, Dict, Iterable, Optional
+
+from hgicommon.enums import ComparisonOperator
+
+from baton._baton._constants import BATON_AVU_PROPERTY, BATON_AVU_ATTRIBUTE_PROPERTY, BATON_AVU_VALUE_PROPERTY, \
+    BATON_SEARCH_CRITERION_COMPARISON_OPERATORS
+from baton.models import SearchCriterion, AllOf, AnyOf, In, Between, MetadataQuery
+
+# Maximum number of metaqueries that a metadata query may be split into (conjunctions of disjunctions multiply)
+MAX_METAQUERIES = 256
+
+COMPARISONS = {
+    ComparisonOperator.EQUALS: operator.eq,
+    ComparisonOperator.LESS_THAN: operator.lt,
+    ComparisonOperator.GREATER_THAN: operator.gt
+}
+
+# Estimated fraction of entities that a search criterion must match at most for it to be selective. When planning with
+# metadata statistics, if the most selective criterion of a metaquery is selective, only selective criteria are given
+# to baton and broader criteria are evaluated locally
+SELECTIVE_CRITERION_SELECTIVITY = 0.05
+
+# Search criterion as a hashable tuple of its attribute, value and comparison operator
+_Criterion = Tuple[str, str, ComparisonOperator]
+
+
+class Metaquery:
+    """
+    Query that baton-metaquery can run (i.e. with at most one criterion on each attribute), along with the criteria
+    that its results must then be filtered by locally.
+    """
+    def __init__(self, search_criteria: List[SearchCriterion], local_search_criteria: List[SearchCriterion]):
+        """
+        Constructor.
+        :param search_criteria: the search criteria given to baton
+        :param local_search_criteria: the search criteria that the results from baton must also match
+        """
+        self.search_criteria = search_criteria
+        self.local_search_criteria = local_search_criteria
+
+
+def plan_metadata_query(query: MetadataQuery, metadata_statistics: "IrodsMetadataStatistics"=None) \
+        -> List[Metaquery]:
+    """
+    Splits the given metadata query into the metaqueries whose results, once filtered locally and deduplicated by path,
+    are the results of the query.
+
+    The query is converted into a disjunction of conjunctions of search criteria, dropping conjunctions whose results
+    are a subset of those of another. Each conjunction becomes a metaquery, where one criterion of each attribute
+    (preferably an equality) is given to baton and any others are evaluated locally.
+    :param query: the metadata query
+    :param metadata_statistics: statistics with which the selectivity of search criteria is estimated, such that broad
+    criteria can be evaluated locally instead of by baton (`None` if all criteria are to be given to baton if possible)
+    :return: the metaqueries (none if the query cannot match anything)
+    """
+    # Sorted by size, such that conjunctions are considered after any that they are a superset of
+    conjunctions = sorted(set(_to_disjunctive_normal_form(query)), key=lambda conjunction: (
+        len(conjunction), sorted(_criterion_sort_key(criterion) for criterion in conjunction)))
+    if len(conjunctions) > MAX_METAQUERIES:
+        raise ValueError("Metadata query would be split into %d metaqueries (maximum is %d)"
+                         % (len(conjunctions), MAX_METAQUERIES))
+
+    minimal_conjunctions = []   # type: List[FrozenSet[_Criterion]]
+    for conjunction in conjunctions:
+        if len(conjunction) == 0:
+            raise ValueError("At least one search criterion must be given")
+        if not any(minimal_conjunction.issubset(conjunction) for minimal_conjunction in minimal_conjunctions):
+            minimal_conjunctions.append(conjunction)
+
+    return [_create_metaquery(conjunction, metadata_statistics) for conjunction in minimal_conjunctions]
+
+
+def matches_baton_json(entity_as_baton_json: Dict, search_criteria: Iterable[SearchCriterion]) -> bool:
+    """
+    Gets whether the metadata of the entity with the given baton JSON representation matches all of the given search
+    criteria, comparing values in the same way as iRODS.
+
+    Each equality criterion may be matched by any value of its attribute, whereas the range (less than and greater
+    than) criteria on an attribute must all be matched by the same value, such that a range (e.g. from `Between`) is
+    not matched by an attribute with one value below and another value above it.
+    :param entity_as_baton_json: parsed baton JSON representation of the entity, including its metadata
+    :param search_criteria: the search criteria
+    :return: whether the entity matches
+    """
+    values_by_attribute = collections.defaultdict(list)     # type: Dict[str, List[str]]
+    for avu_as_baton_json in entity_as_baton_json[BATON_AVU_PROPERTY]:
+        values_by_attribute[avu_as_baton_json[BATON_AVU_ATTRIBUTE_PROPERTY]].append(
+            avu_as_baton_json[BATON_AVU_VALUE_PROPERTY])
+
+    range_criteria_by_attribute = collections.defaultdict(list)    # type: Dict[str, List[SearchCriterion]]
+    for search_criterion in search_criteria:
+        values = values_by_attribute.get(search_criterion.attribute, ())
+        if search_criterion.comparison_operator == ComparisonOperator.EQUALS:
+            if search_criterion.value not in values:
+                return False
+        else:
+            range_criteria_by_attribute[search_criterion.attribute].append(search_criterion)
+
+    for attribute, range_criteria in range_criteria_by_attribute.items():
+        if not any(all(COMPARISONS[search_criterion.comparison_operator](value, search_criterion.value)
+                       for search_criterion in range_criteria) for value in values_by_attribute.get(attribute, ())):
+            return False
+    return True
+
+
+def _to_disjunctive_normal_form(query: MetadataQuery) -> List[FrozenSet[_Criterion]]:
+    """
+    Converts the given metadata query into a disjunction of conjunctions of search criteria.
+    :param query: the metadata query
+    :return: the conjunctions
+    """
+    if isinstance(query, SearchCriterion):
+        if query.comparison_operator not in BATON_SEARCH_CRITERION_COMPARISON_OPERATORS:
+            raise ValueError("Unsupported comparison operator: %s" % query.comparison_operator)
+        return [frozenset([(query.attribute, query.value, query.comparison_operator)])]
+    elif isinstance(query, AnyOf):
+        conjunctions = []
+        for subquery in query.queries:
+            conjunctions.extend(_to_disjunctive_normal_form(subquery))
+        return conjunctions
+    elif isinstance(query, In):
+        return [frozenset([(query.attribute, value, ComparisonOperator.EQUALS)]) for value in query.values]
+    elif isinstance(query, Between):
+        if query.lower > query.upper:
+            return []
+        elif query.lower == query.upper:
+            return [frozenset([(query.attribute, query.lower, ComparisonOperator.EQUALS)])]
+        return [frozenset([(query.attribute, query.lower, ComparisonOperator.GREATER_THAN),
+                           (query.attribute, query.upper, ComparisonOperator.LESS_THAN)]),
+                frozenset([(query.attribute, query.lower, ComparisonOperator.EQUALS)]),
+                frozenset([(query.attribute, query.upper, ComparisonOperator.EQUALS)])]
+    elif isinstance(query, AllOf) or (isinstance(query, collections.Iterable) and not isinstance(query, str)):
+        subqueries = query.queries if isinstance(query, AllOf) else query
+        conjunctions = [frozenset()]    # type: List[FrozenSet[_Criterion]]
+        for subquery in subqueries:
+            subquery_conjunctions = _to_disjunctive_normal_form(subquery)
+            conjunctions = list({conjunction.union(subquery_conjunction) for conjunction in conjunctions
+                                 for subquery_conjunction in subquery_conjunctions})
+            if len(conjunctions) > MAX_METAQUERIES:
+                raise ValueError("Metadata query would be split into more than %d metaqueries" % MAX_METAQUERIES)
+        return conjunctions
+    else:
+        raise TypeError("Unsupported metadata query: %s" % type(query))
+
+
+def _create_metaquery(conjunction: FrozenSet[_Criterion], metadata_statistics: Optional["IrodsMetadataStatistics"]) \
+        -> Metaquery:
+    """
+    Creates the metaquery for the given conjunction of search criteria.
+    :param conjunction: the conjunction of search criteria
+    :param metadata_statistics: see `plan_metadata_query`
+    :return: the metaquery
+    """
+    criteria_by_attribute = collections.OrderedDict()     # type: Dict[str, List[_Criterion]]
+    # Ordered such that equality criteria, which iRODS can use its index for, are preferred for giving to baton
+    for criterion in sorted(conjunction, key=lambda criterion: (
+            criterion[0], criterion[2] != ComparisonOperator.EQUALS, _criterion_sort_key(criterion))):
+        criteria_by_attribute.setdefault(criterion[0], []).append(criterion)
+
+    search_criteria = []
+    local_search_criteria = []
+    for criteria in criteria_by_attribute.values():
+        search_criteria.append(SearchCriterion(*criteria[0]))
+        # Range criteria on the same attribute must be met by the same value (see `matches_baton_json`), which baton
+        # cannot be asked for, therefore a range criterion given to baton is also evaluated locally with the others
+        local_criteria = criteria if len(criteria) > 1 and criteria[0][2] != ComparisonOperator.EQUALS \
+            else criteria[1:]
+        local_search_criteria.extend(SearchCriterion(*criterion) for criterion in local_criteria)
+
+    if metadata_statistics is not None and len(search_criteria) > 1:
+        selectivities = [metadata_statistics.estimate_selectivity(search_criterion)
+                         for search_criterion in search_criteria]
+        # Criteria of unknown selectivity are given to baton, as they may be broad or selective
+        if any(selectivity is not None and selectivity <= SELECTIVE_CRITERION_SELECTIVITY
+               for selectivity in selectivities):
+            local_search_criteria.extend(
+                search_criterion for search_criterion, selectivity in zip(search_criteria, selectivities)
+                if selectivity is not None and selectivity > SELECTIVE_CRITERION_SELECTIVITY
+                and search_criterion not in local_search_criteria)
+            search_criteria = [search_criterion for search_criterion, selectivity in zip(search_criteria, selectivities)
+                               if selectivity is None or selectivity <= SELECTIVE_CRITERION_SELECTIVITY]
+    return Metaquery(search_criteria, local_search_criteria)
+
+
+def _criterion_sort_key(criterion: _Criterion) -> Tuple[str, str, str]:
+    """
+    Gets the key by which search criteria are sorted, such that plans do not depend on the order of sets.
+    :param criterion: the search criterion
+    :return: the sort key
+    """
+    return criterion[0], criterion[1], criterion[2].name
@@ -1,29 +1,210 @@
+import asyncio
+from datetime import timedelta
+from typing import Dict, Union, Iterable, Type
+
+from baton._baton._baton_runner import BatonExecutorPool, BatonRunner, BatonBinary
+from baton._baton._cache import TimedLruCache, METADATA_CACHE_KIND, ACCESS_CONTROLS_CACHE_KIND, \
+    METADATA_QUERY_CACHE_KIND, ENTITY_TYPE_CACHE_KIND
+from baton._baton._constants import BATON_DATA_OBJECT_PROPERTY
+from baton._baton.async_baton_mappers import AsyncBatonDataObjectMapper, AsyncBatonCollectionMapper, \
+    AsyncBatonSpecificQueryMapper
 from baton._baton.baton_custom_object_mappers import BatonSpecificQueryMapper
 from baton._baton.baton_entity_mappers import BatonDataObjectMapper, BatonCollectionMapper
+from baton.models import CacheStatistics, IrodsEntity, DataObject, Collection, BatchResult
 
 
 class Connection:
     """
     Pseudo connection to iRODS.
     """
-    def __init__(self, baton_binaries_directory: str, skip_baton_binaries_validation: bool=False):
+    def __init__(self, baton_binaries_directory: str, skip_baton_binaries_validation: bool=False,
+                 use_persistent_workers: bool=False, max_requests_per_worker: int=None,
+                 max_concurrent_queries: int=None, max_queued_queries: int=None,
+                 max_query_queue_time: timedelta=None, chunk_size: int=None, lazy_decoding: bool=False,
+                 cache_metadata_for: timedelta=None, cache_access_controls_for: timedelta=None,
+                 cache_metadata_queries_for: timedelta=None, max_cached_items: int=10000,
+                 cache_entity_types_for: timedelta=timedelta(hours=1)):
+        """
+        Constructor.
+        :param baton_binaries_directory: the directory host of the baton binaries
+        :param skip_baton_binaries_validation: whether checks on if the correct baton binaries exist within the given
+        directory should be skipped
+        :param use_persistent_workers: whether long-lived baton processes should be used to run queries, instead of
+        starting a new process for every query
+        :param max_requests_per_worker: number of requests after which a persistent worker is recycled (`None` if
+        workers should only be recycled if they crash)
+        :param max_concurrent_queries: the maximum number of baton queries that can run at the same time using this
+        connection (`None` if unlimited). Queries beyond this limit are queued and run in the order they were made
+        :param max_queued_queries: the maximum number of queries that can be queued (`None` if unlimited). If exceeded,
+        `queue.Full` is raised
+        :param max_query_queue_time: the maximum time a query can be queued for (`None` if unlimited). If exceeded,
+        `TimeoutError` is raised
+        :param chunk_size: the maximum number of paths (or other input items) sent to a single baton process (`None`
+        if unlimited). Operations on more paths are split into chunks that are run in parallel
+        :param lazy_decoding: whether the access controls, metadata and replicas of retrieved data objects and
+        collections should only be decoded from baton's output when they are first used
+        :param cache_metadata_for: time for which the metadata retrieved by `metadata.get_all` is cached (`None` if it
+        is not to be cached). Cached metadata is invalidated when it is modified through this connection
+        :param cache_access_controls_for: time for which the access controls retrieved by `access_control.get_all` are
+        cached (`None` if they are not to be cached). Cached access controls are invalidated when they are modified
+        through this connection
+        :param cache_metadata_queries_for: time for which the results of `get_by_metadata` are cached (`None` if they
+        are not to be cached), keyed by the search criteria (in any order), zone and whether metadata is loaded. All
+        cached results are invalidated when metadata or access controls are modified through this connection
+        :param max_cached_items: the maximum number of paths' metadata and access controls, and metadata query
+        results, that are cached, beyond which the least recently used are evicted
+        :param cache_entity_types_for: time for which the type of entity (data object or collection) found at a path by
+        `resolve` is remembered (`None` if it is not to be remembered). At most `max_cached_items` types are remembered
+        """
+        self._executor_pool = BatonExecutorPool(max_concurrent_queries, max_queued_queries, max_query_queue_time)
+        time_to_live = {}
+        if cache_metadata_for is not None:
+            time_to_live[METADATA_CACHE_KIND] = cache_metadata_for
+        if cache_access_controls_for is not None:
+            time_to_live[ACCESS_CONTROLS_CACHE_KIND] = cache_access_controls_for
+        if cache_metadata_queries_for is not None:
+            time_to_live[METADATA_QUERY_CACHE_KIND] = cache_metadata_queries_for
+        self._cache = TimedLruCache(time_to_live, max_cached_items) if len(time_to_live) > 0 else None
+        # Kept apart from the cache shared by the mappers, as types are remembered by default
+        self._entity_type_cache = TimedLruCache({ENTITY_TYPE_CACHE_KIND: cache_entity_types_for}, max_cached_items) \
+            if cache_entity_types_for is not None else None
+        runner_kwargs = {
+            "use_persistent_workers": use_persistent_workers,
+            "max_requests_per_worker": max_requests_per_worker,
+            "executor_pool": self._executor_pool,
+            "chunk_size": chunk_size
+        }
+        self.data_object = BatonDataObjectMapper(
+            baton_binaries_directory, skip_baton_binaries_validation, lazy_decoding=lazy_decoding, cache=self._cache,
+            **runner_kwargs)
+        self.collection = BatonCollectionMapper(
+            baton_binaries_directory, skip_baton_binaries_validation, lazy_decoding=lazy_decoding, cache=self._cache,
+            **runner_kwargs)
+        self.specific_query = BatonSpecificQueryMapper(
+            baton_binaries_directory, skip_baton_binaries_validation, **runner_kwargs)
+
+    def resolve(self, paths: Union[str, Iterable[str]], load_metadata: bool=True,
+                load_properties: Iterable[IrodsEntity.Property]=None) -> Union[IrodsEntity, BatchResult]:
+        """
+        Gets the data objects and/or collections at the given paths, without the type of entity at each path having to
+        be known, using a single baton-list query. The type of entity found at each path is remembered, such that
+        `get_entity_mapper` does not need to query iRODS for it.
+        :param paths: the path or paths
+        :param load_metadata: see `IrodsEntityMapper.get_by_path`
+        :param load_properties: see `BatonDataObjectMapper.get_by_path`
+        :return: the entity at the path if a single path is given (raising any error), else a `BatchResult` holding the
+        entity at each path and the error for each path whose entity could not be retrieved (e.g. `FileNotFoundError`)
+        """
+        if isinstance(paths, str):
+            batch_result = self.resolve([paths], load_metadata, load_properties)
+            if len(batch_result.errors) > 0:
+                raise batch_result.errors[paths]
+            return batch_result.successes[paths]
+        paths = list(paths)
+        if len(paths) == 0:
+            return BatchResult()
+
+        # baton lists whatever type of entity is at the path given as a collection
+        arguments, baton_json = self.collection._create_get_by_path_query(paths, load_metadata, load_properties)
+        baton_out_as_json = self.collection.run_baton_query(
+            BatonBinary.BATON_LIST, arguments, input_data=list(baton_json), raise_errors=False)
+        batch_result = BatonRunner._create_batch_result(paths, baton_out_as_json, self._baton_json_to_irods_entity)
+        if self._entity_type_cache is not None:
+            for path, entity in batch_result.successes.items():
+                self._entity_type_cache.set(ENTITY_TYPE_CACHE_KIND, path, type(entity))
+        return batch_result
+
+    def get_entity_mapper(self, path: str) -> Union[BatonDataObjectMapper, BatonCollectionMapper]:
+        """
+        Gets the mapper for the type of entity at the given path (e.g. to then use its metadata or access control
+        mapper), which is only queried from iRODS if it is not remembered from a previous `resolve`.
+        :param path: the path of the entity
+        :return: the data object mapper or the collection mapper
+        """
+        entity_type = None  # type: Type[IrodsEntity]
+        if self._entity_type_cache is not None:
+            entity_type = self._entity_type_cache.get(ENTITY_TYPE_CACHE_KIND, path)
+        if entity_type is None:
+            entity_type = type(self.resolve(path, load_metadata=False, load_properties=[]))
+        return self.data_object if issubclass(entity_type, DataObject) else self.collection
+
+    def clear_cache(self):
+        """
+        Removes all cached metadata, access controls and metadata query results (e.g. after metadata or access
+        controls have been modified other than through this connection), and forgets the types of entities at paths.
+        """
+        if self._cache is not None:
+            self._cache.clear()
+        if self._entity_type_cache is not None:
+            self._entity_type_cache.clear()
+
+    def invalidate_metadata_queries(self):
+        """
+        Removes all cached metadata query results, such that later queries are made to iRODS.
+        """
+        if self._cache is not None:
+            self._cache.invalidate_all(METADATA_QUERY_CACHE_KIND)
+
+    def get_cache_statistics(self) -> Dict[str, CacheStatistics]:
+        """
+        Gets statistics about the use of the cache, for each kind of value that is cached: "metadata",
+        "access_controls" and/or "metadata_query".
+        :return: the statistics, keyed by kind (empty if nothing is cached)
+        """
+        return self._cache.get_statistics() if self._cache is not None else {}
+
+    def close(self):
+        """
+        Stops any persistent baton workers that have been started to serve requests made through this connection.
+        """
+        self._executor_pool.close()
+
+    def _baton_json_to_irods_entity(self, entity_as_baton_json: Dict) -> Union[DataObject, Collection]:
+        """
+        Converts the baton representation of a data object or collection to a model of the entity.
+        :param entity_as_baton_json: the baton serialization representation of the entity
+        :return: the equivalent model
+        """
+        if BATON_DATA_OBJECT_PROPERTY in entity_as_baton_json:
+            return self.data_object._baton_json_to_irods_entity(entity_as_baton_json)
+        return self.collection._baton_json_to_irods_entity(entity_as_baton_json)
+
+
+class AsyncConnection:
+    """
+    Pseudo connection to iRODS, where queries are coroutines that run baton using asyncio subprocesses.
+
+    Must be created in the thread that runs the event loop that it is to be used with.
+    """
+    def __init__(self, baton_binaries_directory: str, skip_baton_binaries_validation: bool=False,
+                 timeout_queries_after: timedelta=None, max_concurrent_queries: int=None):
         """
         Constructor.
         :param baton_binaries_directory: the directory host of the baton binaries
         :param skip_baton_binaries_validation: whether checks on if the correct baton binaries exist within the given
         directory should be skipped
+        :param timeout_queries_after: time after which a query is timed out, killing its baton process and raising
+        `subprocess.TimeoutExpired` (`None` if queries should not be timed out)
+        :param max_concurrent_queries: the maximum number of baton processes that can run at the same time using this
+        connection (`None` if unlimited)
         """
-        self.data_object = BatonDataObjectMapper(baton_binaries_directory, skip_baton_binaries_validation)
-        self.collection = BatonCollectionMapper(baton_binaries_directory, skip_baton_binaries_validation)
-        self.specific_query = BatonSpecificQueryMapper(baton_binaries_directory, skip_baton_binaries_validation)
+        if max_concurrent_queries is not None and max_concurrent_queries < 1:
+            raise ValueError(
+                "Maximum number of concurrent queries must be at least 1: %d given" % max_concurrent_queries)
+        semaphore = asyncio.Semaphore(max_concurrent_queries) if max_concurrent_queries is not None else None
+        runner_args = (baton_binaries_directory, skip_baton_binaries_validation, timeout_queries_after, semaphore)
+        self.data_object = AsyncBatonDataObjectMapper(*runner_args)
+        self.collection = AsyncBatonCollectionMapper(*runner_args)
+        self.specific_query = AsyncBatonSpecificQueryMapper(*runner_args)
 
 
-def connect_to_irods_with_baton(baton_binaries_directory: str, skip_baton_binaries_validation: bool=False) \
-        -> Connection:
+def connect_to_irods_with_baton(baton_binaries_directory: str, skip_baton_binaries_validation: bool=False,
+                                **kwargs) -> Connection:
     """
     Convenience method to create a pseudo connection to iRODS.
     :param baton_binaries_directory: see `Connection.__init__`
     :param skip_baton_binaries_validation: see `Connection.__init__`
+    :param kwargs: see `Connection.__init__`
     :return: pseudo connection to iRODS
     """
-    return Connection(baton_binaries_directory, skip_baton_binaries_validation)
+    return Connection(baton_binaries_directory, skip_baton_binaries_validation, **kwargs)
@@ -0,0 +1,332 @@
+import asyncio
+from abc import ABCMeta
+from typing import Union, Iterable, Sequence, List, Set, Type, Dict, Optional
+
+from baton._baton._async_baton_runner import AsyncBatonRunner
+from baton._baton._baton_runner import BatonBinary
+from baton._baton._query_planner import plan_metadata_query, Metaquery
+from baton._baton._constants import BATON_LIST_AVU_FLAG, BATON_METAMOD_OPERATION_ADD, BATON_METAMOD_OPERATION_REMOVE, \
+    BATON_LIST_ACCESS_CONTROLS_FLAG, BATON_CHMOD_RECURSIVE_FLAG, IRODS_SPECIFIC_QUERY_LS
+from baton._baton.baton_access_control_mappers import _BatonAccessControlMapper, BatonCollectionAccessControlMapper
+from baton._baton.baton_custom_object_mappers import BatonSpecificQueryMapper
+from baton._baton.baton_entity_mappers import _BatonIrodsEntityMapper, BatonDataObjectMapper, BatonCollectionMapper
+from baton._baton.baton_metadata_mappers import _BatonIrodsMetadataMapper
+from baton._baton.metadata_statistics import IrodsMetadataStatistics
+from baton.collections import IrodsMetadata, IrodsEntityColumns
+from baton.models import AccessControl, User, SpecificQuery, PreparedSpecificQuery, MetadataQuery
+from baton.types import EntityType
+
+
+class AsyncBatonIrodsMetadataMapper(AsyncBatonRunner):
+    """
+    Asynchronous iRODS metadata mapper, implemented using baton. Mirrors `IrodsMetadataMapper`, with methods returning
+    awaitables.
+    """
+    def __init__(self, synchronous_mapper: _BatonIrodsMetadataMapper, *args, **kwargs):
+        """
+        Constructor.
+        :param synchronous_mapper: the equivalent synchronous mapper, used to create queries and decode results
+        """
+        super().__init__(*args, **kwargs)
+        self._synchronous_mapper = synchronous_mapper
+
+    async def get_all(self, paths: Union[str, Sequence[str]]) -> Union[IrodsMetadata, List[IrodsMetadata]]:
+        single_path = False
+        if isinstance(paths, str):
+            paths = [paths]
+            single_path = True
+
+        metadata_for_paths = await self._get_all(paths)
+
+        return metadata_for_paths[0] if single_path else metadata_for_paths
+
+    async def add(self, paths: Union[str, Iterable[str]], metadata: Union[IrodsMetadata, List[IrodsMetadata]]):
+        await self._modify(paths, metadata, BATON_METAMOD_OPERATION_ADD)
+
+    async def set(self, paths: Union[str, Iterable[str]], metadata: Union[IrodsMetadata, List[IrodsMetadata]]):
+        # Not transactional: see `_BatonIrodsMetadataMapper.set`
+        paths = [paths] if isinstance(paths, str) else list(paths)
+        if isinstance(metadata, IrodsMetadata):
+            metadata = [metadata for _ in paths]
+        elif len(paths) != len(metadata):
+            raise ValueError("Metadata not supplied for all paths - either supply a single IrodsMetadata collection "
+                             "to apply for all paths or supply a collection for each path")
+
+        existing_metadatas = await self._get_all(paths)
+        paths_with_metadata_to_remove, metadatas_to_remove, paths_with_metadata_to_add, metadatas_to_add = \
+            self._synchronous_mapper._create_set_changes(paths, metadata, existing_metadatas)
+        if len(paths_with_metadata_to_remove) > 0:
+            await self.remove(paths_with_metadata_to_remove, metadatas_to_remove)
+        if len(paths_with_metadata_to_add) > 0:
+            await self.add(paths_with_metadata_to_add, metadatas_to_add)
+
+    async def remove(self, paths: Union[str, Iterable[str]], metadata: Union[IrodsMetadata, List[IrodsMetadata]]):
+        await self._modify(paths, metadata, BATON_METAMOD_OPERATION_REMOVE)
+
+    async def remove_all(self, paths: Union[str, Iterable[str]]):
+        metadata_for_paths = await self.get_all(paths)
+        await self._modify(paths, metadata_for_paths, BATON_METAMOD_OPERATION_REMOVE)
+
+    async def _get_all(self, paths: Sequence[str]) -> List[IrodsMetadata]:
+        """
+        See `_BatonIrodsMetadataMapper._get_all`. Always bypasses any cache of the synchronous mapper.
+        """
+        baton_in_json = self._synchronous_mapper._create_get_all_input(paths)
+        baton_out_as_json = await self.run_baton_query(
+            BatonBinary.BATON_LIST, [BATON_LIST_AVU_FLAG], input_data=baton_in_json)
+        assert len(baton_out_as_json) == len(paths)
+        return self._synchronous_mapper._baton_json_to_irods_metadata(baton_out_as_json)
+
+    async def _modify(self, paths: Union[str, List[str]],
+                      metadata_for_paths: Union[IrodsMetadata, List[IrodsMetadata]], operation: str):
+        """
+        See `_BatonIrodsMetadataMapper._modify`.
+        """
+        arguments, baton_in_json = self._synchronous_mapper._create_modify_query(paths, metadata_for_paths, operation)
+        await self.run_baton_query(BatonBinary.BATON_METAMOD, arguments, input_data=baton_in_json)
+
+
+class AsyncBatonAccessControlMapper(AsyncBatonRunner):
+    """
+    Asynchronous access control mapper, implemented using baton. Mirrors `AccessControlMapper`, with methods returning
+    awaitables.
+    """
+    def __init__(self, synchronous_mapper: _BatonAccessControlMapper, *args, **kwargs):
+        """
+        Constructor.
+        :param synchronous_mapper: the equivalent synchronous mapper, used to create queries and decode results
+        """
+        super().__init__(*args, **kwargs)
+        self._synchronous_mapper = synchronous_mapper
+
+    async def get_all(self, paths: Union[str, Sequence[str]]) \
+            -> Union[Set[AccessControl], Sequence[Set[AccessControl]]]:
+        single_path = False
+        if isinstance(paths, str):
+            single_path = True
+            paths = [paths]
+
+        baton_in_json = self._synchronous_mapper._create_get_all_input(paths)
+        baton_out_as_json = await self.run_baton_query(
+            BatonBinary.BATON_LIST, [BATON_LIST_ACCESS_CONTROLS_FLAG], input_data=baton_in_json)
+        assert len(baton_out_as_json) == len(paths)
+        access_controls_for_paths = self._synchronous_mapper._baton_json_to_access_controls(baton_out_as_json)
+
+        return access_controls_for_paths[0] if single_path else access_controls_for_paths
+
+    async def add_or_replace(self, paths: Union[str, Iterable[str]],
+                             access_controls: Union[AccessControl, Iterable[AccessControl]]):
+        await self._add_or_replace(paths, access_controls, False)
+
+    async def set(self, paths: Union[str, Iterable[str]],
+                  access_controls: Union[AccessControl, Iterable[AccessControl]]):
+        await self._set(paths, access_controls, False)
+
+    async def revoke(self, paths: Union[str, Iterable[str]], users: Union[str, Iterable[str], User, Iterable[User]]):
+        await self._revoke(paths, users, False)
+
+    async def revoke_all(self, paths: Union[str, Iterable[str]]):
+        await self._revoke_all(paths, False)
+
+    async def _add_or_replace(self, paths: Union[str, Iterable[str]],
+                              access_controls: Union[AccessControl, Iterable[AccessControl]], recursive: bool):
+        """
+        See `AccessControlMapper.add_or_replace`.
+        :param recursive: whether the change should be applied recursively
+        """
+        baton_in_json = self._synchronous_mapper._create_chmod_input(paths, access_controls)
+        await self._run_baton_chmod(baton_in_json, recursive)
+
+    async def _set(self, paths: Union[str, Iterable[str]],
+                   access_controls: Union[AccessControl, Iterable[AccessControl]], recursive: bool):
+        """
+        See `AccessControlMapper.set`.
+        :param recursive: whether the change should be applied recursively
+        """
+        if isinstance(paths, str):
+            paths = [paths]
+        await self._revoke_all(paths, recursive)
+        baton_in_json = self._synchronous_mapper._create_chmod_input(paths, access_controls)
+        await self._run_baton_chmod(baton_in_json, recursive)
+
+    async def _revoke(self, paths: Union[str, Iterable[str]], users: Union[str, Iterable[str], User, Iterable[User]],
+                      recursive: bool):
+        """
+        See `AccessControlMapper.revoke`.
+        :param recursive: whether the change should be applied recursively
+        """
+        no_access_controls = self._synchronous_mapper._create_revoke_access_controls(users)
+        await self._add_or_replace(paths, no_access_controls, recursive)
+
+    async def _revoke_all(self, paths: Union[str, Iterable[str]], recursive: bool):
+        """
+        See `AccessControlMapper.revoke_all`.
+        :param recursive: whether the change should be applied recursively
+        """
+        if isinstance(paths, str):
+            paths = [paths]
+        access_controls_for_paths = await self.get_all(paths)
+        baton_in_json = self._synchronous_mapper._create_revoke_all_input(paths, access_controls_for_paths)
+        await self._run_baton_chmod(baton_in_json, recursive)
+
+    async def _run_baton_chmod(self, baton_in_json: List, recursive: bool):
+        """
+        Runs baton-chmod with the given input.
+        :param baton_in_json: the input to baton-chmod
+        :param recursive: whether the change should be applied recursively
+        """
+        arguments = [BATON_CHMOD_RECURSIVE_FLAG] if recursive else []
+        await self.run_baton_query(BatonBinary.BATON_CHMOD, arguments, input_data=baton_in_json)
+
+
+class AsyncBatonCollectionAccessControlMapper(AsyncBatonAccessControlMapper):
+    """
+    Asynchronous access control mapper for controls relating specifically to collections, implemented using baton.
+    Mirrors `CollectionAccessControlMapper`, with methods returning awaitables.
+    """
+    async def add_or_replace(self, paths: Union[str, Iterable[str]],
+                             access_controls: Union[AccessControl, Iterable[AccessControl]], recursive: bool=False):
+        await self._add_or_replace(paths, access_controls, recursive)
+
+    async def set(self, paths: Union[str, Iterable[str]],
+                  access_controls: Union[AccessControl, Iterable[AccessControl]], recursive: bool=False):
+        await self._set(paths, access_controls, recursive)
+
+    async def revoke(self, paths: Union[str, Iterable[str]], users: Union[str, Iterable[str], User, Iterable[User]],
+                     recursive: bool=False):
+        await self._revoke(paths, users, recursive)
+
+    async def revoke_all(self, paths: Union[str, Iterable[str]], recursive: bool=False):
+        await self._revoke_all(paths, recursive)
+
+
+class _AsyncBatonIrodsEntityMapper(AsyncBatonRunner, metaclass=ABCMeta):
+    """
+    Asynchronous mapper for iRODS entities, implemented using baton. Mirrors `IrodsEntityMapper`, with methods
+    returning awaitables.
+    """
+    def __init__(self, synchronous_mapper_type: Type[_BatonIrodsEntityMapper], baton_binaries_directory: str,
+                 *args, **kwargs):
+        """
+        Constructor.
+        :param synchronous_mapper_type: the type of the equivalent synchronous mapper, used to create queries and
+        decode results
+        :param baton_binaries_directory: the host of baton's binaries
+        """
+        super().__init__(baton_binaries_directory, *args, **kwargs)
+        self._synchronous_mapper = synchronous_mapper_type(
+            baton_binaries_directory, skip_baton_binaries_validation=True)
+        self._metadata_mapper = AsyncBatonIrodsMetadataMapper(
+            self._synchronous_mapper.metadata, baton_binaries_directory, True, self.timeout_queries_after,
+            self._semaphore)
+
+    @property
+    def metadata(self) -> AsyncBatonIrodsMetadataMapper:
+        return self._metadata_mapper
+
+    async def get_by_metadata(self, metadata_search_criteria: MetadataQuery, load_metadata: bool=True, zone: str=None,
+                              as_columns: bool=False, metadata_columns: Iterable[str]=None,
+                              metadata_statistics: IrodsMetadataStatistics=None) \
+            -> Union[Sequence[EntityType], IrodsEntityColumns]:
+        """
+        See `BatonDataObjectMapper.get_by_metadata`. The metaqueries that the query is split into run concurrently.
+        """
+        metaqueries = plan_metadata_query(metadata_search_criteria, metadata_statistics)
+        baton_outs_as_json = await asyncio.gather(*(
+            self._run_metaquery(metaquery, load_metadata, zone) for metaquery in metaqueries))
+
+        if len(baton_outs_as_json) == 1 and len(metaqueries[0].local_search_criteria) == 0:
+            baton_out_as_json = baton_outs_as_json[0]
+        else:
+            baton_out_as_json = list(self._synchronous_mapper._filter_metaquery_baton_outs(
+                metaqueries, baton_outs_as_json, load_metadata, None))
+        return self._synchronous_mapper._baton_json_to_irods_entities(baton_out_as_json, as_columns, metadata_columns)
+
+    async def get_by_path(self, paths: Union[str, Iterable[str]], load_metadata: bool=True) \
+            -> Union[EntityType, Sequence[EntityType]]:
+        single_path = False
+        if isinstance(paths, str):
+            paths = [paths]
+            single_path = True
+        if len(paths) == 0:
+            return []
+
+        arguments, baton_json = self._synchronous_mapper._create_get_by_path_query(paths, load_metadata)
+        baton_out_as_json = await self.run_baton_query(BatonBinary.BATON_LIST, arguments, input_data=baton_json)
+        irods_entities = self._synchronous_mapper._baton_json_to_irods_entities(baton_out_as_json)
+
+        return irods_entities[0] if single_path else irods_entities
+
+    async def get_all_in_collection(self, collection_paths: Union[str, Iterable[str]], load_metadata: bool=True,
+                                    as_columns: bool=False, metadata_columns: Iterable[str]=None) \
+            -> Union[Sequence[EntityType], IrodsEntityColumns]:
+        if isinstance(collection_paths, str):
+            collection_paths = [collection_paths]
+        if len(collection_paths) == 0:
+            return IrodsEntityColumns(metadata_columns) if as_columns else []
+
+        arguments, baton_json = self._synchronous_mapper._create_get_all_in_collection_query(
+            collection_paths, load_metadata)
+        baton_out_as_json = await self.run_baton_query(BatonBinary.BATON_LIST, arguments, input_data=baton_json)
+        return self._synchronous_mapper._baton_json_to_irods_entities_in_collections(
+            baton_out_as_json, as_columns, metadata_columns)
+
+
+    async def _run_metaquery(self, metaquery: Metaquery, load_metadata: bool, zone: Optional[str]) -> List[Dict]:
+        """
+        See `_BatonIrodsEntityMapper._run_metaquery` (results are not cached).
+        """
+        load_metadata, _ = self._synchronous_mapper._get_metaquery_load_options(metaquery, load_metadata, None)
+        arguments, baton_json = self._synchronous_mapper._create_get_by_metadata_query(
+            metaquery.search_criteria, load_metadata, zone)
+        return await self.run_baton_query(BatonBinary.BATON_METAQUERY, arguments, input_data=baton_json)
+
+
+class AsyncBatonDataObjectMapper(_AsyncBatonIrodsEntityMapper):
+    """
+    Asynchronous iRODS data object mapper, implemented using baton.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(BatonDataObjectMapper, *args, **kwargs)
+        self._access_control_mapper = AsyncBatonAccessControlMapper(
+            self._synchronous_mapper.access_control, self._baton_binaries_directory, True, self.timeout_queries_after,
+            self._semaphore)
+
+    @property
+    def access_control(self) -> AsyncBatonAccessControlMapper:
+        return self._access_control_mapper
+
+
+class AsyncBatonCollectionMapper(_AsyncBatonIrodsEntityMapper):
+    """
+    Asynchronous iRODS collection mapper, implemented using baton.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(BatonCollectionMapper, *args, **kwargs)
+        self._access_control_mapper = AsyncBatonCollectionAccessControlMapper(
+            BatonCollectionAccessControlMapper(self._baton_binaries_directory, skip_baton_binaries_validation=True),
+            self._baton_binaries_directory, True, self.timeout_queries_after, self._semaphore)
+
+    @property
+    def access_control(self) -> AsyncBatonCollectionAccessControlMapper:
+        return self._access_control_mapper
+
+
+class AsyncBatonSpecificQueryMapper(AsyncBatonRunner):
+    """
+    Asynchronous mapper for specific queries installed on iRODS, implemented using baton. Mirrors
+    `SpecificQueryMapper`, with methods returning awaitables.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._synchronous_mapper = BatonSpecificQueryMapper(
+            self._baton_binaries_directory, skip_baton_binaries_validation=True)
+
+    async def get_all(self, zone: str=None) -> Sequence[SpecificQuery]:
+        retrieve_query = PreparedSpecificQuery(IRODS_SPECIFIC_QUERY_LS)
+        arguments, specific_query_as_baton_json = self._synchronous_mapper._create_specific_query_query(
+            retrieve_query, zone)
+        specific_queries_as_baton_json = await self.run_baton_query(
+            BatonBinary.BATON_SPECIFIC_QUERY, arguments, input_data=specific_query_as_baton_json)
+        return [self._synchronous_mapper._object_deserialiser(specific_query_as_baton_json)
+                for specific_query_as_baton_json in specific_queries_as_baton_json]
@@ -1,21 +1,18 @@
-import inspect
 from abc import ABCMeta, abstractmethod
-from typing import Iterable, Sequence, Union, Dict, Set, List, Any
+from typing import Iterable, Sequence, Union, Dict, Set, List
 
 from baton._baton._baton_runner import BatonRunner, BatonBinary
+from baton._baton._cache import TimedLruCache, ACCESS_CONTROLS_CACHE_KIND, METADATA_QUERY_CACHE_KIND
 from baton._baton._constants import BATON_ACL_PROPERTY, BATON_CHMOD_RECURSIVE_FLAG, BATON_LIST_ACCESS_CONTROLS_FLAG
-from baton._baton.json import DataObjectJSONEncoder, CollectionJSONEncoder, \
-    AccessControlSetJSONDecoder
+from baton._baton.json import DataObjectJSONEncoder, CollectionJSONEncoder, access_controls_from_baton_json
 from baton.mappers import AccessControlMapper, CollectionAccessControlMapper
-from baton.models import AccessControl, DataObject, IrodsEntity, Collection, User
+from baton.models import AccessControl, DataObject, IrodsEntity, Collection, User, BatchResult
 
 
 class _BatonAccessControlMapper(BatonRunner, AccessControlMapper, metaclass=ABCMeta):
     """
     Access control mapper, implemented using baton.
     """
-    _ACCESS_CONTROL_SET_JSON_ENCODER = AccessControlSetJSONDecoder()
-
     @abstractmethod
     def _create_entity_with_path(self, path: str) -> IrodsEntity:
         """
@@ -32,63 +29,185 @@ class _BatonAccessControlMapper(BatonRunner, AccessControlMapper, metaclass=ABCM
         :return: the JSON representation
         """
 
-    def get_all(self, paths: Union[str, Sequence[str]]) -> Union[Set[AccessControl], Sequence[Set[AccessControl]]]:
+    def __init__(self, *args, cache: TimedLruCache=None, **kwargs):
+        """
+        Constructor.
+        :param cache: cache of the access controls that have been retrieved, which is shared with other mappers of the
+        same connection (`None` if access controls are not to be cached)
+        """
+        super().__init__(*args, **kwargs)
+        self._cache = cache
+
+    def get_all(self, paths: Union[str, Sequence[str]], partial_results: bool=False) \
+            -> Union[Set[AccessControl], Sequence[Set[AccessControl]], BatchResult]:
+        """
+        See `AccessControlMapper.get_all`.
+        :param partial_results: whether to return a `BatchResult` holding the access controls of each path and the
+        error for each path whose access controls could not be retrieved, instead of raising the first error
+        """
         single_path = False
         if isinstance(paths, str):
             single_path = True
             paths = [paths]
 
-        baton_in_json = []
-        for path in paths:
-            baton_in_json.append(self._path_to_baton_json(path))
-
-        baton_out_as_json = self.run_baton_query(
-            BatonBinary.BATON_LIST, [BATON_LIST_ACCESS_CONTROLS_FLAG], input_data=baton_in_json)
-        assert len(baton_out_as_json) == len(paths)
-
-        access_controls_for_paths = []
-        for entity_as_baton_json in baton_out_as_json:
-            access_controls_as_baton_json = entity_as_baton_json[BATON_ACL_PROPERTY]
-            access_contorls = _BatonAccessControlMapper._ACCESS_CONTROL_SET_JSON_ENCODER.decode_parsed(
-                access_controls_as_baton_json)
-            access_controls_for_paths.append(access_contorls)
+        if self._cache is not None:
+            # Decoded access controls are shared and cannot be modified, so only the sets holding them need copying
+            batch_result = self._cache.get_or_load(
+                ACCESS_CONTROLS_CACHE_KIND, paths, lambda paths_to_load: self._get_all(paths_to_load, partial_results),
+                set)
+        else:
+            batch_result = self._get_all(paths, partial_results)
+        if partial_results:
+            return batch_result
+        access_controls_for_paths = [batch_result.successes[path] for path in paths]
 
         return access_controls_for_paths[0] if single_path else access_controls_for_paths
 
     def add_or_replace(self, paths: Union[str, Iterable[str]],
                        access_controls: Union[AccessControl, Iterable[AccessControl]]):
+        self._add_or_replace(paths, access_controls, False)
+
+    def set(self, paths: Union[str, Iterable[str]], access_controls: Union[AccessControl, Iterable[AccessControl]]):
+        self._set(paths, access_controls, False)
+
+    def revoke(self, paths: Union[str, Iterable[str]], users: Union[str, Iterable[str], User, Iterable[User]]):
+        self._revoke(paths, users, False)
+
+    def revoke_all(self, paths: Union[str, Iterable[str]]):
+        self._revoke_all(paths, False)
+
+    def _add_or_replace(self, paths: Union[str, Iterable[str]],
+                        access_controls: Union[AccessControl, Iterable[AccessControl]], recursive: bool):
+        """
+        See `add_or_replace`.
+        :param recursive: whether the change should be applied recursively
+        """
+        paths = [paths] if isinstance(paths, str) else list(paths)
+        baton_in_json = self._create_chmod_input(paths, access_controls)
+        self._run_baton_chmod(paths, baton_in_json, recursive)
+
+    def _set(self, paths: Union[str, Iterable[str]], access_controls: Union[AccessControl, Iterable[AccessControl]],
+             recursive: bool):
+        """
+        See `set`.
+        :param recursive: whether the change should be applied recursively
+        """
         if isinstance(paths, str):
             paths = [paths]
-        if isinstance(access_controls, AccessControl):
-            access_controls = [access_controls]
 
-        baton_in_json = []
-        for path in paths:
-            entity = self._create_entity_with_path(path)
-            entity.access_controls = access_controls
-            baton_in_json.append(self._entity_to_baton_json(entity))
-        self.run_baton_query(BatonBinary.BATON_CHMOD, input_data=baton_in_json)
+        # baton-chmod does a mix of set and add: adds if no level has been defined for a user, else sets if it has.
+        # Taking easiest route of starting from a blank slate
+        self._revoke_all(paths, recursive)
 
-    def set(self, paths: Union[str, Iterable[str]], access_controls: Union[AccessControl, Iterable[AccessControl]]):
+        baton_in_json = self._create_chmod_input(paths, access_controls)
+        self._run_baton_chmod(paths, baton_in_json, recursive)
+
+    def _revoke(self, paths: Union[str, Iterable[str]], users: Union[str, Iterable[str], User, Iterable[User]],
+                recursive: bool):
+        """
+        See `revoke`.
+        :param recursive: whether the change should be applied recursively
+        """
+        no_access_controls = self._create_revoke_access_controls(users)
+        self._add_or_replace(paths, no_access_controls, recursive)
+
+    def _revoke_all(self, paths: Union[str, Iterable[str]], recursive: bool):
+        """
+        See `revoke_all`.
+        :param recursive: whether the change should be applied recursively
+        """
+        if isinstance(paths, str):
+            paths = [paths]
+
+        # The current access controls are retrieved from iRODS, rather than from any cache, as all must be revoked
+        batch_result = self._get_all(paths, False)
+        access_controls_for_paths = [batch_result.successes[path] for path in paths]
+        baton_in_json = self._create_revoke_all_input(paths, access_controls_for_paths)
+        self._run_baton_chmod(paths, baton_in_json, recursive)
+
+    def _get_all(self, paths: Sequence[str], partial_results: bool) -> BatchResult:
+        """
+        Gets the access controls of the entities with the given paths from iRODS, bypassing any cache.
+        :param paths: the paths of the entities
+        :param partial_results: whether errors that baton expresses for some of the paths should be returned instead
+        of raised
+        :return: the access controls of each path and any errors
+        """
+        baton_in_json = self._create_get_all_input(paths)
+        baton_out_as_json = self.run_baton_query(
+            BatonBinary.BATON_LIST, [BATON_LIST_ACCESS_CONTROLS_FLAG], input_data=baton_in_json,
+            raise_errors=not partial_results)
+        assert len(baton_out_as_json) == len(paths)
+        return BatonRunner._create_batch_result(
+            paths, baton_out_as_json, lambda item: self._baton_json_to_access_controls([item])[0])
+
+    def _run_baton_chmod(self, paths: List[str], baton_in_json: List[Dict], recursive: bool):
+        """
+        Runs baton-chmod with the given input.
+        :param paths: the paths of the entities that are changed
+        :param baton_in_json: the input to baton-chmod
+        :param recursive: whether the change should be applied recursively
+        """
+        arguments = [BATON_CHMOD_RECURSIVE_FLAG] if recursive else []
+        try:
+            self.run_baton_query(BatonBinary.BATON_CHMOD, arguments, input_data=baton_in_json)
+        finally:
+            # Invalidated even if the change failed, as it may have been applied to some of the paths
+            if self._cache is not None:
+                self._cache.invalidate(ACCESS_CONTROLS_CACHE_KIND, paths)
+                # Metadata query results include the metadata and access controls of the matched entities
+                self._cache.invalidate_all(METADATA_QUERY_CACHE_KIND)
+                if recursive:
+                    self._cache.invalidate_paths_in(ACCESS_CONTROLS_CACHE_KIND, paths)
+
+    def _create_get_all_input(self, paths: Iterable[str]) -> List[Dict]:
+        """
+        Creates the input to baton-list that gets the access controls of the entities with the given paths.
+        :param paths: the paths of the entities
+        :return: the input to baton
+        """
+        return [self._path_to_baton_json(path) for path in paths]
+
+    def _baton_json_to_access_controls(self, entities_as_baton_json: List[Dict]) -> List[Set[AccessControl]]:
+        """
+        Converts the access controls in the baton representation of entities to `AccessControl` models.
+        :param entities_as_baton_json: the baton serialization representation of the entities
+        :return: the access controls of each entity
+        """
+        access_controls_for_paths = []
+        for entity_as_baton_json in entities_as_baton_json:
+            access_controls_as_baton_json = entity_as_baton_json[BATON_ACL_PROPERTY]
+            access_controls = access_controls_from_baton_json(access_controls_as_baton_json)
+            access_controls_for_paths.append(access_controls)
+        return access_controls_for_paths
+
+    def _create_chmod_input(self, paths: Union[str, Iterable[str]],
+                            access_controls: Union[AccessControl, Iterable[AccessControl]]) -> List[Dict]:
+        """
+        Creates the input to baton-chmod that applies the given access controls to the entities with the given paths.
+        :param paths: the paths of the entities
+        :param access_controls: the access controls to apply
+        :return: the input to baton
+        """
         if isinstance(paths, str):
             paths = [paths]
         if isinstance(access_controls, AccessControl):
             access_controls = [access_controls]
 
-        # baton-chmod does a mix of set and add: adds if no level has been defined for a user, else sets if it has.
-        # Taking easiest route of starting from a blank slate
-        self.revoke_all(paths)
-
         baton_in_json = []
         for path in paths:
             entity = self._create_entity_with_path(path)
             entity.access_controls = access_controls
             baton_in_json.append(self._entity_to_baton_json(entity))
-        self.run_baton_query(BatonBinary.BATON_CHMOD, input_data=baton_in_json)
+        return baton_in_json
 
-    def revoke(self, paths: Union[str, Iterable[str]], users: Union[str, Iterable[str], User, Iterable[User]]):
-        if isinstance(paths, str):
-            paths = [paths]
+    def _create_revoke_access_controls(self, users: Union[str, Iterable[str], User, Iterable[User]]) \
+            -> List[AccessControl]:
+        """
+        Creates the access controls that revoke the access of the given users.
+        :param users: the users to revoke access controls for
+        :return: the access controls
+        """
         if isinstance(users, str) or isinstance(users, User):
             users = [users]
 
@@ -98,25 +217,26 @@ class _BatonAccessControlMapper(BatonRunner, AccessControlMapper, metaclass=ABCM
                 user = User.create_from_str(users[i])
                 users[i] = user
 
-        no_access_controls = [AccessControl(users, AccessControl.Level.NONE) for users in users]
-        self.add_or_replace(paths, no_access_controls)
-
-    def revoke_all(self, paths: Union[str, Iterable[str]]):
-        if isinstance(paths, str):
-            paths = [paths]
-
-        access_controls_for_paths = self.get_all(paths)
+        return [AccessControl(users, AccessControl.Level.NONE) for users in users]
 
+    def _create_revoke_all_input(self, paths: List[str], access_controls_for_paths: List[Set[AccessControl]]) \
+            -> List[Dict]:
+        """
+        Creates the input to baton-chmod that revokes all of the given access controls from the entity with the path
+        with the corresponding index.
+        :param paths: the paths of the entities
+        :param access_controls_for_paths: the current access controls of the entities
+        :return: the input to baton
+        """
         baton_in_json = []
         for i in range(len(access_controls_for_paths)):
             access_controls = access_controls_for_paths[i]
             path = paths[i]
-            for access_control in access_controls:
-                access_control.level = AccessControl.Level.NONE
             entity = self._create_entity_with_path(path)
-            entity.access_controls = access_controls
+            entity.access_controls = [AccessControl(access_control.user, AccessControl.Level.NONE)
+                                      for access_control in access_controls]
             baton_in_json.append(self._entity_to_baton_json(entity))
-        self.run_baton_query(BatonBinary.BATON_CHMOD, input_data=baton_in_json)
+        return baton_in_json
 
     def _path_to_baton_json(self, path: str) -> Dict:
         """
@@ -143,90 +263,23 @@ class BatonCollectionAccessControlMapper(_BatonAccessControlMapper, CollectionAc
     """
     Access control mapper for controls relating specifically to collections, implemented using baton.
     """
-    # Note: In hindsight, the hijacking of the recursive chmod request was more complex than initially thought.
-    # Complexity is of course never a good thing as it increases the chance that a bug is hiding in here somewhere (for
-    # example, will this hijacking still work if the code is compiled?). The alternative to this method would be to
-    # modify the superclass and make it accept arguments that it uses when `run_baton_query` is called. Given that the
-    # current solution has so far shown itself to work as expected, there is little point changing this until issues
-    # are found with it.
-    def __init__(self, *args, **kwargs):
-        """
-        Constructor.
-        """
-        super().__init__(*args, **kwargs)
-        self._original_run_baton_query = self.run_baton_query
-        self._hijack_frame_ids = set()    # type: Set[int]
-        self.run_baton_query = self._hijacked_run_baton_query
-
     def set(self, paths: Union[str, Iterable[str]], access_controls: Union[AccessControl, Iterable[AccessControl]],
             recursive: bool=False):
-        if recursive:
-            self._do_recursive(super().set, paths, access_controls)
-        else:
-            super().set(paths, access_controls)
+        self._set(paths, access_controls, recursive)
 
     def add_or_replace(self, paths: Union[str, Iterable[str]],
                        access_controls: Union[AccessControl, Iterable[AccessControl]], recursive: bool=False):
-        if recursive:
-            self._do_recursive(super().add_or_replace, paths, access_controls)
-        else:
-            super().add_or_replace(paths, access_controls)
+        self._add_or_replace(paths, access_controls, recursive)
 
     def revoke(self, paths: Union[str, Iterable[str]], users: Union[str, Iterable[str], User, Iterable[User]],
                recursive: bool=False):
-        if recursive:
-            self._do_recursive(super().revoke, paths, users)
-        else:
-            super().revoke(paths, users)
+        self._revoke(paths, users, recursive)
 
     def revoke_all(self, paths: Union[str, Iterable[str]], recursive: bool=False):
-        if recursive:
-            self._do_recursive(super().revoke_all, paths)
-        else:
-            super().revoke_all(paths)
+        self._revoke_all(paths, recursive)
 
-    def _create_entity_with_path(self, path: str) -> DataObject:
+    def _create_entity_with_path(self, path: str) -> Collection:
         return Collection(path)
 
     def _entity_to_baton_json(self, entity: Collection) -> Dict:
         return CollectionJSONEncoder().default(entity)
-
-    def _do_recursive(self, method_that_runs_baton_chmod: callable, *args, **kwargs):
-        """
-        Adds the `--recursive` argument to all calls to `baton-chmod`.
-        :param method_that_runs_baton_chmod: the method that, at a lower level, calls out to baton-chmod
-        :param args: positional arguments to call given method with
-        :param kwargs: named arguments to call given method with
-        """
-        current_frame_id = id(inspect.currentframe())
-        try:
-            self._hijack_frame_ids.add(current_frame_id)
-            method_that_runs_baton_chmod(*args, **kwargs)
-        finally:
-            self._hijack_frame_ids.remove(current_frame_id)
-
-    def _hijacked_run_baton_query(
-            self, baton_binary: BatonBinary, program_arguments: List[str]=None, input_data: Any=None) -> List[Dict]:
-        """
-        Hijacked `run_baton_query` method with hijacking to add the `--recursive` flag to calls to `baton-chmod` that
-        originate from code called from frames with the ids in `self._hijack_frame_ids`.
-        :param baton_binary: see `BatonRunner.run_baton_query`
-        :param program_arguments: see `BatonRunner.run_baton_query`
-        :param input_data: see `BatonRunner.run_baton_query`
-        :return: see `BatonRunner.run_baton_query`
-        """
-        if baton_binary == BatonBinary.BATON_CHMOD:
-            current_frame = inspect.currentframe()
-
-            def frame_code_in_same_file(frame) -> bool:
-                return frame_back.f_code.co_filename == current_frame.f_code.co_filename
-
-            frame_back = current_frame.f_back
-            assert frame_code_in_same_file(frame_back)
-
-            while frame_back is not None and frame_code_in_same_file(frame_back):
-                if id(frame_back) in self._hijack_frame_ids:
-                    return self._original_run_baton_query(baton_binary, [BATON_CHMOD_RECURSIVE_FLAG], input_data)
-                frame_back = frame_back.f_back
-
-        return self._original_run_baton_query(baton_binary, program_arguments, input_data)
@@ -1,5 +1,5 @@
 from abc import ABCMeta, abstractmethod
-from typing import Sequence
+from typing import Sequence, Optional, Tuple, List, Dict
 
 from baton._baton._baton_runner import BatonRunner, BatonBinary
 from baton._baton._constants import BATON_SPECIFIC_QUERY_PROPERTY, IRODS_SPECIFIC_QUERY_LS
@@ -24,6 +24,23 @@ class BatonCustomObjectMapper(BatonRunner, CustomObjectMapper[CustomObjectType],
 
     def _get_with_prepared_specific_query(self, specific_query: PreparedSpecificQuery, zone: str=None) \
             -> Sequence[CustomObjectType]:
+        arguments, specific_query_as_baton_json = self._create_specific_query_query(specific_query, zone)
+        custom_objects_as_baton_json = self.run_baton_query(
+                BatonBinary.BATON_SPECIFIC_QUERY, arguments, input_data=specific_query_as_baton_json)
+
+        custom_objects = [self._object_deserialiser(custom_object_as_baton_json)
+                          for custom_object_as_baton_json in custom_objects_as_baton_json]
+
+        return custom_objects
+
+    def _create_specific_query_query(self, specific_query: PreparedSpecificQuery, zone: Optional[str]) \
+            -> Tuple[List[str], Dict]:
+        """
+        Creates the baton-specificquery query that runs the given specific query.
+        :param specific_query: the specific query to run
+        :param zone: limit query to specific zone in iRODS
+        :return: tuple where the first element is the arguments to use with baton and the second is the input to baton
+        """
         specific_query_as_baton_json = {
             BATON_SPECIFIC_QUERY_PROPERTY: PreparedSpecificQueryJSONEncoder().default(specific_query)
         }
@@ -32,13 +49,7 @@ class BatonCustomObjectMapper(BatonRunner, CustomObjectMapper[CustomObjectType],
         if zone is not None:
             arguments.extend(["--zone", "%s" % zone])
 
-        custom_objects_as_baton_json = self.run_baton_query(
-                BatonBinary.BATON_SPECIFIC_QUERY, arguments, input_data=specific_query_as_baton_json)
-
-        custom_objects = [self._object_deserialiser(custom_object_as_baton_json)
-                          for custom_object_as_baton_json in custom_objects_as_baton_json]
-
-        return custom_objects
+        return arguments, specific_query_as_baton_json
 
 
 class BatonSpecificQueryMapper(BatonCustomObjectMapper[SpecificQuery], SpecificQueryMapper):
@@ -1,18 +1,36 @@
 import collections
 from abc import ABCMeta, abstractmethod
-from typing import List, Union, Iterable, Sequence, Dict
+from concurrent.futures import ThreadPoolExecutor, Future
+from itertools import islice
+from typing import List, Union, Iterable, Sequence, Dict, Tuple, Optional, Iterator, Hashable, Set, FrozenSet
 
 from baton._baton._baton_runner import BatonRunner, BatonBinary
-from baton._baton._constants import BATON_AVU_PROPERTY, BATON_COLLECTION_CONTENTS, BATON_DATA_OBJECT_PROPERTY
+from baton._baton._cache import TimedLruCache, METADATA_QUERY_CACHE_KIND
+from baton._baton._constants import BATON_AVU_PROPERTY, BATON_COLLECTION_CONTENTS, BATON_DATA_OBJECT_PROPERTY, \
+    BATON_ENTITY_PROPERTY_FLAGS, BATON_ERROR_PROPERTY, BATON_ERROR_MESSAGE_KEY, BATON_ERROR_CODE_KEY, \
+    IRODS_ERROR_USER_FILE_DOES_NOT_EXIST
+from baton._baton._query_planner import plan_metadata_query, matches_baton_json, Metaquery
 from baton._baton.baton_access_control_mappers import BatonDataObjectAccessControlMapper
 from baton._baton.baton_metadata_mappers import BatonDataObjectIrodsMetadataMapper, BatonCollectionIrodsMetadataMapper
 from baton._baton.json import SearchCriterionJSONEncoder, CollectionJSONEncoder, DataObjectJSONEncoder, \
-    DataObjectJSONDecoder, CollectionJSONDecoder
+    data_object_from_baton_json, collection_from_baton_json, irods_entity_columns_from_baton_json, \
+    path_from_baton_json, irods_entity_stat_from_baton_json
+from baton._baton.metadata_statistics import IrodsMetadataStatistics
+from baton.collections import IrodsEntityColumns, ExistenceBitmap
 from baton.mappers import IrodsEntityMapper, IrodsMetadataMapper, DataObjectMapper, CollectionMapper, \
     AccessControlMapper
-from baton.models import SearchCriterion, Collection, DataObject
+from baton.models import SearchCriterion, Collection, DataObject, BatchResult, MetadataQuery, IrodsEntity, \
+    IrodsEntityStat
 from baton.types import EntityType
 
+# Number of paths taken at a time from the paths given to `exists` and `stat`, which are queried together
+PATHS_PER_STREAMED_QUERY = 10000
+
+# Defaults for when `get_by_path` lists the contents of a collection, instead of each requested path within it: at least
+# this many paths must be requested in the collection and they must be at least this fraction of its contents
+MIN_PATHS_TO_LIST_COLLECTION = 100
+MIN_COVERAGE_TO_LIST_COLLECTION = 0.5
+
 
 class _BatonIrodsEntityMapper(BatonRunner, IrodsEntityMapper, metaclass=ABCMeta):
     """
@@ -42,16 +60,408 @@ class _BatonIrodsEntityMapper(BatonRunner, IrodsEntityMapper, metaclass=ABCMeta)
         :return: extracted entities as baton JSON
         """
 
-    def __init__(self, additional_metadata_query_arguments: List[str], *args, **kwargs):
+    def __init__(self, additional_metadata_query_arguments: List[str], *args, lazy_decoding: bool=False,
+                 cache: TimedLruCache=None, **kwargs):
         """
         Constructor.
         :param additional_metadata_query_arguments: TODO
+        :param lazy_decoding: whether the access controls, metadata and replicas of retrieved entities should only be
+        decoded from baton's output when they are first used
+        :param cache: cache, shared with other mappers of the same connection, of the results of metadata queries
+        (`None` if they are not to be cached)
         """
         super().__init__(*args, **kwargs)
         self._additional_metadata_query_arguments = additional_metadata_query_arguments
+        self._lazy_decoding = lazy_decoding
+        self._cache = cache
+        # See `_get_by_path_as_baton_json` (`None` to never list collections instead of paths)
+        self.min_paths_to_list_collection = MIN_PATHS_TO_LIST_COLLECTION
+        self.min_coverage_to_list_collection = MIN_COVERAGE_TO_LIST_COLLECTION
+
+    def get_by_metadata(self, metadata_search_criteria: MetadataQuery, load_metadata: bool=True, zone: str=None,
+                        as_columns: bool=False, metadata_columns: Iterable[str]=None,
+                        metadata_statistics: IrodsMetadataStatistics=None,
+                        load_properties: Iterable[IrodsEntity.Property]=None) \
+            -> Union[Sequence[EntityType], IrodsEntityColumns]:
+        """
+        See `IrodsEntityMapper.get_by_metadata`.
+
+        As well as a conjunction of search criteria, a metadata query may be an expression made from `AllOf`, `AnyOf`,
+        `In` and `Between`, or a conjunction with many criteria on the same attribute. Such queries are split into the
+        fewest metaqueries that baton can run, which are run in parallel; their results are filtered by any criteria
+        that baton could not be given and deduplicated by path.
+        :param metadata_search_criteria: the metadata query
+        :param metadata_statistics: statistics about how common metadata values are, with which the query is planned
+        such that, if a query has a selective criterion (e.g. an identifier), broad criteria are evaluated locally on
+        the results of the selective criteria rather than by baton (`None` to give baton all the criteria it can take)
+        :param load_properties: see `get_by_path`
+        """
+        if load_properties is not None:
+            load_properties = frozenset(load_properties)
+        metaqueries = plan_metadata_query(metadata_search_criteria, metadata_statistics)
+        if len(metaqueries) <= 1:
+            baton_outs_as_json = [self._run_metaquery(metaquery, load_metadata, zone, load_properties)
+                                  for metaquery in metaqueries]
+        else:
+            with ThreadPoolExecutor(max_workers=min(len(metaqueries), self._get_max_parallel_queries())) as thread_pool:
+                futures = [thread_pool.submit(self._run_metaquery, metaquery, load_metadata, zone, load_properties)
+                           for metaquery in metaqueries]
+                try:
+                    baton_outs_as_json = [future.result() for future in futures]
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+
+        if len(baton_outs_as_json) == 1 and len(metaqueries[0].local_search_criteria) == 0:
+            baton_out_as_json = baton_outs_as_json[0]
+        else:
+            baton_out_as_json = list(self._filter_metaquery_baton_outs(
+                metaqueries, baton_outs_as_json, load_metadata, load_properties))
+        return self._baton_json_to_irods_entities(baton_out_as_json, as_columns, metadata_columns)
+
+    def get_by_path(self, paths: Union[str, Iterable[str]], load_metadata: bool=True, partial_results: bool=False,
+                    load_properties: Iterable[IrodsEntity.Property]=None) \
+            -> Union[EntityType, Sequence[EntityType], BatchResult]:
+        """
+        See `IrodsEntityMapper.get_by_path`.
+        :param partial_results: whether to return a `BatchResult` holding the entity at each path and the error for
+        each path whose entity could not be retrieved (e.g. `FileNotFoundError`), instead of raising the first error
+        :param load_properties: the properties of the entities to load from iRODS (`None` for all). Properties that are
+        not loaded are `None` on the retrieved entities. Replicas are loaded with timestamps, as they are properties of
+        replicas. Metadata is only loaded if it is also requested with `load_metadata`
+        """
+        single_path = False
+        if isinstance(paths, str):
+            paths = [paths]
+            single_path = True
+        if len(paths) == 0:
+            return BatchResult() if partial_results else []
+
+        arguments, baton_json = self._create_get_by_path_query(paths, load_metadata, load_properties)
+        baton_out_as_json = self._get_by_path_as_baton_json(
+            paths, arguments, list(baton_json), raise_errors=not partial_results)
+        if partial_results:
+            return BatonRunner._create_batch_result(paths, baton_out_as_json, self._baton_json_to_irods_entity)
+        irods_entities = self._baton_json_to_irods_entities(baton_out_as_json)
+
+        return irods_entities[0] if single_path else irods_entities
+
+    def get_all_in_collection(self, collection_paths: Union[str, Iterable[str]], load_metadata: bool=True,
+                              as_columns: bool=False, metadata_columns: Iterable[str]=None,
+                              load_properties: Iterable[IrodsEntity.Property]=None) \
+            -> Union[Sequence[EntityType], IrodsEntityColumns]:
+        """
+        See `IrodsEntityMapper.get_all_in_collection`.
+        :param load_properties: see `get_by_path`
+        """
+        if isinstance(collection_paths, str):
+            collection_paths = [collection_paths]
+        if len(collection_paths) == 0:
+            return IrodsEntityColumns(metadata_columns) if as_columns else []
 
-    def get_by_metadata(self, metadata_search_criteria: Union[SearchCriterion, Iterable[SearchCriterion]],
-                       load_metadata: bool=True, zone: str=None) -> Sequence[EntityType]:
+        arguments, baton_json = self._create_get_all_in_collection_query(
+            collection_paths, load_metadata, load_properties)
+        baton_out_as_json = self.run_baton_query(BatonBinary.BATON_LIST, arguments, input_data=list(baton_json))
+        return self._baton_json_to_irods_entities_in_collections(baton_out_as_json, as_columns, metadata_columns)
+
+    def exists(self, paths: Union[str, Iterable[str]]) -> Union[bool, ExistenceBitmap]:
+        """
+        Gets whether there are entities of the type the mapper deals with at the given paths, without retrieving their
+        properties or decoding models of them. Paths are queried a chunk at a time as they are consumed, therefore a
+        very large number of paths (e.g. from a generator) can be checked.
+
+        Errors other than an entity not existing (e.g. `RuntimeError`) are raised.
+        :param paths: the path or paths
+        :return: whether there is an entity at the path if a single path is given, else whether there is an entity at
+        each of the paths, in the same order as the paths
+        """
+        if isinstance(paths, str):
+            return self.exists([paths])[0]
+
+        existence = ExistenceBitmap()
+        for path, entity_as_baton_json, error in self._iter_list_paths(paths, []):
+            if error is not None and not isinstance(error, FileNotFoundError):
+                raise error
+            existence.append(error is None)
+        return existence
+
+    def stat(self, paths: Union[str, Iterable[str]]) -> Union[IrodsEntityStat, BatchResult]:
+        """
+        Gets records of the size, checksum and timestamps of the entities at the given paths, without retrieving their
+        access controls, metadata or replicas. Paths are queried a chunk at a time as they are consumed.
+        :param paths: the path or paths
+        :return: the record of the entity at the path if a single path is given (raising any error), else a
+        `BatchResult` holding the record of the entity at each path and the error for each path whose entity could not
+        be retrieved (e.g. `FileNotFoundError`)
+        """
+        if isinstance(paths, str):
+            batch_result = self.stat([paths])
+            if len(batch_result.errors) > 0:
+                raise batch_result.errors[paths]
+            return batch_result.successes[paths]
+
+        batch_result = BatchResult()
+        for path, entity_as_baton_json, error in self._iter_list_paths(paths, ["--size", "--checksum", "--timestamp"]):
+            if error is not None:
+                batch_result.errors[path] = error
+            else:
+                batch_result.successes[path] = irods_entity_stat_from_baton_json(entity_as_baton_json)
+        return batch_result
+
+    def iter_by_metadata(self, metadata_search_criteria: MetadataQuery, load_metadata: bool=True, zone: str=None,
+                         metadata_statistics: IrodsMetadataStatistics=None) -> Iterator[EntityType]:
+        """
+        Equivalent to `get_by_metadata` but yields entities as baton returns them, instead of holding them all in
+        memory. The metaqueries that the query is split into are run one after another; if there are many, the paths
+        of the entities that have been yielded are held to deduplicate the results.
+        :param metadata_search_criteria: see `get_by_metadata`
+        :param load_metadata: see `get_by_metadata`
+        :param zone: see `get_by_metadata`
+        :param metadata_statistics: see `get_by_metadata`
+        :return: iterator of the entities
+        """
+        metaqueries = plan_metadata_query(metadata_search_criteria, metadata_statistics)
+
+        def iter_baton_out_as_json(metaquery: Metaquery) -> Iterator[Dict]:
+            metaquery_load_metadata, _ = self._get_metaquery_load_options(metaquery, load_metadata, None)
+            arguments, baton_json = self._create_get_by_metadata_query(
+                metaquery.search_criteria, metaquery_load_metadata, zone)
+            yield from self.iter_baton_query(BatonBinary.BATON_METAQUERY, arguments, input_data=baton_json)
+
+        # Generator, so that each metaquery is only run once the results of the previous one have been consumed
+        baton_outs_as_json = (iter_baton_out_as_json(metaquery) for metaquery in metaqueries)
+        for entity_as_baton_json in self._filter_metaquery_baton_outs(
+                metaqueries, baton_outs_as_json, load_metadata, None):
+            yield self._baton_json_to_irods_entity(entity_as_baton_json)
+
+    def iter_by_path(self, paths: Union[str, Iterable[str]], load_metadata: bool=True) -> Iterator[EntityType]:
+        """
+        Equivalent to `get_by_path` but yields entities as baton returns them, instead of holding them all in memory.
+        :param paths: see `get_by_path`. May be given as an iterator (e.g. a generator), which is consumed as baton
+        reads its input
+        :param load_metadata: see `get_by_path`
+        :return: iterator of the entities, in the same order as the given paths
+        """
+        if isinstance(paths, str):
+            paths = [paths]
+        if isinstance(paths, collections.Sized) and len(paths) == 0:
+            return
+
+        arguments, baton_json = self._create_get_by_path_query(paths, load_metadata)
+        for entity_as_baton_json in self.iter_baton_query(BatonBinary.BATON_LIST, arguments, input_data=baton_json):
+            yield self._baton_json_to_irods_entity(entity_as_baton_json)
+
+    def iter_all_in_collection(self, collection_paths: Union[str, Iterable[str]], load_metadata: bool=True) \
+            -> Iterator[EntityType]:
+        """
+        Equivalent to `get_all_in_collection` but yields entities as baton returns them. baton returns the contents of
+        each collection as a single document, therefore only the contents of one collection are held in memory at a
+        time.
+        :param collection_paths: see `get_all_in_collection`. May be given as an iterator (e.g. a generator), which is
+        consumed as baton reads its input
+        :param load_metadata: see `get_all_in_collection`
+        :return: iterator of the entities
+        """
+        if isinstance(collection_paths, str):
+            collection_paths = [collection_paths]
+        if isinstance(collection_paths, collections.Sized) and len(collection_paths) == 0:
+            return
+
+        arguments, baton_json = self._create_get_all_in_collection_query(collection_paths, load_metadata)
+        for collection_as_baton_json in self.iter_baton_query(
+                BatonBinary.BATON_LIST, arguments, input_data=baton_json):
+            entities_as_baton_json = self._extract_irods_entities_of_entity_type_from_baton_json(
+                collection_as_baton_json[BATON_COLLECTION_CONTENTS])
+            for entity_as_baton_json in entities_as_baton_json:
+                yield self._baton_json_to_irods_entity(entity_as_baton_json)
+
+    def _get_by_path_as_baton_json(self, paths: Iterable[str], arguments: List[str], baton_json: List[Dict],
+                                   raise_errors: bool) -> List[Dict]:
+        """
+        Gets baton's output for each of the given paths, in the same order as the paths.
+
+        If at least `min_paths_to_list_collection` of the (distinct) paths are in the same collection and they are at
+        least `min_coverage_to_list_collection` of the collection's contents, the contents of the collection are listed
+        and filtered, instead of each of the paths being looked up. The output is the same either way.
+        :param paths: the paths
+        :param arguments: the arguments to use with baton-list
+        :param baton_json: the input to baton for each path
+        :param raise_errors: whether errors for paths should be raised (else they are given in the output)
+        :return: baton's output for each path
+        """
+        normalised_paths = [path_from_baton_json(path_as_baton_json) for path_as_baton_json in baton_json]
+        paths_by_collection = collections.OrderedDict()     # type: Dict[str, Set[str]]
+        if self.min_paths_to_list_collection is not None:
+            for path in normalised_paths:
+                collection_path = path.rsplit("/", 1)[0]
+                if collection_path != "":
+                    paths_by_collection.setdefault(collection_path, set()).add(path)
+        candidate_collection_paths = [collection_path for collection_path, collection_paths
+                                      in paths_by_collection.items()
+                                      if len(collection_paths) >= self.min_paths_to_list_collection]
+        if len(candidate_collection_paths) == 0:
+            return self.run_baton_query(BatonBinary.BATON_LIST, arguments, input_data=baton_json,
+                                        raise_errors=raise_errors)
+
+        # Listing names only is cheap compared to listing the properties of many entities
+        names_as_baton_json = self.run_baton_query(
+            BatonBinary.BATON_LIST, ["--contents"], input_data=[
+                CollectionJSONEncoder().default(Collection(collection_path))
+                for collection_path in candidate_collection_paths], raise_errors=False)
+        collection_paths_to_list = [
+            collection_path for collection_path, collection_as_baton_json
+            in zip(candidate_collection_paths, names_as_baton_json)
+            if BatonRunner._get_error_given_in_baton_item(collection_as_baton_json) is None
+            and len(paths_by_collection[collection_path]) >= self.min_coverage_to_list_collection * len(
+                collection_as_baton_json[BATON_COLLECTION_CONTENTS])]
+
+        listed = dict()     # type: Dict[str, Dict[str, Dict]]
+        if len(collection_paths_to_list) > 0:
+            contents_as_baton_json = self.run_baton_query(
+                BatonBinary.BATON_LIST, arguments + ["--contents"], input_data=[
+                    CollectionJSONEncoder().default(Collection(collection_path))
+                    for collection_path in collection_paths_to_list], raise_errors=False)
+            for collection_path, collection_as_baton_json in zip(collection_paths_to_list, contents_as_baton_json):
+                # The collection may have been removed since its names were listed, in which case paths are looked up
+                if BatonRunner._get_error_given_in_baton_item(collection_as_baton_json) is None:
+                    listed[collection_path] = {
+                        path_from_baton_json(entity_as_baton_json): entity_as_baton_json
+                        for entity_as_baton_json in self._extract_irods_entities_of_entity_type_from_baton_json(
+                            collection_as_baton_json[BATON_COLLECTION_CONTENTS])}
+
+        unlisted_indices = [i for i, path in enumerate(normalised_paths) if path.rsplit("/", 1)[0] not in listed]
+        unlisted_baton_out_as_json = self.run_baton_query(
+            BatonBinary.BATON_LIST, arguments, input_data=[baton_json[i] for i in unlisted_indices],
+            raise_errors=False) if len(unlisted_indices) > 0 else []
+        baton_out_as_json = [None] * len(baton_json)    # type: List[Dict]
+        for i, entity_as_baton_json in zip(unlisted_indices, unlisted_baton_out_as_json):
+            baton_out_as_json[i] = entity_as_baton_json
+        for i, path in enumerate(normalised_paths):
+            if baton_out_as_json[i] is None:
+                baton_out_as_json[i] = listed[path.rsplit("/", 1)[0]].get(path) or dict(baton_json[i], **{
+                    BATON_ERROR_PROPERTY: {
+                        BATON_ERROR_CODE_KEY: IRODS_ERROR_USER_FILE_DOES_NOT_EXIST,
+                        BATON_ERROR_MESSAGE_KEY: "Path \"%s\" does not exist" % path}})
+
+        if raise_errors:
+            BatonRunner._raise_any_errors_given_in_baton_out(baton_out_as_json)
+        return baton_out_as_json
+
+    def _iter_list_paths(self, paths: Iterable[str], arguments: List[str]) \
+            -> Iterator[Tuple[str, Optional[Dict], Optional[Exception]]]:
+        """
+        Lists the given paths with baton-list, taking `PATHS_PER_STREAMED_QUERY` paths at a time. Entities that are not
+        of the type the mapper deals with are treated as not existing.
+        :param paths: the paths
+        :param arguments: the arguments to use with baton-list
+        :return: iterator of tuples, in the same order as the paths, where the first element is the path, the second is
+        baton's output for the path (`None` if an error) and the third is the error for the path (`None` if none)
+        """
+        paths = iter(paths)
+        while True:
+            chunk = list(islice(paths, PATHS_PER_STREAMED_QUERY))
+            if len(chunk) == 0:
+                return
+            baton_out_as_json = self.run_baton_query(
+                BatonBinary.BATON_LIST, arguments, input_data=[self._path_to_baton_json(path) for path in chunk],
+                raise_errors=False)
+            assert len(baton_out_as_json) == len(chunk)
+            for path, entity_as_baton_json in zip(chunk, baton_out_as_json):
+                error = BatonRunner._get_error_given_in_baton_item(entity_as_baton_json)
+                if error is None and len(
+                        self._extract_irods_entities_of_entity_type_from_baton_json([entity_as_baton_json])) == 0:
+                    error = FileNotFoundError("Entity at \"%s\" is not of the type that the mapper deals with" % path)
+                yield path, (entity_as_baton_json if error is None else None), error
+
+    def _run_metaquery(self, metaquery: Metaquery, load_metadata: bool, zone: Optional[str],
+                       load_properties: Optional[FrozenSet[IrodsEntity.Property]]=None) -> List[Dict]:
+        """
+        Runs the given metaquery with baton-metaquery, using any cached result.
+        :param metaquery: the metaquery
+        :param load_metadata: whether metadata associated to the entities should be loaded (it is always loaded if the
+        results are to be filtered locally)
+        :param zone: limit query to specific zone in iRODS
+        :param load_properties: the properties of the entities to load (`None` for all)
+        :return: baton's output
+        """
+        search_criteria = metaquery.search_criteria
+        load_metadata, load_properties = self._get_metaquery_load_options(metaquery, load_metadata, load_properties)
+        arguments, baton_json = self._create_get_by_metadata_query(
+            search_criteria, load_metadata, zone, load_properties)
+        if self._cache is not None and self._cache.caches(METADATA_QUERY_CACHE_KIND):
+            # baton's output is cached, rather than the entities, so that each call decodes entities of its own
+            query_key = self._create_get_by_metadata_query_key(search_criteria, load_metadata, zone, load_properties)
+
+            def load(query_keys: List[Hashable]) -> BatchResult:
+                return BatchResult(successes={
+                    query_key: self.run_baton_query(BatonBinary.BATON_METAQUERY, arguments, input_data=baton_json)})
+
+            batch_result = self._cache.get_or_load(METADATA_QUERY_CACHE_KIND, [query_key], load, list)
+            return batch_result.successes[query_key]
+        return self.run_baton_query(BatonBinary.BATON_METAQUERY, arguments, input_data=baton_json)
+
+    @staticmethod
+    def _get_metaquery_load_options(metaquery: Metaquery, load_metadata: bool,
+                                    load_properties: Optional[FrozenSet[IrodsEntity.Property]]) \
+            -> Tuple[bool, Optional[FrozenSet[IrodsEntity.Property]]]:
+        """
+        Gets what is to be loaded by the given metaquery, such that metadata is loaded if its results are to be filtered
+        locally.
+        :param metaquery: the metaquery
+        :param load_metadata: whether metadata associated to the entities has been requested
+        :param load_properties: the properties of the entities that have been requested (`None` for all)
+        :return: tuple where the first element is whether metadata is to be loaded and the second is the properties to
+        load
+        """
+        if len(metaquery.local_search_criteria) > 0:
+            load_metadata = True
+            if load_properties is not None:
+                load_properties = load_properties.union([IrodsEntity.Property.METADATA])
+        return load_metadata, load_properties
+
+    def _filter_metaquery_baton_outs(self, metaqueries: List[Metaquery], baton_outs_as_json: Iterable[Iterable[Dict]],
+                                     load_metadata: bool, load_properties: Optional[FrozenSet[IrodsEntity.Property]]) \
+            -> Iterator[Dict]:
+        """
+        Filters baton's output for each of the given metaqueries by the metaquery's local search criteria and
+        deduplicates the entities by path.
+        :param metaqueries: the metaqueries
+        :param baton_outs_as_json: baton's output for each of the metaqueries, in the same order as the metaqueries
+        :param load_metadata: whether metadata associated to the entities was requested
+        :param load_properties: the properties of the entities that were requested (`None` for all)
+        :return: iterator of baton's output for each of the matching entities
+        """
+        matched_paths = set()   # type: Set[str]
+        for metaquery, metaquery_baton_out_as_json in zip(metaqueries, baton_outs_as_json):
+            for entity_as_baton_json in metaquery_baton_out_as_json:
+                if len(metaquery.local_search_criteria) > 0 and not matches_baton_json(
+                        entity_as_baton_json, metaquery.local_search_criteria):
+                    continue
+                # The results of a single metaquery are already distinct
+                if len(metaqueries) > 1:
+                    path = path_from_baton_json(entity_as_baton_json)
+                    if path in matched_paths:
+                        continue
+                    matched_paths.add(path)
+                if not self._is_metadata_loaded(load_metadata, load_properties) \
+                        and BATON_AVU_PROPERTY in entity_as_baton_json:
+                    # Metadata was only loaded to filter by locally (and may be shared with the cache)
+                    entity_as_baton_json = dict(entity_as_baton_json)
+                    del entity_as_baton_json[BATON_AVU_PROPERTY]
+                yield entity_as_baton_json
+
+    def _create_get_by_metadata_query(
+            self, metadata_search_criteria: Union[SearchCriterion, Iterable[SearchCriterion]], load_metadata: bool,
+            zone: Optional[str], load_properties: Iterable[IrodsEntity.Property]=None) -> Tuple[List[str], Dict]:
+        """
+        Creates the baton-metaquery query that gets the entities with metadata matching the given search criteria.
+        :param metadata_search_criteria: the metadata search criteria
+        :param load_metadata: whether metadata associated to the entities should be loaded
+        :param zone: limit query to specific zone in iRODS
+        :param load_properties: the properties of the entities to load (`None` for all)
+        :return: tuple where the first element is the arguments to use with baton and the second is the input to baton
+        """
         if not isinstance(metadata_search_criteria, collections.Iterable):
             metadata_search_criteria = [metadata_search_criteria]
 
@@ -66,7 +476,7 @@ class _BatonIrodsEntityMapper(BatonRunner, IrodsEntityMapper, metaclass=ABCMeta)
         baton_json = {
             BATON_AVU_PROPERTY: SearchCriterionJSONEncoder().default(metadata_search_criteria)
         }
-        arguments = self._create_entity_query_arguments(load_metadata)
+        arguments = self._create_entity_query_arguments(load_metadata, load_properties)
 
         if zone is not None:
             arguments.append("--zone")
@@ -74,71 +484,118 @@ class _BatonIrodsEntityMapper(BatonRunner, IrodsEntityMapper, metaclass=ABCMeta)
         # Fixes #6.
         arguments.extend(self._additional_metadata_query_arguments)
 
-        baton_out_as_json = self.run_baton_query(BatonBinary.BATON_METAQUERY, arguments, input_data=baton_json)
-        return self._baton_json_to_irods_entities(baton_out_as_json)
-
-    def get_by_path(self, paths: Union[str, Iterable[str]], load_metadata: bool=True) \
-            -> Union[EntityType, Sequence[EntityType]]:
-        single_path = False
-        if isinstance(paths, str):
-            paths = [paths]
-            single_path = True
-        if len(paths) == 0:
-            return []
-
-        baton_json = []
-        for path in paths:
-            path_json = self._path_to_baton_json(path)
-            baton_json.append(path_json)
-        arguments = self._create_entity_query_arguments(load_metadata)
+        return arguments, baton_json
 
-        baton_out_as_json = self.run_baton_query(BatonBinary.BATON_LIST, arguments, input_data=baton_json)
-        irods_entities = self._baton_json_to_irods_entities(baton_out_as_json)
-
-        return irods_entities[0] if single_path else irods_entities
+    def _create_get_by_metadata_query_key(
+            self, metadata_search_criteria: Union[SearchCriterion, Iterable[SearchCriterion]], load_metadata: bool,
+            zone: Optional[str], load_properties: Iterable[IrodsEntity.Property]=None) -> Hashable:
+        """
+        Creates the key under which the result of the metadata query with the given parameters is cached. The key does
+        not depend on the order of the search criteria.
+        :param metadata_search_criteria: see `_create_get_by_metadata_query`
+        :param load_metadata: see `_create_get_by_metadata_query`
+        :param zone: see `_create_get_by_metadata_query`
+        :param load_properties: see `_create_get_by_metadata_query`
+        :return: the key
+        """
+        if not isinstance(metadata_search_criteria, collections.Iterable):
+            metadata_search_criteria = [metadata_search_criteria]
+        canonical_search_criteria = frozenset(
+            (search_criterion.attribute, search_criterion.value, search_criterion.comparison_operator)
+            for search_criterion in metadata_search_criteria)
+        return (tuple(self._additional_metadata_query_arguments), canonical_search_criteria,
+                self._is_metadata_loaded(load_metadata, load_properties), zone,
+                frozenset(load_properties) if load_properties is not None else None)
+
+    def _create_get_by_path_query(self, paths: Iterable[str], load_metadata: bool,
+                                  load_properties: Iterable[IrodsEntity.Property]=None) \
+            -> Tuple[List[str], Iterator[Dict]]:
+        """
+        Creates the baton-list query that gets the entities with the given paths.
+        :param paths: the paths of the entities
+        :param load_metadata: whether metadata associated to the entities should be loaded
+        :param load_properties: the properties of the entities to load (`None` for all)
+        :return: tuple where the first element is the arguments to use with baton and the second is the input to baton,
+        which is produced from the paths as it is consumed
+        """
+        baton_json = (self._path_to_baton_json(path) for path in paths)
+        arguments = self._create_entity_query_arguments(load_metadata, load_properties)
+        return arguments, baton_json
 
-    def get_all_in_collection(self, collection_paths: Union[str, Iterable[str]], load_metadata: bool=True) \
-            -> Sequence[EntityType]:
-        if isinstance(collection_paths, str):
-            collection_paths = [collection_paths]
-        if len(collection_paths) == 0:
-            return []
-
-        baton_json = []
-        for path in collection_paths:
-            collection = Collection(path)
-            collection_json = CollectionJSONEncoder().default(collection)
-            baton_json.append(collection_json)
-        arguments = self._create_entity_query_arguments(load_metadata)
+    def _create_get_all_in_collection_query(self, collection_paths: Iterable[str], load_metadata: bool,
+                                            load_properties: Iterable[IrodsEntity.Property]=None) \
+            -> Tuple[List[str], Iterator[Dict]]:
+        """
+        Creates the baton-list query that gets the contents of the collections with the given paths.
+        :param collection_paths: the paths of the collections
+        :param load_metadata: whether metadata associated to the entities should be loaded
+        :param load_properties: the properties of the entities to load (`None` for all)
+        :return: tuple where the first element is the arguments to use with baton and the second is the input to baton,
+        which is produced from the paths as it is consumed
+        """
+        baton_json = (CollectionJSONEncoder().default(Collection(path)) for path in collection_paths)
+        arguments = self._create_entity_query_arguments(load_metadata, load_properties)
         arguments.append("--contents")
+        return arguments, baton_json
 
-        baton_out_as_json = self.run_baton_query(BatonBinary.BATON_LIST, arguments, input_data=baton_json)
-
-        entities_as_baton_json = []
-        for baton_item_as_json in baton_out_as_json:
-            entities_as_baton_json += baton_item_as_json[BATON_COLLECTION_CONTENTS]
-        data_objects_as_baton_json = self._extract_irods_entities_of_entity_type_from_baton_json(entities_as_baton_json)
-
-        return self._baton_json_to_irods_entities(data_objects_as_baton_json)
-
-    def _create_entity_query_arguments(self, load_metadata: bool=True) -> List[str]:
+    def _create_entity_query_arguments(self, load_metadata: bool=True,
+                                       load_properties: Iterable[IrodsEntity.Property]=None) -> List[str]:
         """
         Create arguments to use with baton.
         :param load_metadata: whether baton should load metadata
+        :param load_properties: the properties that baton should load (`None` for all)
         :return: the arguments to use with baton
         """
-        arguments = ["--acl", "--replicate", "--timestamp"]
-        if load_metadata:
-            arguments.append("--avu")
-        return arguments
+        if load_properties is None:
+            load_properties = IrodsEntity.Property
+        else:
+            load_properties = set(load_properties)
+            if IrodsEntity.Property.TIMESTAMPS in load_properties:
+                # Timestamps are properties of replicas
+                load_properties.add(IrodsEntity.Property.REPLICAS)
+        return [flag for entity_property, flag in BATON_ENTITY_PROPERTY_FLAGS if entity_property in load_properties
+                and (load_metadata or entity_property != IrodsEntity.Property.METADATA)]
+
+    @staticmethod
+    def _is_metadata_loaded(load_metadata: bool, load_properties: Optional[Iterable[IrodsEntity.Property]]) -> bool:
+        """
+        Gets whether metadata is loaded with the given parameters of a query.
+        :param load_metadata: whether metadata associated to the entities should be loaded
+        :param load_properties: the properties of the entities to load (`None` for all)
+        :return: whether metadata is loaded
+        """
+        return bool(load_metadata) and (load_properties is None or IrodsEntity.Property.METADATA in load_properties)
+
+    def _baton_json_to_irods_entities_in_collections(self, collections_as_baton_json: List[Dict],
+                                                     as_columns: bool=False, metadata_columns: Iterable[str]=None) \
+            -> Union[List[EntityType], IrodsEntityColumns]:
+        """
+        Converts the baton representation of the contents of collections to a list of `EntityType` models.
+        :param collections_as_baton_json: the baton serialization representation of the collections with contents
+        :param as_columns: see `_baton_json_to_irods_entities`
+        :param metadata_columns: see `_baton_json_to_irods_entities`
+        :return: the models of the entities in the collections that are of type `EntityType`
+        """
+        entities_as_baton_json = []
+        for baton_item_as_json in collections_as_baton_json:
+            entities_as_baton_json += baton_item_as_json[BATON_COLLECTION_CONTENTS]
+        data_objects_as_baton_json = self._extract_irods_entities_of_entity_type_from_baton_json(entities_as_baton_json)
 
-    def _baton_json_to_irods_entities(self, entities_as_baton_json: List[Dict]) -> List[EntityType]:
+        return self._baton_json_to_irods_entities(data_objects_as_baton_json, as_columns, metadata_columns)
+
+    def _baton_json_to_irods_entities(self, entities_as_baton_json: List[Dict], as_columns: bool=False,
+                                      metadata_columns: Iterable[str]=None) \
+            -> Union[List[EntityType], IrodsEntityColumns]:
         """
         Converts the baton representation of multiple iRODS entities to a list of `EntityType` models.
         :param entities_as_baton_json: the baton serialization representation of the entities
+        :param as_columns: whether to convert the entities to columns instead of models
+        :param metadata_columns: the metadata attributes that are to have columns (`None` for all)
         :return: the equivalent models
         """
         assert(isinstance(entities_as_baton_json, list))
+        if as_columns:
+            return irods_entity_columns_from_baton_json(entities_as_baton_json, metadata_columns)
 
         entities = []
         for file_as_baton_json in entities_as_baton_json:
@@ -152,10 +609,16 @@ class BatonDataObjectMapper(_BatonIrodsEntityMapper, DataObjectMapper):
     """
     iRODS data object mapper, implemented using baton.
     """
-    def __init__(self, *args, **kwargs):
-        super().__init__(["--obj"], *args, **kwargs)
-        self._metadata_mapper = BatonDataObjectIrodsMetadataMapper(*args, **kwargs)
-        self._access_control_mapper = BatonDataObjectAccessControlMapper(*args, **kwargs)
+    def __init__(self, *args, lazy_decoding: bool=False, cache: TimedLruCache=None, **kwargs):
+        """
+        Constructor.
+        :param lazy_decoding: see `_BatonIrodsEntityMapper.__init__`
+        :param cache: cache, shared with other mappers of the same connection, of the metadata query results,
+        metadata and access controls retrieved through this mapper (`None` if they are not to be cached)
+        """
+        super().__init__(["--obj"], *args, lazy_decoding=lazy_decoding, cache=cache, **kwargs)
+        self._metadata_mapper = BatonDataObjectIrodsMetadataMapper(*args, cache=cache, **kwargs)
+        self._access_control_mapper = BatonDataObjectAccessControlMapper(*args, cache=cache, **kwargs)
 
     @property
     def metadata(self) -> IrodsMetadataMapper[EntityType]:
@@ -165,12 +628,17 @@ class BatonDataObjectMapper(_BatonIrodsEntityMapper, DataObjectMapper):
     def access_control(self) -> AccessControlMapper:
         return self._access_control_mapper
 
+    def close(self):
+        super().close()
+        self._metadata_mapper.close()
+        self._access_control_mapper.close()
+
     def _path_to_baton_json(self, path: str) -> Dict:
         data_object = DataObject(path)
         return DataObjectJSONEncoder().default(data_object)
 
     def _baton_json_to_irods_entity(self, entity_as_baton_json: Dict) -> DataObject:
-        return DataObjectJSONDecoder().decode_parsed(entity_as_baton_json)
+        return data_object_from_baton_json(entity_as_baton_json, self._lazy_decoding)
 
     def _extract_irods_entities_of_entity_type_from_baton_json(self, entities_as_baton_json: List[Dict]) -> List[Dict]:
         data_objects_as_baton_json = []
@@ -184,10 +652,16 @@ class BatonCollectionMapper(_BatonIrodsEntityMapper, CollectionMapper):
     """
     iRODS collection mapper, implemented using baton.
     """
-    def __init__(self, *args, **kwargs):
-        super().__init__(["--coll"], *args, **kwargs)
-        self._metadata_mapper = BatonCollectionIrodsMetadataMapper(*args, **kwargs)
-        self._access_control_mapper = BatonDataObjectAccessControlMapper(*args, **kwargs)
+    def __init__(self, *args, lazy_decoding: bool=False, cache: TimedLruCache=None, **kwargs):
+        """
+        Constructor.
+        :param lazy_decoding: see `_BatonIrodsEntityMapper.__init__`
+        :param cache: cache, shared with other mappers of the same connection, of the metadata query results,
+        metadata and access controls retrieved through this mapper (`None` if they are not to be cached)
+        """
+        super().__init__(["--coll"], *args, lazy_decoding=lazy_decoding, cache=cache, **kwargs)
+        self._metadata_mapper = BatonCollectionIrodsMetadataMapper(*args, cache=cache, **kwargs)
+        self._access_control_mapper = BatonDataObjectAccessControlMapper(*args, cache=cache, **kwargs)
 
     @property
     def metadata(self) -> IrodsMetadataMapper[EntityType]:
@@ -197,12 +671,87 @@ class BatonCollectionMapper(_BatonIrodsEntityMapper, CollectionMapper):
     def access_control(self) -> AccessControlMapper:
         return self._access_control_mapper
 
+    def close(self):
+        super().close()
+        self._metadata_mapper.close()
+        self._access_control_mapper.close()
+
+    def walk(self, collection_paths: Union[str, Iterable[str]], load_metadata: bool=True, batch_size: int=100,
+             max_parallel: int=None) -> Iterator[Tuple[Collection, List[Collection], List[DataObject]]]:
+        """
+        Walks the trees of collections with the given paths, breadth first, yielding each collection with the
+        collections and data objects directly within it.
+
+        The contents of up to `batch_size` collections are listed by a single baton query and up to `max_parallel`
+        queries are run at a time, whilst the entities already listed are yielded. Collections that disappear during
+        the walk are skipped. A `FileNotFoundError` is raised if one of the given collections does not exist.
+        :param collection_paths: the path(s) of the collections to walk
+        :param load_metadata: whether metadata associated to the entities should be loaded
+        :param batch_size: the maximum number of collections whose contents are listed by a single baton query
+        :param max_parallel: the maximum number of baton queries run at a time (`None` for the size of the executor
+        pool or, if the pool is unbounded, the number of CPUs)
+        :return: iterator of tuples where the first element is a collection, the second is the collections within it
+        and the third is the data objects within it
+        """
+        if batch_size < 1:
+            raise ValueError("Batch size must be at least 1: %d given" % batch_size)
+        if max_parallel is None:
+            max_parallel = self._get_max_parallel_queries()
+        if isinstance(collection_paths, str):
+            collection_paths = [collection_paths]
+        root_paths = {collection_path.rstrip("/") for collection_path in collection_paths}
+
+        unlisted = collections.deque(root_paths)
+        listing = collections.deque()   # type: collections.deque
+        with ThreadPoolExecutor(max_workers=max_parallel) as thread_pool:
+            try:
+                while len(unlisted) > 0 or len(listing) > 0:
+                    while len(unlisted) > 0 and len(listing) < max_parallel:
+                        batch = [unlisted.popleft() for _ in range(min(batch_size, len(unlisted)))]
+                        listing.append(thread_pool.submit(self._list_contents, batch, load_metadata, root_paths))
+                    for collection, subcollections, data_objects in listing.popleft().result():
+                        unlisted.extend(subcollection.path for subcollection in subcollections)
+                        yield collection, subcollections, data_objects
+            finally:
+                for future in listing:
+                    future.cancel()
+
+    def _list_contents(self, collection_paths: List[str], load_metadata: bool, root_paths: Set[str]) \
+            -> List[Tuple[Collection, List[Collection], List[DataObject]]]:
+        """
+        Lists the contents of the collections with the given paths.
+        :param collection_paths: the paths of the collections
+        :param load_metadata: whether metadata associated to the entities should be loaded
+        :param root_paths: the paths of the collections whose absence is an error (others are skipped)
+        :return: tuples of each collection that exists, the collections within it and the data objects within it
+        """
+        arguments, baton_json = self._create_get_all_in_collection_query(collection_paths, load_metadata)
+        baton_out_as_json = self.run_baton_query(
+            BatonBinary.BATON_LIST, arguments, input_data=list(baton_json), raise_errors=False)
+
+        listed = []
+        for collection_path, collection_as_baton_json in zip(collection_paths, baton_out_as_json):
+            error = BatonRunner._get_error_given_in_baton_item(collection_as_baton_json)
+            if error is not None:
+                if isinstance(error, FileNotFoundError) and collection_path not in root_paths:
+                    continue
+                raise error
+            subcollections = []
+            data_objects = []
+            for entity_as_baton_json in collection_as_baton_json[BATON_COLLECTION_CONTENTS]:
+                if BATON_DATA_OBJECT_PROPERTY in entity_as_baton_json:
+                    data_objects.append(data_object_from_baton_json(entity_as_baton_json, self._lazy_decoding))
+                else:
+                    subcollections.append(collection_from_baton_json(entity_as_baton_json, self._lazy_decoding))
+            listed.append((self._baton_json_to_irods_entity(collection_as_baton_json), subcollections, data_objects))
+        return listed
+
     def _path_to_baton_json(self, path: str) -> Dict:
         collection = Collection(path)
         return CollectionJSONEncoder().default(collection)
 
     def _baton_json_to_irods_entity(self, entity_as_baton_json: Dict) -> Collection:
-        return CollectionJSONDecoder().decode_parsed(entity_as_baton_json)
+        return collection_from_baton_json(entity_as_baton_json, self._lazy_decoding)
 
     def _extract_irods_entities_of_entity_type_from_baton_json(self, entities_as_baton_json: List[Dict]) -> List[Dict]:
         collections_as_baton_json = []
@@ -1,22 +1,21 @@
 from abc import ABCMeta, abstractmethod
-from typing import Dict, Iterable, Union, List, Sequence
+from typing import Dict, Iterable, Union, List, Sequence, Tuple
 
 from baton._baton._baton_runner import BatonRunner, BatonBinary
+from baton._baton._cache import TimedLruCache, METADATA_CACHE_KIND, METADATA_QUERY_CACHE_KIND
 from baton._baton._constants import BATON_METAMOD_OPERATION_ADD, BATON_AVU_PROPERTY, BATON_METAMOD_OPERATION_FLAG, \
     BATON_LIST_AVU_FLAG
 from baton._baton._constants import BATON_METAMOD_OPERATION_REMOVE
-from baton._baton.json import DataObjectJSONEncoder, CollectionJSONEncoder, IrodsMetadataJSONDecoder
+from baton._baton.json import DataObjectJSONEncoder, CollectionJSONEncoder, irods_metadata_from_baton_json
 from baton.collections import IrodsMetadata
 from baton.mappers import IrodsMetadataMapper
-from baton.models import DataObject, Collection, IrodsEntity
+from baton.models import DataObject, Collection, IrodsEntity, BatchResult
 
 
 class _BatonIrodsMetadataMapper(BatonRunner, IrodsMetadataMapper, metaclass=ABCMeta):
     """
     iRODS metadata mapper, implemented using baton.
     """
-    _IRODS_METADATA_JSON_ENCODER = IrodsMetadataJSONDecoder()
-
     @abstractmethod
     def _create_entity_with_path(self, path: str) -> IrodsEntity:
         """
@@ -33,24 +32,36 @@ class _BatonIrodsMetadataMapper(BatonRunner, IrodsMetadataMapper, metaclass=ABCM
         :return: the JSON representation
         """
 
-    def get_all(self, paths: Union[str, Sequence[str]]) -> Union[IrodsMetadata, List[IrodsMetadata]]:
+    def __init__(self, *args, cache: TimedLruCache=None, **kwargs):
+        """
+        Constructor.
+        :param cache: cache of the metadata that has been retrieved, which is shared with other mappers of the same
+        connection (`None` if metadata is not to be cached)
+        """
+        super().__init__(*args, **kwargs)
+        self._cache = cache
+
+    def get_all(self, paths: Union[str, Sequence[str]], partial_results: bool=False) \
+            -> Union[IrodsMetadata, List[IrodsMetadata], BatchResult]:
+        """
+        See `IrodsMetadataMapper.get_all`.
+        :param partial_results: whether to return a `BatchResult` holding the metadata of each path and the error for
+        each path whose metadata could not be retrieved, instead of raising the first error
+        """
         single_path = False
         if isinstance(paths, str):
             paths = [paths]
             single_path = True
 
-        baton_in_json = []
-        for path in paths:
-            baton_in_json.append(self._path_to_baton_json(path))
-        baton_out_as_json = self.run_baton_query(BatonBinary.BATON_LIST, [BATON_LIST_AVU_FLAG], input_data=baton_in_json)
-        assert len(baton_out_as_json) == len(paths)
-
-        metadata_for_paths = []
-        for entity_as_baton_json in baton_out_as_json:
-            metadata_as_baton_json = entity_as_baton_json[BATON_AVU_PROPERTY]
-            metadata = _BatonIrodsMetadataMapper._IRODS_METADATA_JSON_ENCODER.decode_parsed(
-                metadata_as_baton_json)
-            metadata_for_paths.append(metadata)
+        if self._cache is not None:
+            batch_result = self._cache.get_or_load(
+                METADATA_CACHE_KIND, paths, lambda paths_to_load: self._get_all(paths_to_load, partial_results),
+                _copy_irods_metadata)
+        else:
+            batch_result = self._get_all(paths, partial_results)
+        if partial_results:
+            return batch_result
+        metadata_for_paths = [batch_result.successes[path] for path in paths]
 
         return metadata_for_paths[0] if single_path else metadata_for_paths
 
@@ -60,34 +71,49 @@ class _BatonIrodsMetadataMapper(BatonRunner, IrodsMetadataMapper, metaclass=ABCM
     def set(self, paths: Union[str, Iterable[str]], metadata: Union[IrodsMetadata, List[IrodsMetadata]]):
         # baton does not support "set" natively, therefore this operation is not transactional. For discussion, see:
         # https://github.com/wtsi-npg/baton/issues/160
-        if isinstance(paths, str):
-            paths = [paths]
+        paths = [paths] if isinstance(paths, str) else list(paths)
         if isinstance(metadata, IrodsMetadata):
             metadata = [metadata for _ in paths]
+        elif len(paths) != len(metadata):
+            raise ValueError("Metadata not supplied for all paths - either supply a single IrodsMetadata collection "
+                             "to apply for all paths or supply a collection for each path")
 
-        # Need to remove any existing values associated to the keys to set - annoyingly, this requires the values to be
-        # known
-        metadatas_to_remove = []     # type: List[IrodsMetadata]
-        paths_with_metadata_to_remove = []  # type: List[str]
-        existing_metadatas = self.get_all(paths)
-        for i in range(len(existing_metadatas)):
-            existing_metadata = existing_metadatas[i]
-            keys_to_remove = set(existing_metadata.keys()).intersection(metadata[i].keys())
-            metadata_to_remove = IrodsMetadata({key: existing_metadata[key] for key in keys_to_remove})
-            metadatas_to_remove.append(metadata_to_remove)
-            paths_with_metadata_to_remove.append(paths[i])
-
-        assert len(metadatas_to_remove) == len(paths_with_metadata_to_remove)
-        self.remove(paths_with_metadata_to_remove, metadatas_to_remove)
-        self.add(paths, metadata)
+        # Only the values that differ from those that exist are changed, which requires the existing values to be known
+        # (and therefore not stale, as they could be if cached)
+        batch_result = self._get_all(paths, False)
+        existing_metadatas = [batch_result.successes[path] for path in paths]
+        paths_with_metadata_to_remove, metadatas_to_remove, paths_with_metadata_to_add, metadatas_to_add = \
+            self._create_set_changes(paths, metadata, existing_metadatas)
+        if len(paths_with_metadata_to_remove) > 0:
+            self.remove(paths_with_metadata_to_remove, metadatas_to_remove)
+        if len(paths_with_metadata_to_add) > 0:
+            self.add(paths_with_metadata_to_add, metadatas_to_add)
 
     def remove(self, paths: Union[str, Iterable[str]], metadata: Union[IrodsMetadata, List[IrodsMetadata]]):
         self._modify(paths, metadata, BATON_METAMOD_OPERATION_REMOVE)
 
     def remove_all(self, paths: Union[str, Iterable[str]]):
-        metadata_for_paths = self.get_all(paths)
+        if isinstance(paths, str):
+            paths = [paths]
+        batch_result = self._get_all(paths, False)
+        metadata_for_paths = [batch_result.successes[path] for path in paths]
         self._modify(paths, metadata_for_paths, BATON_METAMOD_OPERATION_REMOVE)
 
+    def _get_all(self, paths: Sequence[str], partial_results: bool) -> BatchResult:
+        """
+        Gets the metadata of the entities with the given paths from iRODS, bypassing any cache.
+        :param paths: the paths of the entities
+        :param partial_results: whether errors that baton expresses for some of the paths should be returned instead
+        of raised
+        :return: the metadata of each path and any errors
+        """
+        baton_in_json = self._create_get_all_input(paths)
+        baton_out_as_json = self.run_baton_query(
+            BatonBinary.BATON_LIST, [BATON_LIST_AVU_FLAG], input_data=baton_in_json, raise_errors=not partial_results)
+        assert len(baton_out_as_json) == len(paths)
+        return BatonRunner._create_batch_result(
+            paths, baton_out_as_json, lambda item: self._baton_json_to_irods_metadata([item])[0])
+
     def _modify(self, paths: Union[str, List[str]], metadata_for_paths: Union[IrodsMetadata, List[IrodsMetadata]],
                 operation: str):
         """
@@ -97,6 +123,85 @@ class _BatonIrodsMetadataMapper(BatonRunner, IrodsMetadataMapper, metaclass=ABCM
         for all, else the metadata is matched against the path with the corresponding index
         :param operation: the baton operation used to modify the metadata
         """
+        paths = [paths] if isinstance(paths, str) else list(paths)
+        arguments, baton_in_json = self._create_modify_query(paths, metadata_for_paths, operation)
+        try:
+            self.run_baton_query(BatonBinary.BATON_METAMOD, arguments, input_data=baton_in_json)
+        finally:
+            # Invalidated even if the modification failed, as it may have been applied to some of the paths
+            if self._cache is not None:
+                self._cache.invalidate(METADATA_CACHE_KIND, paths)
+                # Metadata query results include the metadata and access controls of the matched entities
+                self._cache.invalidate_all(METADATA_QUERY_CACHE_KIND)
+
+    def _create_get_all_input(self, paths: Iterable[str]) -> List[Dict]:
+        """
+        Creates the input to baton-list that gets the metadata of the entities with the given paths.
+        :param paths: the paths of the entities
+        :return: the input to baton
+        """
+        return [self._path_to_baton_json(path) for path in paths]
+
+    def _baton_json_to_irods_metadata(self, entities_as_baton_json: List[Dict]) -> List[IrodsMetadata]:
+        """
+        Converts the metadata in the baton representation of entities to `IrodsMetadata` models.
+        :param entities_as_baton_json: the baton serialization representation of the entities
+        :return: the metadata of each entity
+        """
+        metadata_for_paths = []
+        for entity_as_baton_json in entities_as_baton_json:
+            metadata_as_baton_json = entity_as_baton_json[BATON_AVU_PROPERTY]
+            metadata = irods_metadata_from_baton_json(metadata_as_baton_json)
+            metadata_for_paths.append(metadata)
+        return metadata_for_paths
+
+    def _create_set_changes(self, paths: List[str], metadata: List[IrodsMetadata],
+                            existing_metadatas: List[IrodsMetadata]) \
+            -> Tuple[List[str], List[IrodsMetadata], List[str], List[IrodsMetadata]]:
+        """
+        Creates the smallest changes to existing metadata that set the given metadata: only values of the keys to set
+        that are not to be kept are removed and only values that do not already exist are added. Paths whose metadata
+        does not need to change are not included.
+        :param paths: the paths of the entities to set the metadata of
+        :param metadata: the metadata to set for the path with the corresponding index
+        :param existing_metadatas: the existing metadata of the path with the corresponding index
+        :return: tuple where the first element is the paths to remove metadata from, the second element is the
+        metadata to remove from the path with the corresponding index, the third element is the paths to add metadata
+        to and the fourth element is the metadata to add to the path with the corresponding index
+        """
+        paths_with_metadata_to_remove = []  # type: List[str]
+        metadatas_to_remove = []     # type: List[IrodsMetadata]
+        paths_with_metadata_to_add = []     # type: List[str]
+        metadatas_to_add = []    # type: List[IrodsMetadata]
+        for path, metadata_to_set, existing_metadata in zip(paths, metadata, existing_metadatas):
+            metadata_to_remove = IrodsMetadata()
+            metadata_to_add = IrodsMetadata()
+            for key, values in metadata_to_set.items():
+                existing_values = existing_metadata.get(key, set())
+                values_to_remove = existing_values - values
+                if len(values_to_remove) > 0:
+                    metadata_to_remove[key] = values_to_remove
+                values_to_add = values - existing_values
+                if len(values_to_add) > 0:
+                    metadata_to_add[key] = values_to_add
+            if len(metadata_to_remove) > 0:
+                paths_with_metadata_to_remove.append(path)
+                metadatas_to_remove.append(metadata_to_remove)
+            if len(metadata_to_add) > 0:
+                paths_with_metadata_to_add.append(path)
+                metadatas_to_add.append(metadata_to_add)
+        return paths_with_metadata_to_remove, metadatas_to_remove, paths_with_metadata_to_add, metadatas_to_add
+
+    def _create_modify_query(self, paths: Union[str, List[str]],
+                             metadata_for_paths: Union[IrodsMetadata, List[IrodsMetadata]], operation: str) \
+            -> Tuple[List[str], List[Dict]]:
+        """
+        Creates the baton-metamod query that modifies the metadata of the entity or entities with the given path.
+        :param paths: see `_modify`
+        :param metadata_for_paths: see `_modify`
+        :param operation: see `_modify`
+        :return: tuple where the first element is the arguments to use with baton and the second is the input to baton
+        """
         if isinstance(paths, str):
             paths = [paths]
         if isinstance(metadata_for_paths, IrodsMetadata):
@@ -112,7 +217,7 @@ class _BatonIrodsMetadataMapper(BatonRunner, IrodsMetadataMapper, metaclass=ABCM
             entity.metadata = metadata_for_paths[i]
             baton_in_json.append(self._entity_to_baton_json(entity))
         arguments = [BATON_METAMOD_OPERATION_FLAG, operation]
-        self.run_baton_query(BatonBinary.BATON_METAMOD, arguments, input_data=baton_in_json)
+        return arguments, baton_in_json
 
     def _path_to_baton_json(self, path: str) -> Dict:
         """
@@ -144,3 +249,12 @@ class BatonCollectionIrodsMetadataMapper(_BatonIrodsMetadataMapper):
 
     def _entity_to_baton_json(self, entity: Collection) -> Dict:
         return CollectionJSONEncoder().default(entity)
+
+
+def _copy_irods_metadata(metadata: IrodsMetadata) -> IrodsMetadata:
+    """
+    Copies the given metadata, including the sets of values of each attribute.
+    :param metadata: the metadata to copy
+    :return: the copy
+    """
+    return IrodsMetadata({attribute: set(values) for attribute, values in metadata.items()})
@@ -1,8 +1,13 @@
 import json
+import re
+import sys
+from datetime import datetime
+from functools import lru_cache, partial
 from json import JSONEncoder, JSONDecoder
-from typing import Dict, List, Union
+from typing import Dict, List, Union, Set, Callable, Any, Tuple, Iterable, Optional
 
 from dateutil.parser import parser
+from dateutil.tz import tzutc
 
 from baton._baton._constants import BATON_ACL_LEVELS, BATON_ACL_OWNER_PROPERTY, BATON_ACL_LEVEL_PROPERTY, \
     BATON_REPLICA_NUMBER_PROPERTY, BATON_REPLICA_VALID_PROPERTY, BATON_REPLICA_CHECKSUM_PROPERTY, \
@@ -13,10 +18,10 @@ from baton._baton._constants import BATON_ACL_LEVELS, BATON_ACL_OWNER_PROPERTY,
     BATON_SEARCH_CRITERION_COMPARISON_OPERATORS, BATON_SPECIFIC_QUERY_SQL_PROPERTY, \
     BATON_SPECIFIC_QUERY_ARGUMENTS_PROPERTY, BATON_SPECIFIC_QUERY_ALIAS_PROPERTY, BATON_ACL_ZONE_PROPERTY, \
     BATON_TIMESTAMP_LAST_MODIFIED_PROPERTY, BATON_TIMESTAMP_CREATED_PROPERTY, BATON_TIMESTAMP_PROPERTY, \
-    BATON_TIMESTAMP_REPLICA_NUMBER_LINK_PROPERTY
-from baton.collections import IrodsMetadata, DataObjectReplicaCollection
+    BATON_TIMESTAMP_REPLICA_NUMBER_LINK_PROPERTY, BATON_SIZE_PROPERTY, BATON_CHECKSUM_PROPERTY
+from baton.collections import IrodsMetadata, DataObjectReplicaCollection, IrodsEntityColumns
 from baton.models import AccessControl, DataObjectReplica, DataObject, IrodsEntity, Collection, PreparedSpecificQuery, \
-    SpecificQuery, SearchCriterion
+    SpecificQuery, SearchCriterion, User, IrodsEntityStat, _share
 from hgicommon.enums import ComparisonOperator
 from hgijson.json.builders import MappingJSONEncoderClassBuilder, MappingJSONDecoderClassBuilder, \
     SetJSONEncoderClassBuilder, SetJSONDecoderClassBuilder
@@ -30,8 +35,37 @@ def _access_control_level_to_string(level: AccessControl.Level):
     assert level in BATON_ACL_LEVELS
     return BATON_ACL_LEVELS[level]
 
+_ACCESS_CONTROL_LEVELS_FROM_STRING = {value: key for key, value in BATON_ACL_LEVELS.items()}
+
 def _access_control_level_from_string(level_as_string: str):
-    return [key for key, value in BATON_ACL_LEVELS.items() if value == level_as_string][0]
+    return _ACCESS_CONTROL_LEVELS_FROM_STRING[level_as_string]
+
+# Decoded users and access controls are interned as the same few are repeated across the many entities that are decoded
+# from large results. Interned instances are shared, therefore they are marked as such so that they cannot be modified
+_MAX_INTERNED = 65536
+_interned_users = dict()  # type: Dict[Tuple[str, str], User]
+_interned_access_controls = dict()    # type: Dict[Tuple[str, str, str], AccessControl]
+
+def _intern_user(name: str, zone: str) -> User:
+    key = (name, zone)
+    user = _interned_users.get(key)
+    if user is None:
+        if len(_interned_users) >= _MAX_INTERNED:
+            _interned_users.clear()
+        user = _share(User(sys.intern(name), sys.intern(zone)))
+        _interned_users[key] = user
+    return user
+
+def _intern_access_control(name: str, zone: str, level_as_string: str) -> AccessControl:
+    key = (name, zone, level_as_string)
+    access_control = _interned_access_controls.get(key)
+    if access_control is None:
+        if len(_interned_access_controls) >= _MAX_INTERNED:
+            _interned_access_controls.clear()
+        access_control = _share(AccessControl(
+            _intern_user(name, zone), _access_control_level_from_string(level_as_string)))
+        _interned_access_controls[key] = access_control
+    return access_control
 
 _access_control_json_mappings = [
     JsonPropertyMapping(
@@ -50,7 +84,15 @@ _access_control_json_mappings = [
                             level_as_string))
 ]
 AccessControlJSONEncoder = MappingJSONEncoderClassBuilder(AccessControl, _access_control_json_mappings).build()
-AccessControlJSONDecoder = MappingJSONDecoderClassBuilder(AccessControl, _access_control_json_mappings).build()
+
+class AccessControlJSONDecoder(JSONDecoder, ParsedJSONDecoder):
+    def decode(self, json_as_string: str, **kwargs) -> AccessControl:
+        json_as_dict = json.loads(json_as_string)
+        return self.decode_parsed(json_as_dict)
+
+    def decode_parsed(self, json_as_dict: dict) -> AccessControl:
+        return _intern_access_control(json_as_dict[BATON_ACL_OWNER_PROPERTY], json_as_dict[BATON_ACL_ZONE_PROPERTY],
+                                      json_as_dict[BATON_ACL_LEVEL_PROPERTY])
 
 
 # JSON encoder/decoder for sets of `AccessControl` instances
@@ -95,7 +137,7 @@ class DataObjectReplicaCollectionJSONDecoder(JSONDecoder, ParsedJSONDecoder):
     def decode_parsed(self, json_as_dict: dict) -> DataObjectReplicaCollection:
         if not isinstance(json_as_dict, List):
             return super().decode(json_as_dict)
-        return DataObjectReplicaCollection([self._replica_decoder.decode(json.dumps(item)) for item in json_as_dict])
+        return DataObjectReplicaCollection([self._replica_decoder.decode_parsed(item) for item in json_as_dict])
 
 
 # JSON encoder/decoder for `IrodsMetadata`
@@ -123,7 +165,7 @@ class IrodsMetadataJSONDecoder(JSONDecoder, ParsedJSONDecoder):
         irods_metadata = IrodsMetadata()
         for item in json_as_dict:
             assert isinstance(item, dict)
-            attribute = item[BATON_AVU_ATTRIBUTE_PROPERTY]
+            attribute = sys.intern(item[BATON_AVU_ATTRIBUTE_PROPERTY])
             value = item[BATON_AVU_VALUE_PROPERTY]
             irods_metadata.add(attribute, value)
         return irods_metadata
@@ -160,6 +202,41 @@ _DataObjectJSONEncoder = MappingJSONEncoderClassBuilder(
 _DataObjectJSONDecoder = MappingJSONDecoderClassBuilder(
     DataObject, _data_object_json_mappings, (_IrodsEntityJSONDecoder, )).build()
 
+# Parsing of the timestamps given by baton
+_TIMESTAMP_PATTERN = re.compile(r"^(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(Z?)$")
+_TIMESTAMP_CACHE_SIZE = 4096
+_DATE_PARSER = parser()
+_UTC = tzutc()
+
+def parse_timestamp(timestamp_as_string: str) -> datetime:
+    """
+    Parses the given timestamp. Timestamps in the format that baton uses (e.g. "2016-02-09T15:22:52", optionally
+    followed by "Z") are parsed directly; any other format is parsed by dateutil.
+    :param timestamp_as_string: the timestamp to parse
+    :return: the parsed timestamp
+    """
+    match = _TIMESTAMP_PATTERN.match(timestamp_as_string)
+    if match is None:
+        return _DATE_PARSER.parse(timestamp_as_string)
+    year, month, day, hour, minute, second, utc = match.groups()
+    return datetime(int(year), int(month), int(day), int(hour), int(minute), int(second),
+                    tzinfo=_UTC if utc else None)
+
+# Replicas often share timestamps and `datetime` instances are immutable so the same instance can be safely reused
+_parse_timestamp_cached = lru_cache(maxsize=_TIMESTAMP_CACHE_SIZE)(parse_timestamp)   # type: Callable[[str], datetime]
+
+def set_timestamp_cache_size(maxsize: int):
+    """
+    Sets the number of parsed timestamps that are cached when decoding baton's output. The cache is shared by all
+    connections in the process, as the decoders are.
+    :param maxsize: the maximum number of parsed timestamps to cache (0 to not cache them)
+    """
+    global _parse_timestamp_cached
+    if maxsize < 0:
+        raise ValueError("Timestamp cache size cannot be negative: %d" % maxsize)
+    _parse_timestamp_cached = lru_cache(maxsize=maxsize)(parse_timestamp) if maxsize > 0 else parse_timestamp
+
+
 # Issue with baton https://github.com/wtsi-npg/baton/issues/146 makes dealing with timestamps a pain
 class DataObjectJSONEncoder(_DataObjectJSONEncoder):
     def default(self, serializable: Union[DataObject, List[DataObject]]) -> Dict:
@@ -187,8 +264,6 @@ class DataObjectJSONEncoder(_DataObjectJSONEncoder):
                 })
 
 class DataObjectJSONDecoder(_DataObjectJSONDecoder):
-    _DATE_PARSER = parser()
-
     def decode_parsed(self, json_as_dict: Union[Dict, List[Dict]]) -> DataObject:
         if isinstance(json_as_dict, List):
             return [self.decode_parsed(data_object_as_json) for data_object_as_json in json_as_dict]
@@ -207,10 +282,10 @@ class DataObjectJSONDecoder(_DataObjectJSONDecoder):
             assert replica is not None
             if BATON_TIMESTAMP_CREATED_PROPERTY in timestamp_as_json:
                 created_date_as_json = timestamp_as_json[BATON_TIMESTAMP_CREATED_PROPERTY]
-                replica.created = DataObjectJSONDecoder._DATE_PARSER.parse(created_date_as_json)
+                replica.created = _parse_timestamp_cached(created_date_as_json)
             elif BATON_TIMESTAMP_LAST_MODIFIED_PROPERTY in timestamp_as_json:
                 last_modified_date_as_json = timestamp_as_json[BATON_TIMESTAMP_LAST_MODIFIED_PROPERTY]
-                replica.last_modified = DataObjectJSONDecoder._DATE_PARSER.parse(last_modified_date_as_json)
+                replica.last_modified = _parse_timestamp_cached(last_modified_date_as_json)
 
 
 # JSON encoder/decoder for `Collection`
@@ -223,6 +298,225 @@ CollectionJSONDecoder = MappingJSONDecoderClassBuilder(
     Collection, _collection_json_mappings, (_IrodsEntityJSONDecoder, )).build()
 
 
+# Fast path decoders for baton's (parsed) JSON representation of iRODS entities. They produce models equal to those
+# given by the decoders above but work directly on the parsed dictionaries, skipping hgijson's generic mapping machinery
+# (which is the bottleneck when decoding many entities)
+def access_controls_from_baton_json(access_controls_as_json: List[Dict]) -> Set[AccessControl]:
+    """
+    Decodes the given baton JSON representation of an ACL.
+    :param access_controls_as_json: parsed baton JSON representation of the access controls
+    :return: the access controls
+    """
+    return {_intern_access_control(access_control_as_json[BATON_ACL_OWNER_PROPERTY],
+                                   access_control_as_json[BATON_ACL_ZONE_PROPERTY],
+                                   access_control_as_json[BATON_ACL_LEVEL_PROPERTY])
+            for access_control_as_json in access_controls_as_json}
+
+
+def irods_metadata_from_baton_json(avus_as_json: List[Dict]) -> IrodsMetadata:
+    """
+    Decodes the given baton JSON representation of AVUs.
+    :param avus_as_json: parsed baton JSON representation of the AVUs
+    :return: the iRODS metadata
+    """
+    metadata = dict()   # type: Dict[str, Set[str]]
+    for avu_as_json in avus_as_json:
+        attribute = avu_as_json[BATON_AVU_ATTRIBUTE_PROPERTY]
+        values = metadata.get(attribute)
+        if values is None:
+            metadata[sys.intern(attribute)] = {avu_as_json[BATON_AVU_VALUE_PROPERTY]}
+        else:
+            values.add(avu_as_json[BATON_AVU_VALUE_PROPERTY])
+    return IrodsMetadata(metadata)
+
+
+def replicas_from_baton_json(replicas_as_json: List[Dict], timestamps_as_json: List[Dict]=None) \
+        -> DataObjectReplicaCollection:
+    """
+    Decodes the given baton JSON representation of data object replicas.
+    :param replicas_as_json: parsed baton JSON representation of the replicas
+    :param timestamps_as_json: parsed baton JSON representation of the timestamps associated to the replicas (if any)
+    :return: the replicas
+    """
+    replicas = DataObjectReplicaCollection(
+        DataObjectReplica(replica_as_json[BATON_REPLICA_NUMBER_PROPERTY],
+                          replica_as_json[BATON_REPLICA_CHECKSUM_PROPERTY],
+                          replica_as_json.get(BATON_REPLICA_LOCATION_PROPERTY),
+                          replica_as_json.get(BATON_REPLICA_RESOURCE_PROPERTY),
+                          replica_as_json[BATON_REPLICA_VALID_PROPERTY])
+        for replica_as_json in replicas_as_json)
+    if timestamps_as_json is not None:
+        for timestamp_as_json in timestamps_as_json:
+            replica = replicas.get_by_number(timestamp_as_json[BATON_TIMESTAMP_REPLICA_NUMBER_LINK_PROPERTY])
+            assert replica is not None
+            if BATON_TIMESTAMP_CREATED_PROPERTY in timestamp_as_json:
+                replica.created = _parse_timestamp_cached(timestamp_as_json[BATON_TIMESTAMP_CREATED_PROPERTY])
+            elif BATON_TIMESTAMP_LAST_MODIFIED_PROPERTY in timestamp_as_json:
+                replica.last_modified = _parse_timestamp_cached(
+                    timestamp_as_json[BATON_TIMESTAMP_LAST_MODIFIED_PROPERTY])
+    return replicas
+
+
+def data_object_from_baton_json(data_object_as_json: Dict, lazy: bool=False) -> DataObject:
+    """
+    Decodes the given baton JSON representation of a data object. Equivalent to
+    `DataObjectJSONDecoder().decode_parsed(data_object_as_json)`.
+    :param data_object_as_json: parsed baton JSON representation of the data object
+    :param lazy: whether the access controls, metadata and replicas of the data object should only be decoded when they
+    are first used. The given JSON must not be changed afterwards
+    :return: the data object
+    """
+    data_object = DataObject("%s/%s" % (data_object_as_json[BATON_COLLECTION_PROPERTY],
+                                        data_object_as_json[BATON_DATA_OBJECT_PROPERTY]))
+    _set_irods_entity_properties(data_object, _data_object_properties_from_baton_json, data_object_as_json, lazy)
+    return data_object
+
+
+def collection_from_baton_json(collection_as_json: Dict, lazy: bool=False) -> Collection:
+    """
+    Decodes the given baton JSON representation of a collection. Equivalent to
+    `CollectionJSONDecoder().decode_parsed(collection_as_json)`.
+    :param collection_as_json: parsed baton JSON representation of the collection
+    :param lazy: whether the access controls and metadata of the collection should only be decoded when they are first
+    used. The given JSON must not be changed afterwards
+    :return: the collection
+    """
+    collection = Collection(collection_as_json[BATON_COLLECTION_PROPERTY])
+    _set_irods_entity_properties(collection, _irods_entity_properties_from_baton_json, collection_as_json, lazy)
+    return collection
+
+
+def _set_irods_entity_properties(irods_entity: IrodsEntity, properties_decoder: Callable[[Dict], Dict[str, Any]],
+                                 irods_entity_as_json: Dict, lazy: bool):
+    """
+    Sets the properties of the given entity that are decoded from its baton JSON representation.
+    :param irods_entity: the entity to set the properties of
+    :param properties_decoder: decodes the properties from the baton JSON representation of the entity
+    :param irods_entity_as_json: parsed baton JSON representation of the entity
+    :param lazy: whether the properties should only be decoded when first used
+    """
+    if lazy:
+        irods_entity._load_lazily(partial(properties_decoder, irods_entity_as_json))
+    else:
+        for property_name, value in properties_decoder(irods_entity_as_json).items():
+            setattr(irods_entity, property_name, value)
+
+
+def _irods_entity_properties_from_baton_json(irods_entity_as_json: Dict) -> Dict[str, Any]:
+    """
+    Decodes the access controls and metadata given in the baton JSON representation of an entity.
+    :param irods_entity_as_json: parsed baton JSON representation of the entity
+    :return: the decoded properties that were given, keyed by property name
+    """
+    properties = dict()     # type: Dict[str, Any]
+    access_controls_as_json = irods_entity_as_json.get(BATON_ACL_PROPERTY)
+    if access_controls_as_json is not None:
+        properties["access_controls"] = access_controls_from_baton_json(access_controls_as_json)
+    avus_as_json = irods_entity_as_json.get(BATON_AVU_PROPERTY)
+    if avus_as_json is not None:
+        properties["metadata"] = irods_metadata_from_baton_json(avus_as_json)
+    return properties
+
+
+def _data_object_properties_from_baton_json(data_object_as_json: Dict) -> Dict[str, Any]:
+    """
+    Decodes the access controls, metadata and replicas given in the baton JSON representation of a data object.
+    :param data_object_as_json: parsed baton JSON representation of the data object
+    :return: the decoded properties that were given, keyed by property name
+    """
+    properties = _irods_entity_properties_from_baton_json(data_object_as_json)
+    replicas_as_json = data_object_as_json.get(BATON_REPLICA_PROPERTY)
+    if replicas_as_json is not None:
+        properties["replicas"] = replicas_from_baton_json(
+            replicas_as_json, data_object_as_json.get(BATON_TIMESTAMP_PROPERTY))
+    return properties
+
+
+def path_from_baton_json(entity_as_json: Dict) -> str:
+    """
+    Gets the path of the data object or collection with the given baton JSON representation, without decoding it.
+    :param entity_as_json: parsed baton JSON representation of the entity
+    :return: the path of the entity
+    """
+    if BATON_DATA_OBJECT_PROPERTY in entity_as_json:
+        return "%s/%s" % (entity_as_json[BATON_COLLECTION_PROPERTY], entity_as_json[BATON_DATA_OBJECT_PROPERTY])
+    return entity_as_json[BATON_COLLECTION_PROPERTY].rstrip("/")
+
+
+def irods_entity_columns_from_baton_json(entities_as_json: Iterable[Dict], metadata_attributes: Iterable[str]=None) \
+        -> IrodsEntityColumns:
+    """
+    Decodes the given baton JSON representations of data objects and/or collections into columns, without creating
+    models of the entities.
+
+    The checksum of a data object is that of its lowest numbered up-to-date replica (or lowest numbered replica if none
+    are up-to-date). Its creation time is that of its earliest created replica and its last modification time is that
+    of its most recently modified replica.
+    :param entities_as_json: parsed baton JSON representations of the entities
+    :param metadata_attributes: the metadata attributes that are to have columns (`None` for all)
+    :return: the entities as columns
+    """
+    columns = IrodsEntityColumns(metadata_attributes)
+    for entity_as_json in entities_as_json:
+        path = path_from_baton_json(entity_as_json)
+
+        replicas_as_json = sorted(entity_as_json.get(BATON_REPLICA_PROPERTY, ()),
+                                  key=lambda replica_as_json: replica_as_json[BATON_REPLICA_NUMBER_PROPERTY])
+        checksum = None
+        if len(replicas_as_json) > 0:
+            up_to_date_replicas_as_json = [replica_as_json for replica_as_json in replicas_as_json
+                                           if replica_as_json[BATON_REPLICA_VALID_PROPERTY]]
+            checksum = (up_to_date_replicas_as_json or replicas_as_json)[0][BATON_REPLICA_CHECKSUM_PROPERTY]
+        resource_names = [replica_as_json.get(BATON_REPLICA_RESOURCE_PROPERTY) for replica_as_json in replicas_as_json]
+
+        created, last_modified = _entity_timestamps_from_baton_json(entity_as_json)
+
+        metadata = None
+        avus_as_json = entity_as_json.get(BATON_AVU_PROPERTY)
+        if avus_as_json is not None:
+            metadata = dict()   # type: Dict[str, Set[str]]
+            for avu_as_json in avus_as_json:
+                metadata.setdefault(avu_as_json[BATON_AVU_ATTRIBUTE_PROPERTY], set()).add(
+                    avu_as_json[BATON_AVU_VALUE_PROPERTY])
+
+        columns.append(path, checksum, resource_names, created, last_modified, metadata)
+    return columns
+
+
+def irods_entity_stat_from_baton_json(entity_as_json: Dict) -> IrodsEntityStat:
+    """
+    Decodes the given baton JSON representation of a data object or collection into a record of its basic properties,
+    without decoding a model of it.
+    :param entity_as_json: parsed baton JSON representation of the entity
+    :return: the record of the entity
+    """
+    created, last_modified = _entity_timestamps_from_baton_json(entity_as_json)
+    return IrodsEntityStat(path_from_baton_json(entity_as_json), entity_as_json.get(BATON_SIZE_PROPERTY),
+                           entity_as_json.get(BATON_CHECKSUM_PROPERTY), created, last_modified)
+
+
+def _entity_timestamps_from_baton_json(entity_as_json: Dict) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Decodes when the entity with the given baton JSON representation was created (i.e. its earliest created replica)
+    and last modified (i.e. its most recently modified replica).
+    :param entity_as_json: parsed baton JSON representation of the entity
+    :return: tuple where the first element is when the entity was created and the second is when it was last modified
+    (either `None` if not known)
+    """
+    created = None
+    last_modified = None
+    for timestamp_as_json in entity_as_json.get(BATON_TIMESTAMP_PROPERTY, ()):
+        if BATON_TIMESTAMP_CREATED_PROPERTY in timestamp_as_json:
+            timestamp = _parse_timestamp_cached(timestamp_as_json[BATON_TIMESTAMP_CREATED_PROPERTY])
+            if created is None or timestamp < created:
+                created = timestamp
+        elif BATON_TIMESTAMP_LAST_MODIFIED_PROPERTY in timestamp_as_json:
+            timestamp = _parse_timestamp_cached(timestamp_as_json[BATON_TIMESTAMP_LAST_MODIFIED_PROPERTY])
+            if last_modified is None or timestamp > last_modified:
+                last_modified = timestamp
+    return created, last_modified
+
+
 # JSON encoder/decoder for `SearchCriterion`
 def _parse_operator_as_string(operator_as_string: str) -> ComparisonOperator:
     for key, value in BATON_SEARCH_CRITERION_COMPARISON_OPERATORS.items():
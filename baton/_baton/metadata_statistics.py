@@ -0,0 +1,96 @@
+from collections import Counter
+from typing import Union, Iterable, Dict, Optional
+
+from baton._baton._query_planner import COMPARISONS
+from baton.models import IrodsEntity, SearchCriterion
+from hgicommon.enums import ComparisonOperator
+
+
+class IrodsMetadataStatistics:
+    """
+    Statistics about how common metadata attributes and values are, collected from a sample of entities (e.g. the
+    results of previous queries or a crawl of collections). They are used to estimate the selectivity of search criteria
+    when planning metadata queries.
+
+    The statistics are not thread-safe whilst they are being collected.
+    """
+    def __init__(self, entities: Iterable[IrodsEntity]=()):
+        """
+        Constructor.
+        :param entities: (optional) entities to collect statistics from initially
+        """
+        self.number_of_entities = 0
+        self._value_counts = dict()    # type: Dict[str, Counter]
+        self.add(entities)
+
+    def add(self, entities: Union[IrodsEntity, Iterable[IrodsEntity]]):
+        """
+        Collects statistics from the metadata of the given entities. Entities whose metadata has not been loaded are
+        ignored.
+        :param entities: the entity or entities
+        """
+        if isinstance(entities, IrodsEntity):
+            entities = [entities]
+        for entity in entities:
+            if entity.metadata is None:
+                continue
+            self.number_of_entities += 1
+            for attribute, values in entity.metadata.items():
+                value_counts = self._value_counts.get(attribute)
+                if value_counts is None:
+                    value_counts = self._value_counts[attribute] = Counter()
+                value_counts.update(values)
+
+    def crawl(self, connection: "Connection", collection_paths: Union[str, Iterable[str]], max_entities: int=10000):
+        """
+        Collects statistics from the entities within the given collections in iRODS (at any depth), crawling a level at
+        a time until the given number of entities have been sampled.
+        :param connection: connection to iRODS
+        :param collection_paths: the path(s) of the collections
+        :param max_entities: the maximum number of entities to sample
+        """
+        if isinstance(collection_paths, str):
+            collection_paths = [collection_paths]
+        collection_paths = list(collection_paths)
+        # Only metadata is loaded, as the other properties (e.g. replicas and access controls) are not sampled
+        load_properties = [IrodsEntity.Property.METADATA]
+        sampled = 0
+        while len(collection_paths) > 0 and sampled < max_entities:
+            data_objects = connection.data_object.get_all_in_collection(
+                collection_paths, load_properties=load_properties)[:max_entities - sampled]
+            self.add(data_objects)
+            sampled += len(data_objects)
+            collections = connection.collection.get_all_in_collection(
+                collection_paths, load_properties=load_properties)[:max_entities - sampled]
+            self.add(collections)
+            sampled += len(collections)
+            collection_paths = [collection.path for collection in collections]
+
+    def estimate_selectivity(self, search_criterion: SearchCriterion) -> Optional[float]:
+        """
+        Estimates the fraction of entities that match the given search criterion.
+
+        Values of an attribute that have not been sampled are estimated to be as common as the attribute's average
+        value, such that identifiers (e.g. of samples) that are unlikely to be sampled are still estimated to be
+        selective.
+        :param search_criterion: the search criterion
+        :return: the estimated fraction of entities that match (`None` if unknown, as no statistics have been collected
+        or the attribute has not been sampled)
+        """
+        if search_criterion.comparison_operator not in COMPARISONS:
+            raise ValueError("Unsupported comparison operator: %s" % search_criterion.comparison_operator)
+        if self.number_of_entities == 0:
+            return None
+        value_counts = self._value_counts.get(search_criterion.attribute)
+        if value_counts is None:
+            return None
+
+        if search_criterion.comparison_operator == ComparisonOperator.EQUALS:
+            matched = value_counts.get(search_criterion.value)
+            if matched is None:
+                matched = sum(value_counts.values()) / len(value_counts)
+        else:
+            compare = COMPARISONS[search_criterion.comparison_operator]
+            # Entities with many matching values are counted more than once, hence the estimate is capped
+            matched = sum(count for value, count in value_counts.items() if compare(value, search_criterion.value))
+        return min(matched / self.number_of_entities, 1.0)
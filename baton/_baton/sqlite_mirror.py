@@ -0,0 +1,442 @@
+import sqlite3
+from collections import OrderedDict
+from datetime import datetime
+from threading import Lock
+from typing import Union, Sequence, Iterable, List, Dict, Optional, Tuple, Iterator, Type, Any
+
+from baton._baton.api import Connection
+from baton._baton.json import parse_timestamp
+from baton.collections import IrodsMetadata
+from baton.models import IrodsEntity, DataObject, Collection, DataObjectReplica, AccessControl, User, \
+    SearchCriterion, MirrorChanges
+from hgicommon.enums import ComparisonOperator
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS mirrored_collection (
+        path TEXT PRIMARY KEY
+    );
+    CREATE TABLE IF NOT EXISTS entity (
+        id INTEGER PRIMARY KEY,
+        path TEXT NOT NULL UNIQUE,
+        is_data_object INTEGER NOT NULL,
+        last_modified TEXT,
+        has_metadata INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS avu (
+        entity_id INTEGER NOT NULL REFERENCES entity(id) ON DELETE CASCADE,
+        attribute TEXT NOT NULL,
+        value TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS avu_entity_id ON avu(entity_id);
+    CREATE INDEX IF NOT EXISTS avu_attribute_value ON avu(attribute, value);
+    CREATE TABLE IF NOT EXISTS access_control (
+        entity_id INTEGER NOT NULL REFERENCES entity(id) ON DELETE CASCADE,
+        owner TEXT NOT NULL,
+        zone TEXT NOT NULL,
+        level TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS access_control_entity_id ON access_control(entity_id);
+    CREATE TABLE IF NOT EXISTS replica (
+        entity_id INTEGER NOT NULL REFERENCES entity(id) ON DELETE CASCADE,
+        number INTEGER NOT NULL,
+        checksum TEXT,
+        host TEXT,
+        resource_name TEXT,
+        up_to_date INTEGER,
+        created TEXT,
+        last_modified TEXT
+    );
+    CREATE INDEX IF NOT EXISTS replica_entity_id ON replica(entity_id);
+"""
+
+# SQL comparisons of text are the same as those that the iCAT uses for metadata queries
+_SQL_COMPARISON_OPERATORS = {
+    ComparisonOperator.EQUALS: "=",
+    ComparisonOperator.LESS_THAN: "<",
+    ComparisonOperator.GREATER_THAN: ">"
+}
+
+# Maximum number of parameters given in a single SQL statement (SQLite's default limit is 999)
+_MAX_SQL_PARAMETERS = 500
+
+# Condition (with three parameters) for the paths of a collection and of the entities within it, which can use the
+# index of paths
+_SQL_IN_COLLECTION_CONDITION = "(path = ? OR (path > ? AND path < ?))"
+
+
+class SqliteMirror:
+    """
+    Local mirror, held in a SQLite database, of the data objects and collections (with their metadata, access controls,
+    replicas and timestamps) in collections in iRODS.
+
+    A mirror is built by crawling the collections with `get_all_in_collection` and can then answer `get_by_path` and
+    `get_by_metadata` without querying iRODS. It is refreshed incrementally: entities that have appeared or disappeared
+    are added or removed and data objects whose last modification time has changed are fetched again. Changes to
+    metadata and access controls alone do not change the last modification time of an entity in iRODS, therefore
+    `build` must be used to pick them up.
+    """
+    def __init__(self, connection: Connection, database_location: str=":memory:"):
+        """
+        Constructor.
+        :param connection: connection to iRODS used to build and refresh the mirror
+        :param database_location: the location of the SQLite database (created if it does not exist)
+        """
+        self._connection = connection
+        self._lock = Lock()
+        self._database = sqlite3.connect(database_location, check_same_thread=False)
+        self._database.execute("PRAGMA foreign_keys = ON")
+        with self._database:
+            self._database.executescript(_SCHEMA)
+
+    def get_mirrored_collection_paths(self) -> List[str]:
+        """
+        Gets the paths of the collections that are mirrored.
+        :return: the paths of the mirrored collections
+        """
+        with self._lock:
+            return [row[0] for row in self._database.execute("SELECT path FROM mirrored_collection ORDER BY path")]
+
+    def build(self, collection_paths: Union[str, Iterable[str]]):
+        """
+        Builds the mirror of the given collections (and everything within them), replacing any existing mirror of them.
+        :param collection_paths: the paths of the collections to mirror
+        """
+        if isinstance(collection_paths, str):
+            collection_paths = [collection_paths]
+        for collection_path in collection_paths:
+            collection_path = collection_path.rstrip("/")
+            entities = list(self._crawl(collection_path, True))
+            with self._lock, self._database:
+                self._delete_entities_in(collection_path)
+                self._insert_entities(entities)
+                self._database.execute("INSERT OR IGNORE INTO mirrored_collection (path) VALUES (?)",
+                                       (collection_path, ))
+
+    def refresh(self, collection_paths: Union[str, Iterable[str]]=None) -> MirrorChanges:
+        """
+        Incrementally refreshes the mirror of the given collections, fetching from iRODS only the metadata of entities
+        that have been added or (for data objects) modified since the mirror was built or last refreshed.
+        :param collection_paths: the paths of the mirrored collections to refresh (`None` for all)
+        :return: the changes made to the mirror
+        """
+        if collection_paths is None:
+            collection_paths = self.get_mirrored_collection_paths()
+        elif isinstance(collection_paths, str):
+            collection_paths = [collection_paths]
+
+        changes = MirrorChanges()
+        for collection_path in collection_paths:
+            collection_path = collection_path.rstrip("/")
+            if collection_path not in self.get_mirrored_collection_paths():
+                raise ValueError("Collection is not mirrored: %s" % collection_path)
+            with self._lock:
+                mirrored_last_modified = self._get_last_modified_of_entities_in(collection_path)
+
+            entities = OrderedDict((entity.path, entity) for entity in self._crawl(collection_path, False))
+            added = [path for path in entities.keys() if path not in mirrored_last_modified]
+            modified = [path for path, entity in entities.items() if path in mirrored_last_modified
+                        and SqliteMirror._get_last_modified(entity) != mirrored_last_modified[path]]
+            removed = [path for path in mirrored_last_modified.keys() if path not in entities]
+
+            entities_to_update = [entities[path] for path in added + modified]
+            self._load_metadata(entities_to_update)
+            with self._lock, self._database:
+                self._delete_entities(added + modified + removed)
+                self._insert_entities(entities_to_update)
+
+            changes.added.extend(added)
+            changes.modified.extend(modified)
+            changes.removed.extend(removed)
+        return changes
+
+    def get_by_path(self, paths: Union[str, Sequence[str]], load_metadata: bool=True) \
+            -> Union[IrodsEntity, List[IrodsEntity]]:
+        """
+        Gets the mirrored entities with the given paths.
+
+        A `FileNotFoundError` is raised if an entity with one of the paths is not in the mirror.
+        :param paths: the path(s) of the entities
+        :param load_metadata: whether the metadata of the entities should be loaded
+        :return: the mirrored entity or entities, in the same order as the given paths
+        """
+        single_path = isinstance(paths, str)
+        if single_path:
+            paths = [paths]
+
+        with self._lock:
+            entity_rows = []
+            for paths_chunk in _chunk(paths):
+                entity_rows.extend(self._database.execute(
+                    "SELECT id, path, is_data_object, has_metadata FROM entity WHERE path IN (%s)"
+                    % _placeholders(paths_chunk), paths_chunk))
+            entities = self._create_entities(entity_rows, load_metadata)
+
+        entities_by_path = {entity.path: entity for entity in entities}
+        for path in paths:
+            if path not in entities_by_path:
+                raise FileNotFoundError("Not in mirror: %s" % path)
+        if single_path:
+            return entities_by_path[paths[0]]
+        return [entities_by_path[path] for path in paths]
+
+    def get_all(self, load_metadata: bool=True, entity_type: Type[IrodsEntity]=IrodsEntity) -> List[IrodsEntity]:
+        """
+        Gets all of the mirrored entities (e.g. to populate an `IrodsMetadataIndex`).
+        :param load_metadata: whether the metadata of the entities should be loaded
+        :param entity_type: the type of the entities to get (`DataObject`, `Collection` or `IrodsEntity` for both)
+        :return: the mirrored entities, ordered by path
+        """
+        condition = ""
+        parameters = []     # type: List[Any]
+        if entity_type is not IrodsEntity:
+            condition = "WHERE is_data_object = ?"
+            parameters.append(int(issubclass(entity_type, DataObject)))
+
+        with self._lock:
+            entity_rows = self._database.execute(
+                "SELECT id, path, is_data_object, has_metadata FROM entity %s ORDER BY path" % condition,
+                parameters).fetchall()
+            return self._create_entities(entity_rows, load_metadata)
+
+    def get_by_metadata(self, metadata_search_criteria: Union[SearchCriterion, Iterable[SearchCriterion]],
+                        load_metadata: bool=True, entity_type: Type[IrodsEntity]=IrodsEntity) -> List[IrodsEntity]:
+        """
+        Gets the mirrored entities that have metadata that matches all of the given search criteria, comparing values
+        in the same way as iRODS.
+        :param metadata_search_criteria: the metadata search criteria
+        :param load_metadata: whether the metadata of the entities should be loaded
+        :param entity_type: the type of the entities to get (`DataObject`, `Collection` or `IrodsEntity` for both)
+        :return: the matched entities, ordered by path
+        """
+        if isinstance(metadata_search_criteria, SearchCriterion):
+            metadata_search_criteria = [metadata_search_criteria]
+
+        conditions = []
+        parameters = []     # type: List[Any]
+        for search_criterion in metadata_search_criteria:
+            if search_criterion.comparison_operator not in _SQL_COMPARISON_OPERATORS:
+                raise ValueError("Unsupported comparison operator: %s" % search_criterion.comparison_operator)
+            conditions.append("id IN (SELECT entity_id FROM avu WHERE attribute = ? AND value %s ?)"
+                              % _SQL_COMPARISON_OPERATORS[search_criterion.comparison_operator])
+            parameters.extend([search_criterion.attribute, search_criterion.value])
+        if len(conditions) == 0:
+            raise ValueError("At least one search criterion must be given")
+        if entity_type is not IrodsEntity:
+            conditions.append("is_data_object = ?")
+            parameters.append(int(issubclass(entity_type, DataObject)))
+
+        with self._lock:
+            entity_rows = self._database.execute(
+                "SELECT id, path, is_data_object, has_metadata FROM entity WHERE %s ORDER BY path"
+                % " AND ".join(conditions), parameters).fetchall()
+            return self._create_entities(entity_rows, load_metadata)
+
+    def close(self):
+        """
+        Closes the mirror's database.
+        """
+        with self._lock:
+            self._database.close()
+
+    def _crawl(self, collection_path: str, load_metadata: bool) -> Iterator[IrodsEntity]:
+        """
+        Crawls the given collection in iRODS, a level at a time, getting it and all of the entities within it.
+        :param collection_path: the path of the collection
+        :param load_metadata: whether to load the metadata of the entities
+        :return: iterator of the collection and the entities within it
+        """
+        yield self._connection.collection.get_by_path(collection_path, load_metadata=load_metadata)
+        collection_paths = [collection_path]
+        while len(collection_paths) > 0:
+            for data_object in self._connection.data_object.get_all_in_collection(collection_paths, load_metadata):
+                yield data_object
+            collections = self._connection.collection.get_all_in_collection(collection_paths, load_metadata)
+            for collection in collections:
+                yield collection
+            collection_paths = [collection.path for collection in collections]
+
+    def _load_metadata(self, entities: Sequence[IrodsEntity]):
+        """
+        Loads the metadata of the given entities from iRODS.
+        :param entities: the entities to load the metadata of
+        """
+        for entity_type, mapper in ((DataObject, self._connection.data_object),
+                                    (Collection, self._connection.collection)):
+            entities_of_type = [entity for entity in entities if isinstance(entity, entity_type)]
+            if len(entities_of_type) > 0:
+                metadata_for_entities = mapper.metadata.get_all([entity.path for entity in entities_of_type])
+                for entity, metadata in zip(entities_of_type, metadata_for_entities):
+                    entity.metadata = metadata
+
+    def _get_last_modified_of_entities_in(self, collection_path: str) -> Dict[str, Optional[str]]:
+        """
+        Gets the mirrored last modification times of the given collection and of the entities within it. Must be
+        called whilst holding the lock.
+        :param collection_path: the path of the collection
+        :return: the last modification times (`None` for collections) keyed by path
+        """
+        return dict(self._database.execute(
+            "SELECT path, last_modified FROM entity WHERE %s" % _SQL_IN_COLLECTION_CONDITION,
+            _sql_in_collection_parameters(collection_path)))
+
+    def _delete_entities_in(self, collection_path: str):
+        """
+        Deletes the given collection, and the entities within it, from the mirror. Must be called whilst holding the
+        lock.
+        :param collection_path: the path of the collection
+        """
+        self._database.execute("DELETE FROM entity WHERE %s" % _SQL_IN_COLLECTION_CONDITION,
+                               _sql_in_collection_parameters(collection_path))
+
+    def _delete_entities(self, paths: Sequence[str]):
+        """
+        Deletes the entities with the given paths from the mirror. Must be called whilst holding the lock.
+        :param paths: the paths of the entities
+        """
+        for paths_chunk in _chunk(paths):
+            self._database.execute("DELETE FROM entity WHERE path IN (%s)" % _placeholders(paths_chunk), paths_chunk)
+
+    def _insert_entities(self, entities: Iterable[IrodsEntity]):
+        """
+        Inserts the given entities into the mirror. Must be called whilst holding the lock.
+        :param entities: the entities to insert
+        """
+        for entity in entities:
+            is_data_object = isinstance(entity, DataObject)
+            entity_id = self._database.execute(
+                "INSERT INTO entity (path, is_data_object, last_modified, has_metadata) VALUES (?, ?, ?, ?)",
+                (entity.path, int(is_data_object), SqliteMirror._get_last_modified(entity),
+                 int(entity.metadata is not None))).lastrowid
+            if entity.metadata is not None:
+                self._database.executemany(
+                    "INSERT INTO avu (entity_id, attribute, value) VALUES (?, ?, ?)",
+                    [(entity_id, attribute, value) for attribute, values in entity.metadata.items()
+                     for value in values])
+            if entity.access_controls is not None:
+                self._database.executemany(
+                    "INSERT INTO access_control (entity_id, owner, zone, level) VALUES (?, ?, ?, ?)",
+                    [(entity_id, access_control.user.name, access_control.user.zone, access_control.level.name)
+                     for access_control in entity.access_controls])
+            if is_data_object and entity.replicas is not None:
+                self._database.executemany(
+                    "INSERT INTO replica (entity_id, number, checksum, host, resource_name, up_to_date, created, "
+                    "last_modified) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(entity_id, replica.number, replica.checksum, replica.host, replica.resource_name,
+                      replica.up_to_date, _timestamp_to_text(replica.created),
+                      _timestamp_to_text(replica.last_modified)) for replica in entity.replicas])
+
+    def _create_entities(self, entity_rows: Sequence[Tuple], load_metadata: bool) -> List[IrodsEntity]:
+        """
+        Creates models of the mirrored entities with the given rows of the entity table. Must be called whilst holding
+        the lock.
+        :param entity_rows: rows of the entity table, with the columns: id, path, is_data_object and has_metadata
+        :param load_metadata: whether the metadata of the entities should be loaded
+        :return: the entities, in the same order as the rows
+        """
+        entity_ids = [entity_row[0] for entity_row in entity_rows]
+        access_controls = self._select_by_entity_id(
+            "SELECT entity_id, owner, zone, level FROM access_control", entity_ids)
+        replicas = self._select_by_entity_id(
+            "SELECT entity_id, number, checksum, host, resource_name, up_to_date, created, last_modified "
+            "FROM replica", entity_ids, order_by="number")
+        avus = self._select_by_entity_id("SELECT entity_id, attribute, value FROM avu", entity_ids) \
+            if load_metadata else {}
+
+        entities = []
+        for entity_id, path, is_data_object, has_metadata in entity_rows:
+            metadata = None
+            if load_metadata and has_metadata:
+                metadata = IrodsMetadata()
+                for attribute, value in avus.get(entity_id, ()):
+                    metadata.add(attribute, value)
+            entity_access_controls = [AccessControl(User(owner, zone), AccessControl.Level[level])
+                                      for owner, zone, level in access_controls.get(entity_id, ())]
+            if is_data_object:
+                entity_replicas = [
+                    DataObjectReplica(number, checksum, host, resource_name,
+                                      bool(up_to_date) if up_to_date is not None else None,
+                                      _text_to_timestamp(created), _text_to_timestamp(last_modified))
+                    for number, checksum, host, resource_name, up_to_date, created, last_modified
+                    in replicas.get(entity_id, ())]
+                entities.append(DataObject(path, entity_access_controls, metadata, entity_replicas))
+            else:
+                entities.append(Collection(path, entity_access_controls, metadata))
+        return entities
+
+    def _select_by_entity_id(self, select: str, entity_ids: Sequence[int], order_by: str=None) \
+            -> Dict[int, List[Tuple]]:
+        """
+        Selects the rows that relate to the entities with the given IDs. Must be called whilst holding the lock.
+        :param select: select statement (without a where clause), in which the first column is the entity ID
+        :param entity_ids: the IDs of the entities
+        :param order_by: the column(s) to order the rows of each entity by (`None` if unordered)
+        :return: the selected rows (without the entity ID) grouped by entity ID
+        """
+        rows_by_entity_id = dict()     # type: Dict[int, List[Tuple]]
+        for entity_ids_chunk in _chunk(entity_ids):
+            statement = "%s WHERE entity_id IN (%s)" % (select, _placeholders(entity_ids_chunk))
+            if order_by is not None:
+                statement = "%s ORDER BY %s" % (statement, order_by)
+            for row in self._database.execute(statement, entity_ids_chunk):
+                rows_by_entity_id.setdefault(row[0], []).append(row[1:])
+        return rows_by_entity_id
+
+    @staticmethod
+    def _get_last_modified(entity: IrodsEntity) -> Optional[str]:
+        """
+        Gets the time at which the given entity was last modified, as stored in the mirror.
+        :param entity: the entity
+        :return: the time that the most recently modified replica of the entity was modified (`None` if not known)
+        """
+        if not isinstance(entity, DataObject) or entity.replicas is None:
+            return None
+        last_modified = [replica.last_modified for replica in entity.replicas if replica.last_modified is not None]
+        return _timestamp_to_text(max(last_modified)) if len(last_modified) > 0 else None
+
+
+def _sql_in_collection_parameters(collection_path: str) -> Tuple[str, str, str]:
+    """
+    Gets the parameters of `_SQL_IN_COLLECTION_CONDITION` for the given collection.
+    :param collection_path: the path of the collection
+    :return: the parameters
+    """
+    # Paths within the collection start with the collection path followed by the separator, which all sort between
+    # that prefix and the prefix with the separator replaced by the character that follows it
+    return collection_path, "%s/" % collection_path, "%s%s" % (collection_path, chr(ord("/") + 1))
+
+
+def _chunk(items: Sequence[Any]) -> Iterator[Sequence[Any]]:
+    """
+    Splits the given items into chunks that can be given as parameters to a single SQL statement.
+    :param items: the items to split
+    :return: iterator of the chunks
+    """
+    for i in range(0, len(items), _MAX_SQL_PARAMETERS):
+        yield items[i:i + _MAX_SQL_PARAMETERS]
+
+
+def _placeholders(items: Sequence[Any]) -> str:
+    """
+    Creates the SQL parameter placeholders for the given items.
+    :param items: the items
+    :return: the placeholders, separated by commas
+    """
+    return ", ".join("?" for _ in items)
+
+
+def _timestamp_to_text(timestamp: Optional[datetime]) -> Optional[str]:
+    """
+    Converts the given timestamp to the text that represents it in the mirror.
+    :param timestamp: the timestamp (or `None`)
+    :return: the timestamp in ISO 8601 format (or `None`)
+    """
+    return timestamp.isoformat() if timestamp is not None else None
+
+
+def _text_to_timestamp(text: Optional[str]) -> Optional[datetime]:
+    """
+    Converts the given text that represents a timestamp in the mirror to the timestamp.
+    :param text: the timestamp in ISO 8601 format (or `None`)
+    :return: the timestamp (or `None`)
+    """
+    return parse_timestamp(text) if text is not None else None
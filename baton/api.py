@@ -1 +1 @@
-from baton._baton.api import Connection, connect_to_irods_with_baton
+from baton._baton.api import Connection, AsyncConnection, connect_to_irods_with_baton
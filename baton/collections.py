@@ -1,7 +1,13 @@
+import bisect
 import collections
-from typing import Dict, Sequence, Union, Optional, Sized, Iterable, Any, Set, Container
+import importlib
+import operator
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Sequence, Union, Optional, Sized, Iterable, Any, Set, Container, List, Tuple
 
 from hgicommon.collections import Metadata
+from hgicommon.enums import ComparisonOperator
 
 
 class IrodsMetadata(Metadata):
@@ -158,3 +164,419 @@ class DataObjectReplicaCollection(Sized, Iterable, Container):
 
     def __contains__(self, item: Any) -> bool:
         return item in self._data.values()
+
+
+class IrodsEntityColumns(Sized):
+    """
+    Columnar representation of iRODS entities, where each property of the entities is held in a separate column (all of
+    the same length), suited to vectorised filtering and aggregation.
+
+    Numeric columns (`replica_count`) and timestamp columns (`created` and `last_modified`, in microseconds since the
+    epoch in UTC, with `NO_TIMESTAMP` if unknown) are contiguous arrays that NumPy can view without copying (see
+    `to_numpy_columns`). Columns of the values of metadata attributes hold `None` if an entity does not have the
+    attribute, the value if it has one value and a sorted tuple of the values if it has many.
+    """
+    NO_TIMESTAMP = -2 ** 63     # Interpreted as "NaT" by NumPy
+    METADATA_COLUMN_PREFIX = "metadata:"
+    _TIMESTAMP_COLUMNS = ("created", "last_modified")
+    _EPOCH = datetime(1970, 1, 1)
+    _EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+    def __init__(self, metadata_attributes: Iterable[str]=None):
+        """
+        Constructor.
+        :param metadata_attributes: the metadata attributes that are to have columns (`None` if every attribute that
+        the entities have is to have a column)
+        """
+        self.path = []   # type: List[str]
+        self.collection = []    # type: List[str]
+        self.checksum = []  # type: List[Optional[str]]
+        self.replica_count = array("q")
+        self.resource_names = []    # type: List[Tuple[str, ...]]
+        self.created = array("q")
+        self.last_modified = array("q")
+        self.metadata = collections.OrderedDict(
+            (attribute, []) for attribute in (metadata_attributes or ()))   # type: Dict[str, List[Any]]
+        self._all_metadata_attributes = metadata_attributes is None
+
+    def append(self, path: str, checksum: str=None, resource_names: Sequence[str]=(), created: datetime=None,
+               last_modified: datetime=None, metadata: Dict[str, Set[str]]=None):
+        """
+        Appends an entity to the columns.
+        :param path: the path of the entity
+        :param checksum: the checksum of the entity (if a data object)
+        :param resource_names: the names of the resources of the entity's replicas (if a data object)
+        :param created: when the entity was created (if known)
+        :param last_modified: when the entity was last modified (if known)
+        :param metadata: the metadata of the entity (if loaded)
+        """
+        number_of_entities = len(self.path)
+        self.path.append(path)
+        self.collection.append(path.rsplit("/", 1)[0])
+        self.checksum.append(checksum)
+        self.replica_count.append(len(resource_names))
+        self.resource_names.append(tuple(resource_names))
+        self.created.append(IrodsEntityColumns._to_microseconds(created))
+        self.last_modified.append(IrodsEntityColumns._to_microseconds(last_modified))
+
+        if metadata is None:
+            metadata = {}
+        if self._all_metadata_attributes:
+            for attribute in metadata.keys():
+                if attribute not in self.metadata:
+                    self.metadata[attribute] = [None] * number_of_entities
+        for attribute, column in self.metadata.items():
+            values = metadata.get(attribute)
+            if not values:
+                column.append(None)
+            elif len(values) == 1:
+                column.append(next(iter(values)))
+            else:
+                column.append(tuple(sorted(values)))
+
+    def get_columns(self) -> Dict[str, Union[List[Any], array]]:
+        """
+        Gets all of the columns, keyed by name. Metadata columns are named using `METADATA_COLUMN_PREFIX` followed by
+        their attribute.
+        :return: the columns
+        """
+        columns = collections.OrderedDict([
+            ("path", self.path),
+            ("collection", self.collection),
+            ("checksum", self.checksum),
+            ("replica_count", self.replica_count),
+            ("resource_names", self.resource_names),
+            ("created", self.created),
+            ("last_modified", self.last_modified)
+        ])
+        for attribute, column in self.metadata.items():
+            columns["%s%s" % (IrodsEntityColumns.METADATA_COLUMN_PREFIX, attribute)] = column
+        return columns
+
+    def to_numpy_columns(self) -> Dict[str, Any]:
+        """
+        Converts the columns to NumPy arrays, keyed by name. The arrays of numeric and timestamp columns are views of the
+        columns rather than copies (therefore no more entities can be appended whilst they are in use). Requires NumPy.
+        :return: the columns as NumPy arrays
+        """
+        numpy = _import_optional_dependency("numpy")
+        numpy_columns = collections.OrderedDict()
+        for name, column in self.get_columns().items():
+            if isinstance(column, array):
+                dtype = "datetime64[us]" if name in IrodsEntityColumns._TIMESTAMP_COLUMNS else numpy.int64
+                numpy_columns[name] = numpy.frombuffer(column, dtype=dtype) if len(column) > 0 \
+                    else numpy.empty(0, dtype=dtype)
+            else:
+                # Filled element-wise so that tuples are not interpreted as another dimension
+                numpy_column = numpy.empty(len(column), dtype=object)
+                for i, value in enumerate(column):
+                    numpy_column[i] = value
+                numpy_columns[name] = numpy_column
+        return numpy_columns
+
+    def to_numpy(self) -> Any:
+        """
+        Converts the columns to a NumPy structured array, with a field for each column. Requires NumPy.
+
+        Unlike `to_numpy_columns`, this cannot avoid copying: the fields of each record of a structured array are held
+        together in a single buffer, whereas each column is held in a buffer of its own. Each column is therefore copied
+        once, numeric and timestamp columns from views of their buffers (see `to_numpy_columns`) and other columns
+        (e.g. of strings) from their Python objects. Use `to_numpy_columns` for an export without copying.
+        :return: the structured array
+        """
+        numpy = _import_optional_dependency("numpy")
+        columns = self.get_columns()
+        dtypes = [(name, ("datetime64[us]" if name in IrodsEntityColumns._TIMESTAMP_COLUMNS else numpy.int64)
+                   if isinstance(column, array) else object) for name, column in columns.items()]
+        structured_array = numpy.empty(len(self), dtype=dtypes)
+        if len(self) == 0:
+            return structured_array
+        for (name, dtype), column in zip(dtypes, columns.values()):
+            if isinstance(column, array):
+                structured_array[name] = numpy.frombuffer(column, dtype=dtype)
+            else:
+                # Assigned element-wise so that tuples are not interpreted as another dimension
+                field = structured_array[name]
+                for i, value in enumerate(column):
+                    field[i] = value
+        return structured_array
+
+    def to_data_frame(self) -> Any:
+        """
+        Converts the columns to a pandas `DataFrame`. Requires NumPy and pandas.
+        :return: the data frame
+        """
+        pandas = _import_optional_dependency("pandas")
+        return pandas.DataFrame(self.to_numpy_columns(), columns=list(self.get_columns().keys()))
+
+    @staticmethod
+    def _to_microseconds(timestamp: Optional[datetime]) -> int:
+        """
+        Converts the given timestamp to microseconds since the epoch. Timestamps without a timezone are taken as UTC.
+        :param timestamp: the timestamp to convert
+        :return: microseconds since the epoch (`NO_TIMESTAMP` if the given timestamp is `None`)
+        """
+        if timestamp is None:
+            return IrodsEntityColumns.NO_TIMESTAMP
+        epoch = IrodsEntityColumns._EPOCH if timestamp.tzinfo is None else IrodsEntityColumns._EPOCH_UTC
+        since_epoch = timestamp - epoch
+        return (since_epoch.days * 86400 + since_epoch.seconds) * 1000000 + since_epoch.microseconds
+
+    def __len__(self) -> int:
+        return len(self.path)
+
+
+class IrodsMetadataIndex(Sized):
+    """
+    In-memory inverted index of the metadata of iRODS entities (attribute -> value -> paths of the entities with that
+    attribute-value pair), which answers metadata queries without a round trip to iRODS.
+
+    Values are compared as text, in the same way as iRODS. Unlike baton, a query may have many criteria on the same
+    attribute (e.g. to find values within a range, which a single value of the attribute must be within). The index is
+    populated with entities whose metadata has been loaded, such as the results of `get_all_in_collection` or of
+    `SqliteMirror.get_all`. Indexed entities are not copied, so they must not be changed whilst indexed. The index is
+    not thread-safe.
+    """
+    _COMPARISONS = {
+        ComparisonOperator.EQUALS: operator.eq,
+        ComparisonOperator.LESS_THAN: operator.lt,
+        ComparisonOperator.GREATER_THAN: operator.gt
+    }
+
+    def __init__(self, entities: Iterable["IrodsEntity"]=(), store_entities: bool=True):
+        """
+        Constructor.
+        :param entities: (optional) entities to go into the index initially
+        :param store_entities: whether the indexed entities are to be kept, such that `get_by_metadata` can return them
+        (only their paths are kept otherwise)
+        """
+        self._paths_by_value_by_attribute = dict()  # type: Dict[str, Dict[str, Set[str]]]
+        # Sorted values of attributes, which are discarded when values are added or removed and sorted again when needed
+        self._sorted_values = dict()    # type: Dict[str, List[str]]
+        self._metadata_by_path = dict()     # type: Dict[str, Dict[str, Set[str]]]
+        self._entities = dict() if store_entities else None    # type: Optional[Dict[str, "IrodsEntity"]]
+        self.add(entities)
+
+    def add(self, entities: Union["IrodsEntity", Iterable["IrodsEntity"]]):
+        """
+        Adds the given entities to the index, replacing any indexed entities with the same paths. A `ValueError` will be
+        raised if the metadata of an entity has not been loaded.
+        :param entities: the entity or entities to add
+        """
+        from baton.models import IrodsEntity
+        if isinstance(entities, IrodsEntity):
+            entities = [entities]
+        for entity in entities:
+            if entity.metadata is None:
+                raise ValueError("Metadata of entity has not been loaded: %s" % entity.path)
+            self._remove(entity.path)
+            metadata = {attribute: set(values) for attribute, values in entity.metadata.items()}
+            self._metadata_by_path[entity.path] = metadata
+            for attribute, values in metadata.items():
+                paths_by_value = self._paths_by_value_by_attribute.setdefault(attribute, dict())
+                for value in values:
+                    if value in paths_by_value:
+                        paths_by_value[value].add(entity.path)
+                    else:
+                        paths_by_value[value] = {entity.path}
+                        self._sorted_values.pop(attribute, None)
+            if self._entities is not None:
+                self._entities[entity.path] = entity
+
+    def remove(self, paths: Union[str, Iterable[str]]):
+        """
+        Removes the entities with the given paths from the index. A `ValueError` will be raised if an entity with one of
+        the paths is not indexed.
+        :param paths: the path(s) of the entities to remove
+        """
+        if isinstance(paths, str):
+            paths = [paths]
+        for path in paths:
+            if path not in self._metadata_by_path:
+                raise ValueError("Entity is not indexed: %s" % path)
+            self._remove(path)
+
+    def get_paths_by_metadata(self, metadata_search_criteria: Union["SearchCriterion", Iterable["SearchCriterion"]]) \
+            -> Set[str]:
+        """
+        Gets the paths of the indexed entities that have metadata that matches all of the given search criteria.
+        :param metadata_search_criteria: the metadata search criteria
+        :return: the paths of the matched entities
+        """
+        from baton.models import SearchCriterion
+        if isinstance(metadata_search_criteria, SearchCriterion):
+            metadata_search_criteria = [metadata_search_criteria]
+        metadata_search_criteria = list(metadata_search_criteria)
+        if len(metadata_search_criteria) == 0:
+            raise ValueError("At least one search criterion must be given")
+        for search_criterion in metadata_search_criteria:
+            if search_criterion.comparison_operator not in IrodsMetadataIndex._COMPARISONS:
+                raise ValueError("Unsupported comparison operator: %s" % search_criterion.comparison_operator)
+
+        # Equality criteria are answered directly by the index, smallest first. Range criteria are then checked against
+        # the metadata of the few remaining entities, unless there are no equality criteria to narrow them down. The
+        # range criteria on an attribute must all be met by the same value, so that a range is not matched by an entity
+        # with one value below and another above it
+        equality_criteria = [search_criterion for search_criterion in metadata_search_criteria
+                             if search_criterion.comparison_operator == ComparisonOperator.EQUALS]
+        range_criteria_by_attribute = collections.OrderedDict()    # type: Dict[str, List[SearchCriterion]]
+        for search_criterion in metadata_search_criteria:
+            if search_criterion.comparison_operator != ComparisonOperator.EQUALS:
+                range_criteria_by_attribute.setdefault(search_criterion.attribute, []).append(search_criterion)
+        range_criteria_for_attributes = list(range_criteria_by_attribute.values())
+        if len(equality_criteria) > 0:
+            matched_paths_for_criteria = sorted(
+                (self._paths_by_value_by_attribute.get(search_criterion.attribute, {}).get(search_criterion.value, ())
+                 for search_criterion in equality_criteria), key=len)
+            paths = set(matched_paths_for_criteria[0])
+            for matched_paths in matched_paths_for_criteria[1:]:
+                paths.intersection_update(matched_paths)
+        else:
+            paths = self._get_paths_in_range(range_criteria_for_attributes[0])
+            range_criteria_for_attributes = range_criteria_for_attributes[1:]
+
+        for range_criteria in range_criteria_for_attributes:
+            attribute = range_criteria[0].attribute
+            paths = {path for path in paths if any(
+                all(IrodsMetadataIndex._COMPARISONS[search_criterion.comparison_operator](value, search_criterion.value)
+                    for search_criterion in range_criteria)
+                for value in self._metadata_by_path[path].get(attribute, ()))}
+        return paths
+
+    def get_by_metadata(self, metadata_search_criteria: Union["SearchCriterion", Iterable["SearchCriterion"]],
+                        entity_type: type=None) -> List["IrodsEntity"]:
+        """
+        Gets the indexed entities that have metadata that matches all of the given search criteria. A `ValueError` will
+        be raised if the index does not keep entities.
+        :param metadata_search_criteria: the metadata search criteria
+        :param entity_type: the type of the entities to get (`DataObject`, `Collection` or `None` for both)
+        :return: the matched entities, ordered by path
+        """
+        if self._entities is None:
+            raise ValueError("Index does not keep entities, only their paths")
+        paths = self.get_paths_by_metadata(metadata_search_criteria)
+        entities = [self._entities[path] for path in sorted(paths)]
+        if entity_type is None:
+            return entities
+        return [entity for entity in entities if isinstance(entity, entity_type)]
+
+    def _remove(self, path: str):
+        """
+        Removes the entity with the given path from the index, if it is indexed.
+        :param path: the path of the entity
+        """
+        metadata = self._metadata_by_path.pop(path, None)
+        if metadata is None:
+            return
+        for attribute, values in metadata.items():
+            paths_by_value = self._paths_by_value_by_attribute[attribute]
+            for value in values:
+                paths = paths_by_value[value]
+                paths.discard(path)
+                if len(paths) == 0:
+                    del paths_by_value[value]
+                    self._sorted_values.pop(attribute, None)
+            if len(paths_by_value) == 0:
+                del self._paths_by_value_by_attribute[attribute]
+        if self._entities is not None:
+            del self._entities[path]
+
+    def _get_paths_in_range(self, range_criteria: List["SearchCriterion"]) -> Set[str]:
+        """
+        Gets the paths of the indexed entities that have a value of an attribute that is within the range given by the
+        criteria on that attribute.
+        :param range_criteria: the search criteria on the attribute, which use the less than or greater than comparison
+        operators
+        :return: the paths of the matched entities
+        """
+        attribute = range_criteria[0].attribute
+        paths_by_value = self._paths_by_value_by_attribute.get(attribute)
+        if paths_by_value is None:
+            return set()
+        sorted_values = self._sorted_values.get(attribute)
+        if sorted_values is None:
+            sorted_values = sorted(paths_by_value.keys())
+            self._sorted_values[attribute] = sorted_values
+
+        start, end = 0, len(sorted_values)
+        for search_criterion in range_criteria:
+            assert search_criterion.attribute == attribute
+            if search_criterion.comparison_operator == ComparisonOperator.LESS_THAN:
+                end = min(end, bisect.bisect_left(sorted_values, search_criterion.value))
+            else:
+                assert search_criterion.comparison_operator == ComparisonOperator.GREATER_THAN
+                start = max(start, bisect.bisect_right(sorted_values, search_criterion.value))
+        return set().union(*(paths_by_value[value] for value in sorted_values[start:end]))
+
+    def __len__(self) -> int:
+        return len(self._metadata_by_path)
+
+
+def _import_optional_dependency(module_name: str) -> Any:
+    """
+    Imports the given module, which is an optional dependency.
+    :param module_name: the name of the module to import
+    :return: the imported module
+    """
+    try:
+        return importlib.import_module(module_name)
+    except ImportError as e:
+        raise ImportError("%s must be installed to use this feature" % module_name) from e
+
+
+class ExistenceBitmap(Sequence[bool]):
+    """
+    Whether there is an entity at each of a sequence of paths, held compactly as one bit per path.
+    """
+    def __init__(self, exists: Iterable[bool]=()):
+        """
+        Constructor.
+        :param exists: (optional) whether there is an entity at each path initially
+        """
+        self._bits = bytearray()
+        self._length = 0
+        self.extend(exists)
+
+    def append(self, exists: bool):
+        """
+        Appends whether there is an entity at a path.
+        :param exists: whether there is an entity at the path
+        """
+        if self._length % 8 == 0:
+            self._bits.append(0)
+        if exists:
+            self._bits[self._length // 8] |= 1 << (self._length % 8)
+        self._length += 1
+
+    def extend(self, exists: Iterable[bool]):
+        """
+        Appends whether there is an entity at each of a number of paths.
+        :param exists: whether there is an entity at each path
+        """
+        for path_exists in exists:
+            self.append(path_exists)
+
+    def count_existing(self) -> int:
+        """
+        Counts the paths at which there is an entity.
+        :return: the number of paths at which there is an entity
+        """
+        return sum(bin(byte).count("1") for byte in self._bits)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[bool, List[bool]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("Index out of range: %d" % index)
+        return bool(self._bits[index // 8] & (1 << (index % 8)))
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, ExistenceBitmap) and self._length == other._length and self._bits == other._bits
+
+    def __repr__(self) -> str:
+        return "%s(%s)" % (type(self).__name__, list(self))
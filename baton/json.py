@@ -3,4 +3,4 @@ from baton._baton.json import AccessControlJSONEncoder, AccessControlJSONEncoder
     DataObjectReplicaJSONDecoder, DataObjectReplicaCollectionJSONEncoder, DataObjectReplicaCollectionJSONDecoder, \
     IrodsMetadataJSONEncoder, IrodsMetadataJSONDecoder, DataObjectJSONEncoder, DataObjectJSONDecoder, \
     CollectionJSONEncoder, CollectionJSONDecoder, SearchCriterionJSONEncoder, SearchCriterionJSONDecoder, \
-    SpecificQueryJSONEncoder, SpecificQueryJSONDecoder, PreparedSpecificQueryJSONEncoder
+    SpecificQueryJSONEncoder, SpecificQueryJSONDecoder, PreparedSpecificQueryJSONEncoder, set_timestamp_cache_size
@@ -1,7 +1,7 @@
 from abc import ABCMeta, abstractmethod, abstractproperty
 from typing import Generic, Union, Sequence, Iterable, Set, List
 
-from baton.collections import IrodsMetadata
+from baton.collections import IrodsMetadata, IrodsEntityColumns
 from baton.models import Collection, DataObject, PreparedSpecificQuery, SpecificQuery, SearchCriterion, AccessControl, \
     User
 from baton.types import EntityType, CustomObjectType
@@ -195,12 +195,15 @@ class IrodsEntityMapper(Generic[EntityType], metaclass=ABCMeta):
 
     @abstractmethod
     def get_by_metadata(self, metadata_search_criteria: Union[SearchCriterion, Iterable[SearchCriterion]],
-                        load_metadata: bool=True, zone: str=None) -> Sequence[EntityType]:
+                        load_metadata: bool=True, zone: str=None, as_columns: bool=False,
+                        metadata_columns: Iterable[str]=None) -> Union[Sequence[EntityType], IrodsEntityColumns]:
         """
         Gets entities from iRODS that have metadata that matches the given search criteria.
         :param metadata_search_criteria: the metadata search criteria
         :param load_metadata: whether metadata associated to the entities should be loaded
         :param zone: limit query to specific zone in iRODS
+        :param as_columns: whether the entities should be returned as columns (`IrodsEntityColumns`) instead of models
+        :param metadata_columns: the metadata attributes that are to have columns, if returning columns (`None` for all)
         :return: the matched entities in iRODS
         """
 
@@ -217,14 +220,17 @@ class IrodsEntityMapper(Generic[EntityType], metaclass=ABCMeta):
         """
 
     @abstractmethod
-    def get_all_in_collection(self, collection_paths: Union[str, Iterable[str]], load_metadata: bool = True) \
-            -> Sequence[EntityType]:
+    def get_all_in_collection(self, collection_paths: Union[str, Iterable[str]], load_metadata: bool = True,
+                              as_columns: bool=False, metadata_columns: Iterable[str]=None) \
+            -> Union[Sequence[EntityType], IrodsEntityColumns]:
         """
         Gets entities contained within the given iRODS collections.
 
         If one or more of the collection_paths does not exist, a `FileNotFound` exception will be raised.
         :param collection_paths: the collection(s) to get the entities from
         :param load_metadata: whether metadata associated to the entities should be loaded
+        :param as_columns: whether the entities should be returned as columns (`IrodsEntityColumns`) instead of models
+        :param metadata_columns: the metadata attributes that are to have columns, if returning columns (`None` for all)
         :return: the entities loaded from iRODS
         """
 
@@ -0,0 +1 @@
+from baton._baton.sqlite_mirror import SqliteMirror
@@ -1,9 +1,9 @@
-import re
 from abc import ABCMeta
+from collections import OrderedDict
 from copy import copy
 from datetime import datetime
 from enum import Enum, unique
-from typing import Iterable, List, Set, Union, Any, Optional
+from typing import Iterable, List, Set, Union, Any, Optional, Dict, Callable
 
 import hgicommon
 from hgicommon.models import Model
@@ -11,10 +11,95 @@ from hgicommon.models import Model
 _NAME_ZONE_SEGREGATOR = "#"
 
 
-class Timestamped(Model, metaclass=ABCMeta):
+class _CompactModel(metaclass=ABCMeta):
+    """
+    Model whose properties are stored in slots, instead of in a per-instance `__dict__`, to reduce its memory footprint.
+
+    Equality, hashing and string representations are equivalent to those of `Model`, of which this is registered as a
+    (virtual) subclass, and are based on the model's public properties. Subclasses must define `__slots__` in order to
+    be compact.
+    """
+    __slots__ = ()
+    _PROPERTY_NAMES = dict()   # type: Dict[type, List[str]]
+
+    def _get_properties(self) -> Dict[str, Any]:
+        """
+        Gets the properties of this model, keyed by name (equivalent to `vars` for a model that is not compact).
+        :return: the properties that have been set
+        """
+        properties = dict()     # type: Dict[str, Any]
+        for property_name in _CompactModel._get_property_names(type(self)):
+            try:
+                properties[property_name] = getattr(self, property_name)
+            except AttributeError:
+                pass
+        # Subclasses that do not define `__slots__` have a `__dict__`
+        instance_dict = getattr(self, "__dict__", None)
+        if instance_dict is not None:
+            properties.update(instance_dict)
+        return properties
+
+    @staticmethod
+    def _get_property_names(cls: type) -> List[str]:
+        """
+        Gets the names of the properties of the given class that are held in the slots defined by it and its
+        superclasses. A private slot (e.g. `_user`) is named by the public property that exposes it (e.g. `user`);
+        private slots without such a property hold internal state and are not properties of the model.
+        :param cls: the class
+        :return: the property names
+        """
+        property_names = _CompactModel._PROPERTY_NAMES.get(cls)
+        if property_names is None:
+            property_names = []
+            for superclass in cls.__mro__:
+                slot_names = superclass.__dict__.get("__slots__", ())
+                if isinstance(slot_names, str):
+                    slot_names = (slot_names, )
+                for slot_name in slot_names:
+                    if slot_name in ("__dict__", "__weakref__"):
+                        continue
+                    if slot_name.startswith("_"):
+                        slot_name = slot_name[1:]
+                        if not isinstance(getattr(cls, slot_name, None), property):
+                            continue
+                    property_names.append(slot_name)
+            _CompactModel._PROPERTY_NAMES[cls] = property_names
+        return property_names
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, self.__class__):
+            return False
+        other_properties = other._get_properties()
+        for property_name, value in self._get_properties().items():
+            if property_name not in other_properties or other_properties[property_name] != value:
+                return False
+        return True
+
+    def __str__(self) -> str:
+        string_builder = []
+        for property_name, value in self._get_properties().items():
+            if isinstance(value, Set):
+                value = str(sorted(value, key=id))
+            string_builder.append("%s: %s" % (property_name, value))
+        string_builder = sorted(string_builder)
+        return "{ %s }" % ', '.join(string_builder)
+
+    def __repr__(self) -> str:
+        return "<%s object at %s: %s>" % (type(self), id(self), str(self))
+
+    def __hash__(self):
+        return hash(str(self))
+
+Model.register(_CompactModel)
+
+
+class Timestamped(_CompactModel, metaclass=ABCMeta):
     """
     Model that has related timestamps.
     """
+    # Slots for the timestamps are defined by subclasses to allow multiple inheritance with other compact models
+    __slots__ = ()
+
     def __init__(self, created: datetime=None, last_modified: datetime=None):
         super().__init__()
         self.created = created
@@ -25,6 +110,8 @@ class DataObjectReplica(Timestamped):
     """
     Model of a file replicate in iRODS.
     """
+    __slots__ = ("number", "checksum", "host", "resource_name", "up_to_date", "created", "last_modified")
+
     def __init__(self, number: int, checksum: str, host: str=None, resource_name: str=None, up_to_date: bool=None,
                  created: datetime = None, last_modified: datetime = None):
         super().__init__(created, last_modified)
@@ -35,11 +122,13 @@ class DataObjectReplica(Timestamped):
         self.up_to_date = up_to_date
 
 
-class User(Model):
+class User(_CompactModel):
     """
     Representation of a user of the iRODS system. A user may be an individual or a group. Users are considered equal to
     their string representations: "name#zone".
     """
+    __slots__ = ("name", "zone", "_shared")
+
     @staticmethod
     def create_from_str(name_and_zone: str):
         """
@@ -78,11 +167,25 @@ class User(Model):
     def __hash__(self) -> str:
         return hash(str(self))
 
+    def __setattr__(self, name: str, value: Any):
+        _raise_if_shared(self)
+        super().__setattr__(name, value)
 
-class AccessControl(Model):
+    def __reduce__(self):
+        # Copies (and unpickled instances) are not shared, therefore they can be modified
+        return User, (self.name, self.zone)
+
+
+class AccessControl(_CompactModel):
     """
     Model of an iRODS Access Control item (from an ACL).
+
+    Access controls (and their users) decoded from baton's output are shared between the entities that have them, so
+    they cannot be modified (an `AttributeError` is raised): a new access control, or a copy, should be modified
+    instead.
     """
+    __slots__ = ("_user", "level", "_shared")
+
     @unique
     class Level(Enum):
         NONE = 0
@@ -105,20 +208,63 @@ class AccessControl(Model):
     def user(self, user: User):
         self._user = user
 
+    def __setattr__(self, name: str, value: Any):
+        _raise_if_shared(self)
+        super().__setattr__(name, value)
 
-class IrodsEntity(Model, metaclass=ABCMeta):
+    def __reduce__(self):
+        # Copies (and unpickled instances) are not shared, therefore they can be modified
+        return AccessControl, (User(self.user.name, self.user.zone), self.level)
+
+
+def _share(model: Union[User, AccessControl]) -> Union[User, AccessControl]:
+    """
+    Marks the given user or access control as shared (e.g. between the entities decoded from baton's output), after
+    which it cannot be modified.
+    :param model: the user or access control
+    :return: the given user or access control
+    """
+    object.__setattr__(model, "_shared", True)
+    return model
+
+
+def _raise_if_shared(model: Union[User, AccessControl]):
+    """
+    Raises an `AttributeError` if the given user or access control is shared, as it cannot then be modified.
+    :param model: the user or access control that is to be modified
+    """
+    if getattr(model, "_shared", False):
+        raise AttributeError("%s is shared and cannot be modified: modify a copy of it instead" % type(model).__name__)
+
+
+class IrodsEntity(_CompactModel, metaclass=ABCMeta):
     """
     Model of an entity in iRODS.
+
+    The properties of an entity other than its path can be loaded lazily, on first access (see `_load_lazily`).
     """
     from baton.collections import IrodsMetadata
-    _ABSOLUTE_PATH_PATTERN = re.compile("^/.*")
+    __slots__ = ("path", "_lazy_loader", "_access_controls", "_metadata")
+
+    @unique
+    class Property(Enum):
+        """
+        Properties of an entity, other than its path, that can be loaded from iRODS.
+        """
+        ACCESS_CONTROLS = "access_controls"
+        METADATA = "metadata"
+        # Replicas are only loaded for data objects. Loading timestamps, which belong to replicas, also loads replicas
+        REPLICAS = "replicas"
+        TIMESTAMPS = "timestamps"
 
     def __init__(self, path: str, access_controls: Iterable[AccessControl]=None, metadata: IrodsMetadata=None):
-        if not re.match(IrodsEntity._ABSOLUTE_PATH_PATTERN, path):
+        if not path.startswith("/"):
             raise ValueError("baton does not support the given type of relative path: \"%s\"" % path)
         self.path = path
+        self._lazy_loader = None    # type: Optional[Callable[[], Dict[str, Any]]]
         self._access_controls = None
         self.access_controls = access_controls
+        self._metadata = None
         self.metadata = metadata
 
     @property
@@ -135,6 +281,7 @@ class IrodsEntity(Model, metaclass=ABCMeta):
         Gets a copy of the access controls associated to this entity.
         :return: copy of the access controls
         """
+        self._load()
         return copy(self._access_controls)
 
     @access_controls.setter
@@ -143,10 +290,21 @@ class IrodsEntity(Model, metaclass=ABCMeta):
         Sets the access controls associated to this entity.
         :param access_controls: the access controls (immutable) or `None`
         """
+        self._load()
         if access_controls is not None:
             access_controls = set(access_controls)
         self._access_controls = access_controls
 
+    @property
+    def metadata(self) -> Optional[IrodsMetadata]:
+        self._load()
+        return self._metadata
+
+    @metadata.setter
+    def metadata(self, metadata: Optional[IrodsMetadata]):
+        self._load()
+        self._metadata = metadata
+
     def get_collection_path(self) -> str:
         """
         Gets the path of the collection in which this entity resides.
@@ -161,12 +319,36 @@ class IrodsEntity(Model, metaclass=ABCMeta):
         """
         return self.path.rsplit('/', 1)[-1]
 
+    def _load_lazily(self, loader: Callable[[], Dict[str, Any]]):
+        """
+        Defers the loading of properties of this entity until one of them (or the entity's equality, hash or string
+        representation, which are based on the loaded values) is first used. The loaded values replace any that the
+        properties were given before this call.
+        :param loader: callable that returns the values of the properties that are to be set, keyed by property name.
+        The values must already be of the type that the property holds (e.g. `Set[AccessControl]` for
+        `access_controls`). Should be picklable (e.g. a `functools.partial` of a module-level function) if the entity
+        is to be picklable
+        """
+        self._lazy_loader = loader
+
+    def _load(self):
+        """
+        Loads the properties of this entity that are to be loaded lazily, if they have not already been loaded.
+        """
+        loader = self._lazy_loader
+        if loader is not None:
+            # Values are assigned before the loader is cleared so that concurrent readers never see unloaded properties
+            for property_name, value in loader().items():
+                setattr(self, "_%s" % property_name, value)
+            self._lazy_loader = None
+
 
 class DataObject(IrodsEntity):
     """
     Model of a data object in iRODS.
     """
     from baton.collections import IrodsMetadata
+    __slots__ = ("_replicas", )
 
     def __init__(self, path: str, access_controls: Iterable[AccessControl]=None,
                  metadata: IrodsMetadata=None, replicas: Iterable[DataObjectReplica]=None):
@@ -179,18 +361,53 @@ class DataObject(IrodsEntity):
         """
         from baton.collections import DataObjectReplicaCollection
         super().__init__(path, access_controls, metadata)
+        self._replicas = None
         self.replicas = DataObjectReplicaCollection(replicas) if replicas is not None else None
 
+    @property
+    def replicas(self) -> Optional["DataObjectReplicaCollection"]:
+        self._load()
+        return self._replicas
+
+    @replicas.setter
+    def replicas(self, replicas: Optional["DataObjectReplicaCollection"]):
+        self._load()
+        self._replicas = replicas
+
 
 class Collection(IrodsEntity, Timestamped):
     """
     Model of a collection in iRODS.
     """
+    __slots__ = ("created", "last_modified")
+
     def __init__(self, path: str, *args, **kwargs):
         path = path.rstrip("/")
         super().__init__(path, *args, **kwargs)
 
 
+class IrodsEntityStat(Timestamped):
+    """
+    Lightweight record of the basic properties of an entity in iRODS, retrieved without loading a full model of it.
+    """
+    __slots__ = ("path", "size", "checksum", "created", "last_modified")
+
+    def __init__(self, path: str, size: int=None, checksum: str=None, created: datetime=None,
+                 last_modified: datetime=None):
+        """
+        Constructor.
+        :param path: path of the entity in iRODS
+        :param size: size of the data object in bytes (`None` if a collection)
+        :param checksum: checksum of the data object (`None` if a collection or not known)
+        :param created: when the entity was created (the earliest created replica of a data object)
+        :param last_modified: when the entity was last modified (the most recently modified replica of a data object)
+        """
+        super().__init__(created, last_modified)
+        self.path = path
+        self.size = size
+        self.checksum = checksum
+
+
 class SpecificQuery(Model):
     """
     Model of a query installed on iRODS.
@@ -216,8 +433,122 @@ class PreparedSpecificQuery(SpecificQuery):
         self.query_arguments = query_arguments if query_arguments is not None else []
 
 
+class BatchResult(Model):
+    """
+    Result of an operation on a batch of paths, where the operation may have succeeded for some of the paths and failed
+    for others. Both successes and errors are ordered in the same way as the paths given to the operation.
+    """
+    def __init__(self, successes: Dict[str, Any]=None, errors: Dict[str, Exception]=None):
+        """
+        Constructor.
+        :param successes: results of the operation for the paths on which it succeeded, keyed by path
+        :param errors: errors raised by the operation for the paths on which it failed, keyed by path
+        """
+        super().__init__()
+        self.successes = successes if successes is not None else OrderedDict()  # type: Dict[str, Any]
+        self.errors = errors if errors is not None else OrderedDict()   # type: Dict[str, Exception]
+
+
+class CacheStatistics(Model):
+    """
+    Statistics about the use of a cache of one kind of value (e.g. the results of metadata queries).
+    """
+    def __init__(self, hits: int=0, misses: int=0, size: int=0):
+        """
+        Constructor.
+        :param hits: the number of lookups of values that were cached
+        :param misses: the number of lookups of values that were not cached (or had expired)
+        :param size: the number of values that are cached
+        """
+        super().__init__()
+        self.hits = hits
+        self.misses = misses
+        self.size = size
+
+
+class MirrorChanges(Model):
+    """
+    Changes made to a local mirror of iRODS when it was refreshed.
+    """
+    def __init__(self, added: List[str]=None, modified: List[str]=None, removed: List[str]=None):
+        """
+        Constructor.
+        :param added: the paths of the entities that were added to the mirror
+        :param modified: the paths of the entities that were modified in the mirror
+        :param removed: the paths of the entities that were removed from the mirror
+        """
+        super().__init__()
+        self.added = added if added is not None else []   # type: List[str]
+        self.modified = modified if modified is not None else []   # type: List[str]
+        self.removed = removed if removed is not None else []   # type: List[str]
+
+
 # Use `SearchCriterion` from HGI common library
 SearchCriterion = hgicommon.models.SearchCriterion
 
 # Use `ComparisonOperator` from HGI common library
 ComparisonOperator = hgicommon.models.ComparisonOperator
+
+
+class AllOf(Model):
+    """
+    Metadata query that matches the entities that match all of the given metadata queries (a conjunction).
+    """
+    def __init__(self, *queries: "MetadataQuery"):
+        """
+        Constructor.
+        :param queries: the metadata queries (search criteria or other metadata queries)
+        """
+        super().__init__()
+        self.queries = list(queries)   # type: List[MetadataQuery]
+
+
+class AnyOf(Model):
+    """
+    Metadata query that matches the entities that match any of the given metadata queries (a disjunction).
+    """
+    def __init__(self, *queries: "MetadataQuery"):
+        """
+        Constructor.
+        :param queries: the metadata queries (search criteria or other metadata queries)
+        """
+        super().__init__()
+        self.queries = list(queries)   # type: List[MetadataQuery]
+
+
+class In(Model):
+    """
+    Metadata query that matches the entities that have a value of the given attribute that is one of the given values.
+    """
+    def __init__(self, attribute: str, values: Iterable[str]):
+        """
+        Constructor.
+        :param attribute: the metadata attribute
+        :param values: the values to match
+        """
+        super().__init__()
+        self.attribute = attribute
+        self.values = list(values)    # type: List[str]
+
+
+class Between(Model):
+    """
+    Metadata query that matches the entities that have a value of the given attribute that is within the given range
+    (inclusive). Values are compared as text, in the same way as iRODS.
+    """
+    def __init__(self, attribute: str, lower: str, upper: str):
+        """
+        Constructor.
+        :param attribute: the metadata attribute
+        :param lower: the lowest value to match
+        :param upper: the highest value to match
+        """
+        super().__init__()
+        self.attribute = attribute
+        self.lower = lower
+        self.upper = upper
+
+
+# Query of metadata, which may be a single search criterion, a conjunction of search criteria (as an iterable) or an
+# expression made from `AllOf`, `AnyOf`, `In` and `Between`
+MetadataQuery = Union[SearchCriterion, Iterable[SearchCriterion], AllOf, AnyOf, In, Between]
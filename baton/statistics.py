@@ -0,0 +1 @@
+from baton._baton.metadata_statistics import IrodsMetadataStatistics
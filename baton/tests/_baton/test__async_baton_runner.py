@@ -0,0 +1,82 @@
+import asyncio
+import unittest
+from datetime import timedelta
+from subprocess import TimeoutExpired
+
+from baton._baton._async_baton_runner import AsyncBatonRunner
+from baton._baton._baton_runner import BatonBinary
+from baton.tests._baton._settings import BATON_SETUP
+from testwithbaton.api import TestWithBaton
+
+
+class TestAsyncBatonRunner(unittest.TestCase):
+    """
+    Tests for `AsyncBatonRunner`.
+    """
+    def setUp(self):
+        self.test_with_baton = TestWithBaton(baton_setup=BATON_SETUP)
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(None)
+        self.test_with_baton.tear_down()
+
+    def test_init_with_invalid_baton_directory(self):
+        self.assertRaises(ValueError, AsyncBatonRunner, ".")
+
+    def test_run_baton_query(self):
+        self.test_with_baton.setup()
+        baton_runner = AsyncBatonRunner(self.test_with_baton.baton_location)
+        baton_out_as_json = self.loop.run_until_complete(baton_runner.run_baton_query(BatonBinary.BATON))[0]
+        self.assertIn("avus", baton_out_as_json)
+        self.assertEqual(baton_out_as_json["avus"], [])
+
+    def test_run_command_timeout(self):
+        baton_runner = AsyncBatonRunner("", True, timeout_queries_after=timedelta(milliseconds=10))
+        self.assertRaises(TimeoutExpired, self.loop.run_until_complete, baton_runner._run_command(["sleep", "999"]))
+
+    def test_run_command_kills_process_when_cancelled(self):
+        baton_runner = AsyncBatonRunner("", True)
+        processes = []
+        original_create_subprocess_exec = asyncio.create_subprocess_exec
+
+        async def create_subprocess_exec(*args, **kwargs):
+            process = await original_create_subprocess_exec(*args, **kwargs)
+            processes.append(process)
+            return process
+
+        asyncio.create_subprocess_exec = create_subprocess_exec
+        try:
+            task = self.loop.create_task(baton_runner._run_command(["sleep", "999"]))
+            self.loop.run_until_complete(asyncio.sleep(0.5, loop=self.loop))
+            task.cancel()
+            self.assertRaises(asyncio.CancelledError, self.loop.run_until_complete, task)
+        finally:
+            asyncio.create_subprocess_exec = original_create_subprocess_exec
+
+        self.assertEqual(len(processes), 1)
+        self.assertIsNotNone(processes[0].returncode)
+
+    def test_run_baton_query_limited_by_semaphore(self):
+        semaphore = asyncio.Semaphore(1, loop=self.loop)
+        baton_runner = AsyncBatonRunner("", True, semaphore=semaphore)
+        running = []
+        max_running = []
+
+        async def run_command(*args, **kwargs):
+            running.append(True)
+            max_running.append(len(running))
+            await asyncio.sleep(0.05, loop=self.loop)
+            running.pop()
+            return ""
+
+        baton_runner._run_command = run_command
+        queries = [baton_runner.run_baton_query(BatonBinary.BATON) for _ in range(3)]
+        self.loop.run_until_complete(asyncio.gather(*queries, loop=self.loop))
+        self.assertEqual(max(max_running), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
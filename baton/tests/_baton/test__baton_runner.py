@@ -1,8 +1,15 @@
+import json
+import time
 import unittest
 from datetime import timedelta
+from queue import Full
 from subprocess import TimeoutExpired
+from threading import Thread, Event
+from typing import List, Dict
 
-from baton._baton._baton_runner import BatonRunner, BatonBinary
+from baton._baton._baton_runner import BatonRunner, BatonBinary, BatonWorker, BatonExecutorPool, BatonExecutor
+from baton._baton._constants import IRODS_ERROR_USER_FILE_DOES_NOT_EXIST
+from baton.tests._baton._helpers import create_collection
 from baton.tests._baton._settings import BATON_SETUP
 from baton.tests._baton._stubs import StubBatonRunner
 from testwithbaton.api import TestWithBaton
@@ -52,6 +59,292 @@ class TestBatonRunner(unittest.TestCase):
         baton_runner = StubBatonRunner("", timeout_queries_after=timeout, skip_baton_binaries_validation=True)
         self.assertRaises(TimeoutExpired, baton_runner._run_command, ["sleep", "999"])
 
+    def test_iter_baton_query(self):
+        self.test_with_baton.setup()
+        baton_runner = StubBatonRunner(self.test_with_baton.baton_location)
+        baton_out_as_json = list(baton_runner.iter_baton_query(BatonBinary.BATON))
+        self.assertEqual(len(baton_out_as_json), 1)
+        self.assertEqual(baton_out_as_json[0]["avus"], [])
+
+    def test_iter_command_out_timeout(self):
+        timeout = timedelta(milliseconds=10)
+        baton_runner = StubBatonRunner("", timeout_queries_after=timeout, skip_baton_binaries_validation=True)
+        self.assertRaises(TimeoutExpired, list, baton_runner._iter_command_out(["sleep", "999"]))
+
+    def test_run_command_with_input_larger_than_pipe_buffer(self):
+        baton_runner = StubBatonRunner("", skip_baton_binaries_validation=True)
+        input_data = ({"path": "/%d" % i} for i in range(100000))
+        out = baton_runner._run_command(["cat"], input_data=input_data)
+        self.assertEqual(out.count("path"), 100000)
+
+    def test_run_command_when_input_iterator_raises(self):
+        baton_runner = StubBatonRunner("", skip_baton_binaries_validation=True)
+
+        def input_data():
+            yield {"path": "/"}
+            raise KeyError()
+
+        self.assertRaises(KeyError, baton_runner._run_command, ["cat"], input_data())
+
+    def test_iter_command_out_when_closed_early(self):
+        baton_runner = StubBatonRunner("", skip_baton_binaries_validation=True)
+        out = baton_runner._iter_command_out(["yes"])
+        self.assertGreater(len(next(out)), 0)
+        out.close()
+
+    def test_run_baton_query_with_persistent_workers(self):
+        self.test_with_baton.setup()
+        baton_runner = StubBatonRunner(self.test_with_baton.baton_location, use_persistent_workers=True)
+        collection = create_collection(self.test_with_baton, _NAMES[0]).path
+        try:
+            for _ in range(2):
+                baton_out_as_json = baton_runner.run_baton_query(
+                    BatonBinary.BATON_LIST, input_data=[{"collection": collection}, {"collection": collection}])
+                self.assertEqual(baton_out_as_json, [{"collection": collection}, {"collection": collection}])
+            # Queries run one at a time reuse the same (idle) executor
+            with baton_runner._executor_pool.executor() as executor:
+                self.assertEqual(len(executor._workers), 1)
+        finally:
+            baton_runner.close()
+
+    def test_run_baton_query_with_persistent_workers_when_error(self):
+        self.test_with_baton.setup()
+        baton_runner = StubBatonRunner(self.test_with_baton.baton_location, use_persistent_workers=True)
+        try:
+            self.assertRaises(FileNotFoundError, baton_runner.run_baton_query, BatonBinary.BATON_LIST,
+                              input_data={"collection": "/invalid"})
+        finally:
+            baton_runner.close()
+
+    def test_run_baton_query_with_persistent_workers_recycles_workers(self):
+        self.test_with_baton.setup()
+        baton_runner = StubBatonRunner(
+            self.test_with_baton.baton_location, use_persistent_workers=True, max_requests_per_worker=1)
+        collection = create_collection(self.test_with_baton, _NAMES[0]).path
+        try:
+            baton_runner.run_baton_query(BatonBinary.BATON_LIST, input_data={"collection": collection})
+            with baton_runner._executor_pool.executor() as executor:
+                worker = list(executor._workers.values())[0]
+            baton_runner.run_baton_query(BatonBinary.BATON_LIST, input_data={"collection": collection})
+            with baton_runner._executor_pool.executor() as executor:
+                self.assertIsNot(list(executor._workers.values())[0], worker)
+        finally:
+            baton_runner.close()
+
+
+class TestBatonRunnerInChunks(unittest.TestCase):
+    """
+    Tests for `BatonRunner` when queries are split into chunks.
+    """
+    def setUp(self):
+        self.baton_runner = StubBatonRunner("", skip_baton_binaries_validation=True, chunk_size=2)
+        self.chunks_run = []    # type: List[List[Dict]]
+
+        def run_baton_query(baton_binary: BatonBinary, program_arguments: List[str], input_data: List[Dict],
+                            raise_errors: bool):
+            self.chunks_run.append(input_data)
+            # Later chunks finish first
+            time.sleep(0.05 / (input_data[0]["index"] + 1))
+            for item in input_data:
+                if "error" in item:
+                    raise item["error"]
+            return [{"index": item["index"], "arguments": program_arguments} for item in input_data]
+
+        self.baton_runner._run_baton_query = run_baton_query
+
+    def test_run_baton_query_with_input_smaller_than_chunk(self):
+        input_data = [{"index": 0}, {"index": 1}]
+        self.baton_runner.run_baton_query(BatonBinary.BATON_LIST, [], input_data)
+        self.assertEqual(self.chunks_run, [input_data])
+
+    def test_run_baton_query_with_input_larger_than_chunk(self):
+        input_data = [{"index": i} for i in range(5)]
+        baton_out_as_json = self.baton_runner.run_baton_query(BatonBinary.BATON_LIST, ["--acl"], input_data)
+        self.assertEqual([item["index"] for item in baton_out_as_json], list(range(5)))
+        self.assertTrue(all(item["arguments"][1:] == ["--acl"] for item in baton_out_as_json))
+        self.assertCountEqual([len(chunk) for chunk in self.chunks_run], [2, 2, 1])
+
+    def test_run_baton_query_when_chunk_fails(self):
+        input_data = [{"index": i} for i in range(6)]
+        input_data[1]["error"] = KeyError()
+        input_data[4]["error"] = FileNotFoundError()
+        self.assertRaises(KeyError, self.baton_runner.run_baton_query, BatonBinary.BATON_LIST, [], input_data)
+
+    def test_init_with_invalid_chunk_size(self):
+        self.assertRaises(ValueError, StubBatonRunner, "", skip_baton_binaries_validation=True, chunk_size=0)
+
+
+class TestCreateBatchResult(unittest.TestCase):
+    """
+    Tests for `BatonRunner._create_batch_result`.
+    """
+    def test_create_batch_result(self):
+        baton_out_as_json = [
+            {"path": _NAMES[0]},
+            {"path": _NAMES[1], "error": {"code": IRODS_ERROR_USER_FILE_DOES_NOT_EXIST, "message": "Not found"}},
+            {"path": _NAMES[2], "error": {"code": -1, "message": "Other"}}
+        ]
+        batch_result = BatonRunner._create_batch_result(_NAMES, baton_out_as_json, lambda item: item["path"].upper())
+        self.assertEqual(batch_result.successes, {_NAMES[0]: _NAMES[0].upper()})
+        self.assertEqual(list(batch_result.errors.keys()), _NAMES[1:])
+        self.assertIsInstance(batch_result.errors[_NAMES[1]], FileNotFoundError)
+        self.assertIsInstance(batch_result.errors[_NAMES[2]], RuntimeError)
+
+    def test_run_baton_query_without_raising_errors(self):
+        baton_out = json.dumps({"error": {"code": IRODS_ERROR_USER_FILE_DOES_NOT_EXIST, "message": "Not found"}})
+        self.assertRaises(FileNotFoundError, BatonRunner._parse_baton_out, baton_out)
+        self.assertEqual(len(BatonRunner._parse_baton_out(baton_out, raise_errors=False)), 1)
+
+
+class TestIterParseBatonOut(unittest.TestCase):
+    """
+    Tests for `BatonRunner._iter_parse_baton_out`.
+    """
+    def setUp(self):
+        self.items = [{"path": "/%s/\u00e9" % name, "index": i} for i, name in enumerate(_NAMES)]
+
+    def _parse_in_chunks(self, baton_out: str, chunk_size: int) -> List[Dict]:
+        baton_out = baton_out.encode("utf-8")
+        chunks = [baton_out[i:i + chunk_size] for i in range(0, len(baton_out), chunk_size)]
+        return list(BatonRunner._iter_parse_baton_out(chunks))
+
+    def test_with_no_output(self):
+        self.assertEqual(self._parse_in_chunks("", 1), [])
+
+    def test_with_line_separated_documents(self):
+        baton_out = "\n".join(json.dumps(item) for item in self.items)
+        for chunk_size in (1, 2, 5, len(baton_out)):
+            self.assertEqual(self._parse_in_chunks(baton_out, chunk_size), self.items)
+
+    def test_with_array(self):
+        baton_out = json.dumps(self.items)
+        for chunk_size in (1, 2, 5, len(baton_out)):
+            self.assertEqual(self._parse_in_chunks(baton_out, chunk_size), self.items)
+
+    def test_with_empty_array(self):
+        self.assertEqual(self._parse_in_chunks("[]\n", 1), [])
+
+    def test_with_error(self):
+        error = {"error": {"code": IRODS_ERROR_USER_FILE_DOES_NOT_EXIST, "message": "Not found"}}
+        baton_out = "\n".join(json.dumps(item) for item in [self.items[0], error, self.items[1]])
+        parsed = BatonRunner._iter_parse_baton_out([baton_out.encode("utf-8")])
+        self.assertEqual(next(parsed), self.items[0])
+        self.assertRaises(FileNotFoundError, next, parsed)
+
+    def test_with_truncated_output(self):
+        self.assertRaises(ValueError, self._parse_in_chunks, json.dumps(self.items)[:-1], 4)
+
+
+class TestBatonWorker(unittest.TestCase):
+    """
+    Tests for `BatonWorker`.
+    """
+    def test_query(self):
+        worker = BatonWorker(["cat"])
+        try:
+            self.assertEqual(worker.query({"a": 1}), {"a": 1})
+            self.assertEqual(worker.query([{"b": 2}]), [{"b": 2}])
+            self.assertEqual(worker.requests_served, 2)
+        finally:
+            worker.stop()
+
+    def test_is_healthy_after_max_requests(self):
+        worker = BatonWorker(["cat"], max_requests=1)
+        try:
+            self.assertTrue(worker.is_healthy())
+            worker.query({})
+            self.assertFalse(worker.is_healthy())
+        finally:
+            worker.stop()
+
+    def test_is_healthy_after_stop(self):
+        worker = BatonWorker(["cat"])
+        worker.stop()
+        self.assertFalse(worker.is_healthy())
+
+    def test_query_when_process_dies(self):
+        worker = BatonWorker(["true"])
+        self.assertRaises(RuntimeError, worker.query, {})
+        self.assertFalse(worker.is_healthy())
+
+    def test_query_timeout(self):
+        worker = BatonWorker(["sleep", "999"])
+        self.assertRaises(TimeoutExpired, worker.query, {}, 0.001)
+        self.assertFalse(worker.is_healthy())
+
+
+class TestBatonExecutor(unittest.TestCase):
+    """
+    Tests for `BatonExecutor`.
+    """
+    # `cat` run such that the unbuffered flag appended by the executor is ignored
+    _CAT = ["sh", "-c", "cat", "sh"]
+
+    def setUp(self):
+        self.executor = BatonExecutor()
+
+    def tearDown(self):
+        self.executor.close()
+
+    def test_get_worker_reuses_worker(self):
+        worker = self.executor.get_worker(TestBatonExecutor._CAT)
+        self.assertIs(self.executor.get_worker(TestBatonExecutor._CAT), worker)
+
+    def test_get_worker_recycles_unhealthy_worker(self):
+        worker = self.executor.get_worker(TestBatonExecutor._CAT)
+        worker.stop()
+        self.assertIsNot(self.executor.get_worker(TestBatonExecutor._CAT), worker)
+
+
+class TestBatonExecutorPool(unittest.TestCase):
+    """
+    Tests for `BatonExecutorPool`.
+    """
+    def test_executor_reused(self):
+        pool = BatonExecutorPool()
+        with pool.executor() as executor:
+            self.assertEqual(pool.active, 1)
+        self.assertEqual(pool.active, 0)
+        with pool.executor() as other_executor:
+            self.assertIs(other_executor, executor)
+
+    def test_executor_when_size_exceeded(self):
+        pool = BatonExecutorPool(1, max_wait_time=timedelta(milliseconds=10))
+        with pool.executor():
+            self.assertRaises(TimeoutError, pool.executor().__enter__)
+        self.assertEqual(pool.waiting, 0)
+
+    def test_executor_when_queue_full(self):
+        pool = BatonExecutorPool(1, max_waiting=0)
+        with pool.executor():
+            self.assertRaises(Full, pool.executor().__enter__)
+
+    def test_executor_served_in_order(self):
+        pool = BatonExecutorPool(1)
+        served = []
+        release = Event()
+
+        def use_executor(identifier: int):
+            with pool.executor():
+                served.append(identifier)
+                release.wait()
+
+        threads = []
+        for i in range(5):
+            thread = Thread(target=use_executor, args=(i, ))
+            thread.start()
+            threads.append(thread)
+            while pool.active + pool.waiting != i + 1:
+                pass
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(served, list(range(5)))
+
+    def test_invalid_size(self):
+        self.assertRaises(ValueError, BatonExecutorPool, 0)
+
 
 if __name__ == "__main__":
     unittest.main()
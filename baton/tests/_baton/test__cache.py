@@ -0,0 +1,127 @@
+import unittest
+from datetime import timedelta
+
+from baton._baton._cache import TimedLruCache
+from baton.models import BatchResult, CacheStatistics
+
+_KIND = "kind"
+_OTHER_KIND = "other_kind"
+
+
+class TestTimedLruCache(unittest.TestCase):
+    """
+    Tests for `TimedLruCache`.
+    """
+    def setUp(self):
+        self.time = 0.0
+        self.cache = TimedLruCache({_KIND: timedelta(seconds=10), _OTHER_KIND: timedelta(seconds=1)}, max_size=3,
+                                   clock=lambda: self.time)
+        self.loaded = []
+
+    def _load(self, keys):
+        self.loaded.append(list(keys))
+        batch_result = BatchResult()
+        for key in keys:
+            if key.startswith("/invalid"):
+                batch_result.errors[key] = FileNotFoundError(key)
+            else:
+                batch_result.successes[key] = {key}
+        return batch_result
+
+    def test_init_with_invalid_max_size(self):
+        self.assertRaises(ValueError, TimedLruCache, {}, 0)
+
+    def test_get_when_not_cached(self):
+        self.assertIsNone(self.cache.get(_KIND, "/a"))
+
+    def test_get_when_cached(self):
+        self.cache.set(_KIND, "/a", 1)
+        self.assertEqual(self.cache.get(_KIND, "/a"), 1)
+        self.assertIsNone(self.cache.get(_OTHER_KIND, "/a"))
+
+    def test_set_when_kind_not_cached(self):
+        self.cache.set("uncached_kind", "/a", 1)
+        self.assertFalse(self.cache.caches("uncached_kind"))
+        self.assertIsNone(self.cache.get("uncached_kind", "/a"))
+
+    def test_get_when_expired(self):
+        self.cache.set(_KIND, "/a", 1)
+        self.cache.set(_OTHER_KIND, "/a", 2)
+        self.time = 5.0
+        self.assertEqual(self.cache.get(_KIND, "/a"), 1)
+        self.assertIsNone(self.cache.get(_OTHER_KIND, "/a"))
+
+    def test_least_recently_used_evicted(self):
+        for key in ("/a", "/b", "/c"):
+            self.cache.set(_KIND, key, key)
+        self.cache.get(_KIND, "/a")
+        self.cache.set(_KIND, "/d", "/d")
+        self.assertEqual(len(self.cache), 3)
+        self.assertIsNone(self.cache.get(_KIND, "/b"))
+        self.assertEqual(self.cache.get(_KIND, "/a"), "/a")
+
+    def test_get_or_load(self):
+        self.cache.set(_KIND, "/b", {"/b"})
+        batch_result = self.cache.get_or_load(_KIND, ["/a", "/b", "/invalid", "/a"], self._load, set)
+        self.assertEqual(self.loaded, [["/a", "/invalid"]])
+        self.assertEqual(list(batch_result.successes.items()), [("/a", {"/a"}), ("/b", {"/b"})])
+        self.assertIsInstance(batch_result.errors["/invalid"], FileNotFoundError)
+        self.assertIsNone(self.cache.get(_KIND, "/invalid"))
+
+        self.cache.get_or_load(_KIND, ["/a", "/b"], self._load, set)
+        self.assertEqual(len(self.loaded), 1)
+
+    def test_get_or_load_returns_copies(self):
+        self.cache.get_or_load(_KIND, ["/a"], self._load, set).successes["/a"].add("changed")
+        self.cache.get_or_load(_KIND, ["/a"], self._load, set).successes["/a"].add("changed")
+        self.assertEqual(self.cache.get(_KIND, "/a"), {"/a"})
+
+    def test_get_or_load_does_not_cache_if_invalidated_during_load(self):
+        def load(keys):
+            self.cache.invalidate(_KIND, keys)
+            return self._load(keys)
+
+        self.cache.get_or_load(_KIND, ["/a"], load, set)
+        self.assertIsNone(self.cache.get(_KIND, "/a"))
+
+    def test_invalidate(self):
+        self.cache.set(_KIND, "/a", 1)
+        self.cache.set(_OTHER_KIND, "/a", 2)
+        self.cache.invalidate(_KIND, ["/a"])
+        self.assertIsNone(self.cache.get(_KIND, "/a"))
+        self.assertEqual(self.cache.get(_OTHER_KIND, "/a"), 2)
+
+    def test_invalidate_paths_in(self):
+        for key in ("/collection", "/collection/a/b", "/collection_other"):
+            self.cache.set(_KIND, key, 1)
+        self.cache.invalidate_paths_in(_KIND, ["/collection/"])
+        self.assertEqual(self.cache.get(_KIND, "/collection"), 1)
+        self.assertIsNone(self.cache.get(_KIND, "/collection/a/b"))
+        self.assertEqual(self.cache.get(_KIND, "/collection_other"), 1)
+
+    def test_invalidate_all(self):
+        self.cache.set(_KIND, "/a", 1)
+        self.cache.set(_KIND, "/b", 1)
+        self.cache.set(_OTHER_KIND, "/a", 2)
+        self.cache.invalidate_all(_KIND)
+        self.assertEqual(len(self.cache), 1)
+        self.assertEqual(self.cache.get(_OTHER_KIND, "/a"), 2)
+
+    def test_get_statistics(self):
+        self.cache.set(_KIND, "/a", {"/a"})
+        self.cache.get(_KIND, "/a")
+        self.cache.get(_KIND, "/b")
+        self.cache.get_or_load(_KIND, ["/a", "/c"], self._load, set)
+        self.assertEqual(self.cache.get_statistics(), {
+            _KIND: CacheStatistics(hits=2, misses=2, size=2),
+            _OTHER_KIND: CacheStatistics()
+        })
+
+    def test_clear(self):
+        self.cache.set(_KIND, "/a", 1)
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
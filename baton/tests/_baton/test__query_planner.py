@@ -0,0 +1,153 @@
+import unittest
+from typing import List, Tuple
+
+from baton._baton._query_planner import plan_metadata_query, matches_baton_json, Metaquery, MAX_METAQUERIES
+from baton._baton.metadata_statistics import IrodsMetadataStatistics
+from baton.collections import IrodsMetadata
+from baton.models import SearchCriterion, AllOf, AnyOf, In, Between, DataObject
+from hgicommon.enums import ComparisonOperator
+
+_EQUALS = ComparisonOperator.EQUALS
+_LESS_THAN = ComparisonOperator.LESS_THAN
+_GREATER_THAN = ComparisonOperator.GREATER_THAN
+
+
+def _as_tuples(metaqueries: List[Metaquery]) -> List[Tuple[List[Tuple], List[Tuple]]]:
+    """
+    Converts the given metaqueries to tuples of their search criteria, which are easier to compare.
+    :param metaqueries: the metaqueries
+    :return: tuples of the search criteria given to baton and the search criteria evaluated locally
+    """
+    return [([(criterion.attribute, criterion.value, criterion.comparison_operator)
+              for criterion in metaquery.search_criteria],
+             [(criterion.attribute, criterion.value, criterion.comparison_operator)
+              for criterion in metaquery.local_search_criteria])
+            for metaquery in metaqueries]
+
+
+class TestPlanMetadataQuery(unittest.TestCase):
+    """
+    Tests for `plan_metadata_query`.
+    """
+    def test_plan_search_criterion(self):
+        self.assertEqual(_as_tuples(plan_metadata_query(SearchCriterion("a", "1"))), [([("a", "1", _EQUALS)], [])])
+
+    def test_plan_conjunction(self):
+        metaqueries = plan_metadata_query([SearchCriterion("b", "2"), SearchCriterion("a", "1")])
+        self.assertEqual(_as_tuples(metaqueries), [([("a", "1", _EQUALS), ("b", "2", _EQUALS)], [])])
+
+    def test_plan_conjunction_with_many_criteria_on_same_attribute(self):
+        metaqueries = plan_metadata_query(AllOf(SearchCriterion("a", "1", _GREATER_THAN), SearchCriterion("a", "5"),
+                                                SearchCriterion("a", "9", _LESS_THAN)))
+        self.assertEqual(_as_tuples(metaqueries),
+                         [([("a", "5", _EQUALS)], [("a", "1", _GREATER_THAN), ("a", "9", _LESS_THAN)])])
+
+    def test_plan_any_of(self):
+        metaqueries = plan_metadata_query(AnyOf(SearchCriterion("a", "1"), SearchCriterion("b", "2")))
+        self.assertEqual(_as_tuples(metaqueries), [([("a", "1", _EQUALS)], []), ([("b", "2", _EQUALS)], [])])
+
+    def test_plan_any_of_nothing(self):
+        self.assertEqual(plan_metadata_query(AnyOf()), [])
+
+    def test_plan_in(self):
+        metaqueries = plan_metadata_query(In("a", ["1", "2", "1"]))
+        self.assertEqual(_as_tuples(metaqueries), [([("a", "1", _EQUALS)], []), ([("a", "2", _EQUALS)], [])])
+
+    def test_plan_between(self):
+        metaqueries = plan_metadata_query(Between("a", "1", "5"))
+        self.assertEqual(_as_tuples(metaqueries), [([("a", "1", _EQUALS)], []), ([("a", "5", _EQUALS)], []),
+                                                   ([("a", "1", _GREATER_THAN)],
+                                                    [("a", "1", _GREATER_THAN), ("a", "5", _LESS_THAN)])])
+        self.assertEqual(_as_tuples(plan_metadata_query(Between("a", "1", "1"))), [([("a", "1", _EQUALS)], [])])
+        self.assertEqual(plan_metadata_query(Between("a", "5", "1")), [])
+
+    def test_plan_distributes_conjunction_over_disjunction(self):
+        metaqueries = plan_metadata_query([SearchCriterion("a", "1"), In("b", ["2", "3"])])
+        self.assertEqual(_as_tuples(metaqueries), [([("a", "1", _EQUALS), ("b", "2", _EQUALS)], []),
+                                                   ([("a", "1", _EQUALS), ("b", "3", _EQUALS)], [])])
+
+    def test_plan_drops_subsumed_conjunctions(self):
+        metaqueries = plan_metadata_query(AnyOf(AllOf(SearchCriterion("a", "1"), SearchCriterion("b", "2")),
+                                                SearchCriterion("a", "1")))
+        self.assertEqual(_as_tuples(metaqueries), [([("a", "1", _EQUALS)], [])])
+
+    def test_plan_with_metadata_statistics(self):
+        metadata_statistics = IrodsMetadataStatistics([
+            DataObject("/collection/data_object_%d" % i, metadata=IrodsMetadata({"a": {"1"}, "b": {str(i)}}))
+            for i in range(100)])
+        metaqueries = plan_metadata_query([SearchCriterion("a", "1"), SearchCriterion("b", "7")], metadata_statistics)
+        self.assertEqual(_as_tuples(metaqueries), [([("b", "7", _EQUALS)], [("a", "1", _EQUALS)])])
+
+    def test_plan_with_metadata_statistics_when_no_criterion_is_selective(self):
+        metadata_statistics = IrodsMetadataStatistics([
+            DataObject("/collection/data_object_%d" % i, metadata=IrodsMetadata({"a": {"1"}, "b": {str(i % 2)}}))
+            for i in range(100)])
+        metaqueries = plan_metadata_query([SearchCriterion("a", "1"), SearchCriterion("b", "1")], metadata_statistics)
+        self.assertEqual(_as_tuples(metaqueries), [([("a", "1", _EQUALS), ("b", "1", _EQUALS)], [])])
+
+    def test_plan_with_metadata_statistics_when_attribute_not_sampled(self):
+        metadata_statistics = IrodsMetadataStatistics([
+            DataObject("/collection/data_object_%d" % i, metadata=IrodsMetadata({"a": {"1"}, "b": {str(i)}}))
+            for i in range(100)])
+        metaqueries = plan_metadata_query(
+            [SearchCriterion("a", "1"), SearchCriterion("b", "7"), SearchCriterion("c", "1")], metadata_statistics)
+        self.assertEqual(_as_tuples(metaqueries),
+                         [([("b", "7", _EQUALS), ("c", "1", _EQUALS)], [("a", "1", _EQUALS)])])
+
+    def test_plan_with_metadata_statistics_when_only_unsampled_attributes_are_selective(self):
+        metadata_statistics = IrodsMetadataStatistics([
+            DataObject("/collection/data_object_%d" % i, metadata=IrodsMetadata({"a": {"1"}})) for i in range(100)])
+        metaqueries = plan_metadata_query([SearchCriterion("a", "1"), SearchCriterion("c", "1")], metadata_statistics)
+        self.assertEqual(_as_tuples(metaqueries), [([("a", "1", _EQUALS), ("c", "1", _EQUALS)], [])])
+
+    def test_plan_with_unsupported_operator(self):
+        self.assertRaises(ValueError, plan_metadata_query, SearchCriterion("a", "1", ComparisonOperator.CONTAINS))
+
+    def test_plan_without_criteria(self):
+        self.assertRaises(ValueError, plan_metadata_query, [])
+
+    def test_plan_with_too_many_metaqueries(self):
+        values = [str(i) for i in range(MAX_METAQUERIES)]
+        self.assertRaises(ValueError, plan_metadata_query, [In("a", values), In("b", values)])
+
+    def test_plan_with_unsupported_query(self):
+        self.assertRaises(TypeError, plan_metadata_query, "a")
+
+
+class TestMatchesBatonJson(unittest.TestCase):
+    """
+    Tests for `matches_baton_json`.
+    """
+    def setUp(self):
+        self.entity_as_baton_json = {"collection": "/collection", "avus": [
+            {"attribute": "a", "value": "1"}, {"attribute": "a", "value": "5"}, {"attribute": "b", "value": "2"}]}
+
+    def test_matches(self):
+        self.assertTrue(matches_baton_json(self.entity_as_baton_json, [
+            SearchCriterion("a", "1"), SearchCriterion("a", "4", _GREATER_THAN),
+            SearchCriterion("b", "3", _LESS_THAN)]))
+
+    def test_does_not_match(self):
+        self.assertFalse(matches_baton_json(self.entity_as_baton_json, [
+            SearchCriterion("a", "1"), SearchCriterion("a", "5", _GREATER_THAN)]))
+        self.assertFalse(matches_baton_json(self.entity_as_baton_json, [SearchCriterion("c", "1")]))
+
+    def test_matches_range_with_one_value(self):
+        self.assertTrue(matches_baton_json(self.entity_as_baton_json, [
+            SearchCriterion("a", "4", _GREATER_THAN), SearchCriterion("a", "6", _LESS_THAN)]))
+
+    def test_does_not_match_range_straddled_by_values(self):
+        # Neither "1" nor "5" is between "2" and "4", although one is below and the other above
+        self.assertFalse(matches_baton_json(self.entity_as_baton_json, [
+            SearchCriterion("a", "2", _GREATER_THAN), SearchCriterion("a", "4", _LESS_THAN)]))
+
+    def test_does_not_match_between_straddled_by_values(self):
+        entity_as_baton_json = {"collection": "/collection", "avus": [
+            {"attribute": "x", "value": "a"}, {"attribute": "x", "value": "z"}]}
+        for metaquery in plan_metadata_query(Between("x", "m", "n")):
+            self.assertFalse(matches_baton_json(entity_as_baton_json, metaquery.search_criteria) and matches_baton_json(
+                entity_as_baton_json, metaquery.local_search_criteria))
+
+
+if __name__ == "__main__":
+    unittest.main()
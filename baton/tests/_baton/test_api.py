@@ -1,9 +1,14 @@
 import unittest
+from datetime import timedelta
 from unittest.mock import patch, MagicMock
 
-from baton._baton.api import Connection, connect_to_irods_with_baton
+from baton._baton._cache import METADATA_CACHE_KIND, ACCESS_CONTROLS_CACHE_KIND, METADATA_QUERY_CACHE_KIND
+from baton._baton.api import Connection, AsyncConnection, connect_to_irods_with_baton
+from baton._baton.async_baton_mappers import AsyncBatonDataObjectMapper, AsyncBatonCollectionMapper, \
+    AsyncBatonSpecificQueryMapper
 from baton._baton.baton_custom_object_mappers import BatonSpecificQueryMapper
 from baton._baton.baton_entity_mappers import BatonCollectionMapper, BatonDataObjectMapper
+from baton.models import DataObject, Collection
 from baton.tests._baton._settings import BATON_SETUP
 from testwithbaton.api import TestWithBaton
 
@@ -23,6 +28,67 @@ class TestConnection(unittest.TestCase):
         self.assertIsInstance(connection.collection, BatonCollectionMapper)
         self.assertIsInstance(connection.specific_query, BatonSpecificQueryMapper)
 
+    def test_mappers_share_executor_pool(self):
+        connection = Connection("location", skip_baton_binaries_validation=True, max_concurrent_queries=2)
+        executor_pool = connection.data_object._executor_pool
+        self.assertEqual(executor_pool.size, 2)
+        self.assertIs(connection.data_object.metadata._executor_pool, executor_pool)
+        self.assertIs(connection.collection._executor_pool, executor_pool)
+        self.assertIs(connection.collection.access_control._executor_pool, executor_pool)
+        self.assertIs(connection.specific_query._executor_pool, executor_pool)
+
+    def test_mappers_share_cache(self):
+        connection = Connection("location", skip_baton_binaries_validation=True,
+                                cache_metadata_for=timedelta(minutes=1), max_cached_items=100)
+        cache = connection.data_object.metadata._cache
+        self.assertEqual(cache.max_size, 100)
+        self.assertTrue(cache.caches(METADATA_CACHE_KIND))
+        self.assertFalse(cache.caches(ACCESS_CONTROLS_CACHE_KIND))
+        self.assertIs(connection.collection.metadata._cache, cache)
+        self.assertIs(connection.collection.access_control._cache, cache)
+
+    def test_no_cache_by_default(self):
+        connection = Connection("location", skip_baton_binaries_validation=True)
+        self.assertIsNone(connection.data_object.metadata._cache)
+        self.assertEqual(connection.get_cache_statistics(), {})
+        connection.clear_cache()
+        connection.invalidate_metadata_queries()
+
+    def test_cache_metadata_queries(self):
+        connection = Connection("location", skip_baton_binaries_validation=True,
+                                cache_metadata_queries_for=timedelta(minutes=1))
+        self.assertIs(connection.data_object._cache, connection.collection._cache)
+        self.assertEqual(list(connection.get_cache_statistics().keys()), [METADATA_QUERY_CACHE_KIND])
+
+    def test_resolve(self):
+        connection = Connection("location", skip_baton_binaries_validation=True)
+        connection.collection.run_baton_query = MagicMock(return_value=[
+            {"collection": "/collection", "data_object": "data_object"}, {"collection": "/collection"},
+            {"error": {"code": -310000, "message": "Does not exist"}, "collection": "/missing"}])
+
+        batch_result = connection.resolve(["/collection/data_object", "/collection", "/missing"])
+        self.assertEqual(batch_result.successes, {"/collection/data_object": DataObject("/collection/data_object"),
+                                                  "/collection": Collection("/collection")})
+        self.assertIsInstance(batch_result.errors["/missing"], FileNotFoundError)
+        self.assertEqual(connection.collection.run_baton_query.call_count, 1)
+
+    def test_get_entity_mapper_of_resolved_paths(self):
+        connection = Connection("location", skip_baton_binaries_validation=True)
+        connection.collection.run_baton_query = MagicMock(return_value=[
+            {"collection": "/collection", "data_object": "data_object"}, {"collection": "/collection"}])
+        connection.resolve(["/collection/data_object", "/collection"])
+
+        self.assertIs(connection.get_entity_mapper("/collection/data_object"), connection.data_object)
+        self.assertIs(connection.get_entity_mapper("/collection"), connection.collection)
+        self.assertEqual(connection.collection.run_baton_query.call_count, 1)
+
+    def test_get_entity_mapper_of_unresolved_path(self):
+        connection = Connection("location", skip_baton_binaries_validation=True, cache_entity_types_for=None)
+        connection.collection.run_baton_query = MagicMock(return_value=[{"collection": "/collection"}])
+        self.assertIs(connection.get_entity_mapper("/collection"), connection.collection)
+        self.assertIs(connection.get_entity_mapper("/collection"), connection.collection)
+        self.assertEqual(connection.collection.run_baton_query.call_count, 2)
+
     def test_skip_baton_binaries_validation(self):
         self.assertRaises(ValueError, Connection, "invalid", False)
 
@@ -30,6 +96,31 @@ class TestConnection(unittest.TestCase):
         self.test_with_baton.tear_down()
 
 
+class TestAsyncConnection(unittest.TestCase):
+    """
+    Tests for `AsyncConnection` class.
+    """
+    def test_correct_mapper_properties(self):
+        connection = AsyncConnection("location", skip_baton_binaries_validation=True)
+        self.assertIsInstance(connection.data_object, AsyncBatonDataObjectMapper)
+        self.assertIsInstance(connection.collection, AsyncBatonCollectionMapper)
+        self.assertIsInstance(connection.specific_query, AsyncBatonSpecificQueryMapper)
+
+    def test_mappers_share_semaphore(self):
+        connection = AsyncConnection("location", skip_baton_binaries_validation=True, max_concurrent_queries=2)
+        semaphore = connection.data_object._semaphore
+        self.assertIsNotNone(semaphore)
+        self.assertIs(connection.data_object.metadata._semaphore, semaphore)
+        self.assertIs(connection.collection.access_control._semaphore, semaphore)
+        self.assertIs(connection.specific_query._semaphore, semaphore)
+
+    def test_skip_baton_binaries_validation(self):
+        self.assertRaises(ValueError, AsyncConnection, "invalid", False)
+
+    def test_invalid_max_concurrent_queries(self):
+        self.assertRaises(ValueError, AsyncConnection, "location", True, max_concurrent_queries=0)
+
+
 class TestConnectToIrodsWithBaton(unittest.TestCase):
     """
     Tests for `connect_to_irods_with_baton` method.
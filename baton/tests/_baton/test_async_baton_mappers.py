@@ -0,0 +1,144 @@
+import asyncio
+import unittest
+
+from baton._baton.async_baton_mappers import AsyncBatonDataObjectMapper, AsyncBatonCollectionMapper, \
+    AsyncBatonSpecificQueryMapper
+from baton.collections import IrodsMetadata
+from baton.models import SearchCriterion, AccessControl, SpecificQuery, AnyOf, In
+from baton.tests._baton._helpers import create_data_object, create_collection, NAMES, ATTRIBUTES, VALUES
+from baton.tests._baton._settings import BATON_SETUP
+from hgicommon.enums import ComparisonOperator
+from testwithbaton.api import TestWithBaton
+
+
+class _TestWithAsyncBaton(unittest.TestCase):
+    """
+    Base class for tests of asynchronous mappers.
+    """
+    def setUp(self):
+        self.test_with_baton = TestWithBaton(baton_setup=BATON_SETUP)
+        self.test_with_baton.setup()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(None)
+        self.test_with_baton.tear_down()
+
+    def run_coroutine(self, coroutine):
+        """
+        Runs the given coroutine to completion.
+        :param coroutine: the coroutine to run
+        :return: the coroutine's result
+        """
+        return self.loop.run_until_complete(coroutine)
+
+
+class TestAsyncBatonDataObjectMapper(_TestWithAsyncBaton):
+    """
+    Tests for `AsyncBatonDataObjectMapper`.
+    """
+    def setUp(self):
+        super().setUp()
+        self.metadata = IrodsMetadata({ATTRIBUTES[0]: {VALUES[0]}})
+        self.mapper = AsyncBatonDataObjectMapper(self.test_with_baton.baton_location)
+
+    def test_get_by_metadata(self):
+        data_object = create_data_object(self.test_with_baton, NAMES[0], self.metadata)
+        search_criterion = SearchCriterion(ATTRIBUTES[0], VALUES[0], ComparisonOperator.EQUALS)
+        retrieved = self.run_coroutine(self.mapper.get_by_metadata(search_criterion))
+        self.assertEqual(retrieved, [data_object])
+
+    def test_get_by_metadata_with_any_of(self):
+        data_object_1 = create_data_object(self.test_with_baton, NAMES[0], self.metadata)
+        data_object_2 = create_data_object(self.test_with_baton, NAMES[1], IrodsMetadata({ATTRIBUTES[1]: {VALUES[1]}}))
+        create_data_object(self.test_with_baton, NAMES[2], IrodsMetadata())
+        retrieved = self.run_coroutine(self.mapper.get_by_metadata(AnyOf(
+            SearchCriterion(ATTRIBUTES[0], VALUES[0], ComparisonOperator.EQUALS),
+            SearchCriterion(ATTRIBUTES[1], VALUES[1], ComparisonOperator.EQUALS))))
+        self.assertEqual(sorted(retrieved, key=lambda data_object: data_object.path), [data_object_1, data_object_2])
+
+    def test_get_by_metadata_with_in(self):
+        data_object = create_data_object(self.test_with_baton, NAMES[0], self.metadata)
+        retrieved = self.run_coroutine(self.mapper.get_by_metadata(In(ATTRIBUTES[0], [VALUES[0], VALUES[1]])))
+        self.assertEqual(retrieved, [data_object])
+
+    def test_get_by_path(self):
+        data_object = create_data_object(self.test_with_baton, NAMES[0], self.metadata)
+        retrieved = self.run_coroutine(self.mapper.get_by_path(data_object.path))
+        self.assertEqual(retrieved, data_object)
+
+    def test_get_by_path_concurrently(self):
+        data_objects = [create_data_object(self.test_with_baton, name, self.metadata) for name in NAMES]
+        queries = [self.mapper.get_by_path(data_object.path) for data_object in data_objects]
+        retrieved = self.run_coroutine(asyncio.gather(*queries))
+        self.assertEqual(retrieved, data_objects)
+
+    def test_get_by_path_when_does_not_exist(self):
+        self.assertRaises(FileNotFoundError, self.run_coroutine, self.mapper.get_by_path("/invalid"))
+
+    def test_get_all_in_collection(self):
+        data_object = create_data_object(self.test_with_baton, NAMES[0], self.metadata)
+        retrieved = self.run_coroutine(self.mapper.get_all_in_collection(data_object.get_collection_path()))
+        self.assertEqual(retrieved, [data_object])
+
+    def test_metadata_add_and_get_all(self):
+        data_object = create_data_object(self.test_with_baton, NAMES[0])
+        self.run_coroutine(self.mapper.metadata.add(data_object.path, self.metadata))
+        self.assertEqual(self.run_coroutine(self.mapper.metadata.get_all(data_object.path)), self.metadata)
+
+    def test_metadata_set(self):
+        data_object = create_data_object(self.test_with_baton, NAMES[0], self.metadata)
+        new_metadata = IrodsMetadata({ATTRIBUTES[1]: {VALUES[1]}})
+        self.run_coroutine(self.mapper.metadata.set(data_object.path, new_metadata))
+        self.assertEqual(self.run_coroutine(self.mapper.metadata.get_all(data_object.path)), new_metadata)
+
+    def test_metadata_remove_all(self):
+        data_object = create_data_object(self.test_with_baton, NAMES[0], self.metadata)
+        self.run_coroutine(self.mapper.metadata.remove_all(data_object.path))
+        self.assertEqual(self.run_coroutine(self.mapper.metadata.get_all(data_object.path)), IrodsMetadata())
+
+    def test_access_control_set(self):
+        data_object = create_data_object(self.test_with_baton, NAMES[0])
+        user = self.test_with_baton.irods_server.users[0]
+        access_controls = {AccessControl("%s#%s" % (user.username, user.zone), AccessControl.Level.READ)}
+        self.run_coroutine(self.mapper.access_control.set(data_object.path, access_controls))
+        self.assertEqual(self.run_coroutine(self.mapper.access_control.get_all(data_object.path)), access_controls)
+
+
+class TestAsyncBatonCollectionMapper(_TestWithAsyncBaton):
+    """
+    Tests for `AsyncBatonCollectionMapper`.
+    """
+    def setUp(self):
+        super().setUp()
+        self.mapper = AsyncBatonCollectionMapper(self.test_with_baton.baton_location)
+
+    def test_get_by_path(self):
+        collection = create_collection(self.test_with_baton, NAMES[0], IrodsMetadata({ATTRIBUTES[0]: {VALUES[0]}}))
+        retrieved = self.run_coroutine(self.mapper.get_by_path([collection.path]))
+        self.assertEqual(retrieved, [collection])
+
+    def test_access_control_set_with_recursion(self):
+        collection = create_collection(self.test_with_baton, NAMES[0])
+        user = self.test_with_baton.irods_server.users[0]
+        access_controls = {AccessControl("%s#%s" % (user.username, user.zone), AccessControl.Level.WRITE)}
+        self.run_coroutine(self.mapper.access_control.set(collection.path, access_controls, recursive=True))
+        self.assertEqual(self.run_coroutine(self.mapper.access_control.get_all(collection.path)), access_controls)
+
+
+class TestAsyncBatonSpecificQueryMapper(_TestWithAsyncBaton):
+    """
+    Tests for `AsyncBatonSpecificQueryMapper`.
+    """
+    def test_get_all(self):
+        mapper = AsyncBatonSpecificQueryMapper(self.test_with_baton.baton_location)
+        specific_queries = self.run_coroutine(mapper.get_all())
+        self.assertGreater(len(specific_queries), 0)
+        for specific_query in specific_queries:
+            self.assertIsInstance(specific_query, SpecificQuery)
+
+
+if __name__ == "__main__":
+    unittest.main()
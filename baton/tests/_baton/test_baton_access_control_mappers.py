@@ -1,9 +1,11 @@
 import unittest
 from abc import abstractmethod
+from datetime import timedelta
 from typing import Iterable, List
 
 from testwithirods.helpers import SetupHelper
 
+from baton._baton._cache import TimedLruCache, ACCESS_CONTROLS_CACHE_KIND
 from baton._baton.baton_access_control_mappers import _BatonAccessControlMapper, BatonDataObjectAccessControlMapper, \
     BatonCollectionAccessControlMapper
 from baton.models import AccessControl, DataObject, Collection, User
@@ -31,9 +33,10 @@ class _TestBatonAccessControlMapper(unittest.TestCase):
     Tests for `_BatonAccessControlMapper`.
     """
     @abstractmethod
-    def create_mapper(self) -> _BatonAccessControlMapper:
+    def create_mapper(self, cache: TimedLruCache=None) -> _BatonAccessControlMapper:
         """
         Creates a mapper to test with.
+        :param cache: the cache that the mapper should use
         :return: the created mapper
         """
 
@@ -82,6 +85,13 @@ class _TestBatonAccessControlMapper(unittest.TestCase):
         self.assertEqual(self.mapper.get_all([entity_1.path, entity_2.path, entity_3.path]),
                          [set(self.access_controls), {self.access_control}, set()])
 
+    def test_get_all_with_partial_results(self):
+        entity = self.create_irods_entity(NAMES[0], self.access_controls)
+        batch_result = self.mapper.get_all([entity.path, "/invalid"], partial_results=True)
+        self.assertEqual(batch_result.successes, {entity.path: set(self.access_controls)})
+        self.assertEqual(list(batch_result.errors.keys()), ["/invalid"])
+        self.assertIsInstance(batch_result.errors["/invalid"], FileNotFoundError)
+
     def test_add_or_replace_with_invalid_path(self):
         self.assertRaises(FileNotFoundError, self.mapper.add_or_replace, "/invalid", self.access_controls)
 
@@ -172,13 +182,35 @@ class _TestBatonAccessControlMapper(unittest.TestCase):
         self.mapper.revoke_all(paths)
         self.assertEqual(self.mapper.get_all(paths), [set() for _ in range(len(paths))])
 
+    def test_revoke_all_does_not_modify_previously_retrieved_access_controls(self):
+        entity = self.create_irods_entity(NAMES[0], self.access_controls)
+        retrieved_access_controls = self.mapper.get_all(entity.path)
+        self.mapper.revoke_all(entity.path)
+        self.assertCountEqual(retrieved_access_controls, self.access_controls)
+
+    def test_get_all_with_cache(self):
+        mapper = self.create_mapper(TimedLruCache({ACCESS_CONTROLS_CACHE_KIND: timedelta(minutes=1)}))
+        entity = self.create_irods_entity(NAMES[0], self.access_controls)
+        self.assertEqual(mapper.get_all(entity.path), set(self.access_controls))
+        self.mapper.revoke_all(entity.path)
+        self.assertEqual(mapper.get_all(entity.path), set(self.access_controls))
+
+    def test_modification_invalidates_cache(self):
+        mapper = self.create_mapper(TimedLruCache({ACCESS_CONTROLS_CACHE_KIND: timedelta(minutes=1)}))
+        entity = self.create_irods_entity(NAMES[0], self.access_controls)
+        mapper.get_all(entity.path)
+        mapper.add_or_replace(entity.path, self.access_control)
+        self.assertEqual(mapper.get_all(entity.path), set(self.access_controls + [self.access_control]))
+        mapper.revoke_all(entity.path)
+        self.assertEqual(mapper.get_all(entity.path), set())
+
 
 class TestBatonDataObjectAccessControlMapper(_TestBatonAccessControlMapper):
     """
     Tests for `BatonDataObjectAccessControlMapper`.
     """
-    def create_mapper(self) -> BatonDataObjectAccessControlMapper:
-        return BatonDataObjectAccessControlMapper(self.test_with_baton.baton_location)
+    def create_mapper(self, cache: TimedLruCache=None) -> BatonDataObjectAccessControlMapper:
+        return BatonDataObjectAccessControlMapper(self.test_with_baton.baton_location, cache=cache)
 
     def create_irods_entity(self, name: str, access_controls: Iterable[AccessControl]) -> DataObject:
         return create_data_object(self.test_with_baton, name, access_controls=access_controls)
@@ -197,8 +229,8 @@ class TestBatonCollectionAccessControlMapper(_TestBatonAccessControlMapper):
         self.access_controls.append(AccessControl(default_user, AccessControl.Level.OWN))
         self.entities, self.root_collection = self._create_entity_tree_in_container(_TEST_ENTITY_TREE)
 
-    def create_mapper(self) -> BatonCollectionAccessControlMapper:
-        return BatonCollectionAccessControlMapper(self.test_with_baton.baton_location)
+    def create_mapper(self, cache: TimedLruCache=None) -> BatonCollectionAccessControlMapper:
+        return BatonCollectionAccessControlMapper(self.test_with_baton.baton_location, cache=cache)
 
     def create_irods_entity(self, name: str, access_controls: Iterable[AccessControl]) -> Collection:
         return create_collection(self.test_with_baton, name, access_controls=access_controls)
@@ -1,12 +1,14 @@
 import unittest
 from abc import ABCMeta, abstractmethod
 from copy import deepcopy
+from datetime import timedelta
 
+from baton._baton._cache import TimedLruCache, METADATA_QUERY_CACHE_KIND
 from baton._baton.baton_entity_mappers import _BatonIrodsEntityMapper, BatonDataObjectMapper, BatonCollectionMapper
 from baton._baton.baton_metadata_mappers import BatonDataObjectIrodsMetadataMapper, BatonCollectionIrodsMetadataMapper
 from baton.collections import IrodsMetadata
 from baton.mappers import AccessControlMapper
-from baton.models import SearchCriterion, IrodsEntity, Collection, DataObject
+from baton.models import SearchCriterion, IrodsEntity, Collection, DataObject, CacheStatistics, AnyOf, In, Between
 from baton.tests._baton._helpers import combine_metadata, synchronise_timestamps, create_data_object, \
     create_collection, NAMES, ATTRIBUTES, VALUES, UNUSED_VALUE
 from baton.tests._baton._settings import BATON_SETUP
@@ -34,9 +36,10 @@ class _TestBatonIrodsEntityMapper(unittest.TestCase, metaclass=ABCMeta):
         self.test_with_baton.tear_down()
 
     @abstractmethod
-    def create_mapper(self) -> _BatonIrodsEntityMapper:
+    def create_mapper(self, **kwargs) -> _BatonIrodsEntityMapper:
         """
         Creates a mapper to test with.
+        :param kwargs: named arguments to create the mapper with
         :return: the created mapper
         """
 
@@ -99,6 +102,77 @@ class _TestBatonIrodsEntityMapper(unittest.TestCase, metaclass=ABCMeta):
         irods_entity_1.metadata = None
         self.assertEqual(retrieved_entities[0], irods_entity_1)
 
+    def test_get_by_metadata_with_any_of(self):
+        irods_entity_1 = self.create_irods_entity(NAMES[0], self.metadata_1)
+        irods_entity_2 = self.create_irods_entity(NAMES[1], self.metadata_2)
+        self.create_irods_entity(NAMES[2], IrodsMetadata())
+
+        retrieved_entities = self.create_mapper().get_by_metadata(
+            AnyOf(self.search_criterion_1, SearchCriterion(ATTRIBUTES[1], VALUES[1])))
+        self.assertEqual(sorted(retrieved_entities, key=lambda entity: entity.path), [irods_entity_1, irods_entity_2])
+
+    def test_get_by_metadata_with_many_criteria_on_same_attribute(self):
+        irods_entity_1 = self.create_irods_entity(NAMES[0], self.metadata_1)
+        self.create_irods_entity(NAMES[1], IrodsMetadata({ATTRIBUTES[0]: {VALUES[0]}}))
+
+        search_criteria = [self.search_criterion_1, SearchCriterion(ATTRIBUTES[0], "something_else")]
+        self.assertEqual(self.create_mapper().get_by_metadata(search_criteria), [irods_entity_1])
+
+    def test_get_by_metadata_with_in_and_between(self):
+        irods_entity_1 = self.create_irods_entity(NAMES[0], IrodsMetadata({ATTRIBUTES[0]: {"1"}}))
+        irods_entity_2 = self.create_irods_entity(NAMES[1], IrodsMetadata({ATTRIBUTES[0]: {"2"}}))
+        self.create_irods_entity(NAMES[2], IrodsMetadata({ATTRIBUTES[0]: {"3"}}))
+
+        mapper = self.create_mapper()
+        self.assertEqual(mapper.get_by_metadata(In(ATTRIBUTES[0], ["2", UNUSED_VALUE])), [irods_entity_2])
+        self.assertEqual(sorted(mapper.get_by_metadata(Between(ATTRIBUTES[0], "1", "2")),
+                                key=lambda entity: entity.path), [irods_entity_1, irods_entity_2])
+
+    def test_get_by_metadata_filtered_locally_when_metadata_not_required(self):
+        irods_entity_1 = self.create_irods_entity(NAMES[0], self.metadata_1)
+
+        search_criteria = [self.search_criterion_1, SearchCriterion(ATTRIBUTES[0], "something_else")]
+        retrieved_entities = self.create_mapper().get_by_metadata(search_criteria, load_metadata=False)
+        irods_entity_1.metadata = None
+        self.assertEqual(retrieved_entities, [irods_entity_1])
+
+    def test_get_by_metadata_with_cache(self):
+        cache = TimedLruCache({METADATA_QUERY_CACHE_KIND: timedelta(minutes=1)})
+        mapper = self.create_mapper(cache=cache)
+        irods_entity_1 = self.create_irods_entity(NAMES[0], self.metadata_1_2)
+        self.assertEqual(mapper.get_by_metadata([self.search_criterion_1, self.search_criterion_2]), [irods_entity_1])
+
+        self.create_irods_entity(NAMES[1], self.metadata_1_2)
+        # Same query with criteria in a different order should be answered from the cache
+        self.assertEqual(mapper.get_by_metadata([self.search_criterion_2, self.search_criterion_1]), [irods_entity_1])
+        self.assertEqual(cache.get_statistics()[METADATA_QUERY_CACHE_KIND], CacheStatistics(1, 1, 1))
+
+        mapper.metadata.add(irods_entity_1.path, IrodsMetadata({"other": {"value"}}))
+        self.assertEqual(len(mapper.get_by_metadata([self.search_criterion_1, self.search_criterion_2])), 2)
+
+    def test_get_by_metadata_query_key_is_canonical(self):
+        mapper = self.create_mapper()
+        key = mapper._create_get_by_metadata_query_key([self.search_criterion_1, self.search_criterion_2], True, None)
+        self.assertEqual(
+            mapper._create_get_by_metadata_query_key([self.search_criterion_2, self.search_criterion_1], True, None),
+            key)
+        self.assertNotEqual(
+            mapper._create_get_by_metadata_query_key([self.search_criterion_1, self.search_criterion_2], False, None),
+            key)
+        self.assertNotEqual(mapper._create_get_by_metadata_query_key(self.search_criterion_1, True, None), key)
+        self.assertNotEqual(mapper._create_get_by_metadata_query_key(
+            [self.search_criterion_1, self.search_criterion_2], True, None, [IrodsEntity.Property.METADATA]), key)
+
+    def test_get_by_metadata_with_load_properties(self):
+        irods_entity_1 = self.create_irods_entity(NAMES[0], self.metadata_1)
+
+        retrieved_entities = self.create_mapper().get_by_metadata(
+            self.search_criterion_1, load_properties=[IrodsEntity.Property.METADATA])
+        self.assertEqual(len(retrieved_entities), 1)
+        self.assertEqual(retrieved_entities[0].path, irods_entity_1.path)
+        self.assertEqual(retrieved_entities[0].metadata, irods_entity_1.metadata)
+        self.assertIsNone(retrieved_entities[0].access_controls)
+
     @unittest.skip("Unable to setup a new zone in iRODS")
     def test_get_by_metadata_when_zone_restricted(self):
         new_zone = "newZone"
@@ -138,6 +212,23 @@ class _TestBatonIrodsEntityMapper(unittest.TestCase, metaclass=ABCMeta):
         retrieved_entities = self.create_mapper().get_by_path(paths)
         self.assertEqual(retrieved_entities, irods_entities)
 
+    def test_get_by_path_with_multiple_entities_in_chunks(self):
+        irods_entities = [
+            self.create_irods_entity(NAMES[i], self.metadata_1) for i in range(len(NAMES))]
+        paths = [irods_entity.path for irods_entity in irods_entities]
+
+        retrieved_entities = self.create_mapper(chunk_size=1).get_by_path(paths)
+        self.assertEqual(retrieved_entities, irods_entities)
+
+    def test_get_by_path_with_lazy_decoding(self):
+        irods_entities = [
+            self.create_irods_entity(NAMES[i], self.metadata_1) for i in range(len(NAMES))]
+        paths = [irods_entity.path for irods_entity in irods_entities]
+
+        retrieved_entities = self.create_mapper(lazy_decoding=True).get_by_path(paths)
+        self.assertEqual([irods_entity.metadata for irods_entity in retrieved_entities], [self.metadata_1] * len(NAMES))
+        self.assertEqual(retrieved_entities, irods_entities)
+
     def test_get_by_path_with_multiple_files_when_some_do_not_exist(self):
         irods_entities = [
             self.create_irods_entity(NAMES[i], self.metadata_1) for i in range(len(NAMES))]
@@ -146,6 +237,16 @@ class _TestBatonIrodsEntityMapper(unittest.TestCase, metaclass=ABCMeta):
         self.assertRaises(
             FileNotFoundError, self.create_mapper().get_by_path, paths + ["/invalid/name"])
 
+    def test_get_by_path_with_partial_results(self):
+        irods_entities = [self.create_irods_entity(NAMES[i], self.metadata_1) for i in range(2)]
+        paths = [irods_entities[0].path, "/invalid/name", irods_entities[1].path]
+
+        batch_result = self.create_mapper().get_by_path(paths, partial_results=True)
+        self.assertEqual(list(batch_result.successes.values()), irods_entities)
+        self.assertEqual(list(batch_result.successes.keys()), [paths[0], paths[2]])
+        self.assertEqual(list(batch_result.errors.keys()), ["/invalid/name"])
+        self.assertIsInstance(batch_result.errors["/invalid/name"], FileNotFoundError)
+
     def test_get_by_path_when_metadata_not_required(self):
         irods_entity_1 = self.create_irods_entity(NAMES[0], self.metadata_1)
 
@@ -155,6 +256,60 @@ class _TestBatonIrodsEntityMapper(unittest.TestCase, metaclass=ABCMeta):
         irods_entity_1.metadata = None
         self.assertEqual(retrieved_entity, irods_entity_1)
 
+    def test_get_by_path_when_collection_listed(self):
+        irods_entity_1 = self.create_irods_entity(NAMES[0], self.metadata_1)
+        irods_entity_2 = self.create_irods_entity(NAMES[1], self.metadata_2)
+        missing_path = "%s/missing" % irods_entity_1.get_collection_path()
+        paths = [irods_entity_2.path, missing_path, irods_entity_1.path, irods_entity_2.path]
+        mapper = self.create_mapper()
+        mapper.min_paths_to_list_collection = 2
+        mapper.min_coverage_to_list_collection = 0.0
+
+        batch_result = mapper.get_by_path(paths, partial_results=True)
+        self.assertEqual(batch_result.successes, {irods_entity_2.path: irods_entity_2,
+                                                  irods_entity_1.path: irods_entity_1})
+        self.assertIsInstance(batch_result.errors[missing_path], FileNotFoundError)
+        self.assertEqual(mapper.get_by_path(paths[2:]), [irods_entity_1, irods_entity_2])
+        self.assertRaises(FileNotFoundError, mapper.get_by_path, paths)
+
+    def test_get_by_path_with_load_properties(self):
+        irods_entity_1 = self.create_irods_entity(NAMES[0], self.metadata_1)
+
+        retrieved_entity = self.create_mapper().get_by_path(
+            irods_entity_1.path, load_properties=[IrodsEntity.Property.ACCESS_CONTROLS])
+
+        self.assertIsNone(retrieved_entity.metadata)
+        self.assertEqual(retrieved_entity.access_controls, irods_entity_1.access_controls)
+
+    def test_get_by_path_with_no_properties(self):
+        irods_entity_1 = self.create_irods_entity(NAMES[0], self.metadata_1)
+
+        retrieved_entity = self.create_mapper().get_by_path(irods_entity_1.path, load_properties=[])
+
+        self.assertEqual(retrieved_entity.path, irods_entity_1.path)
+        self.assertIsNone(retrieved_entity.metadata)
+        self.assertIsNone(retrieved_entity.access_controls)
+
+    def test_exists(self):
+        irods_entity_1 = self.create_irods_entity(NAMES[0], self.metadata_1)
+        mapper = self.create_mapper()
+
+        self.assertTrue(mapper.exists(irods_entity_1.path))
+        self.assertEqual(list(mapper.exists(iter([irods_entity_1.path, "/invalid/name", irods_entity_1.path]))),
+                         [True, False, True])
+
+    def test_stat(self):
+        irods_entity_1 = self.create_irods_entity(NAMES[0], self.metadata_1)
+        mapper = self.create_mapper()
+
+        self.assertEqual(mapper.stat(irods_entity_1.path).path, irods_entity_1.path)
+        batch_result = mapper.stat([irods_entity_1.path, "/invalid/name"])
+        self.assertEqual(list(batch_result.successes.keys()), [irods_entity_1.path])
+        self.assertIsInstance(batch_result.errors["/invalid/name"], FileNotFoundError)
+
+    def test_stat_when_entity_does_not_exist(self):
+        self.assertRaises(FileNotFoundError, self.create_mapper().stat, "/invalid/name")
+
     def test_get_all_in_collection_when_collection_does_not_exist(self):
         self.assertRaises(FileNotFoundError, self.create_mapper().get_all_in_collection, "/invalid")
 
@@ -211,6 +366,15 @@ class _TestBatonIrodsEntityMapper(unittest.TestCase, metaclass=ABCMeta):
         entity.metadata = None
         self.assertEqual(retrieved_entities[0], entity)
 
+    def test_get_all_in_collection_with_load_properties(self):
+        entity = self.create_irods_entity(NAMES[0], self.metadata_1)
+
+        retrieved_entities = self.create_mapper().get_all_in_collection(
+            entity.get_collection_path(), load_properties=[IrodsEntity.Property.METADATA])
+
+        self.assertEqual(retrieved_entities[0].metadata, entity.metadata)
+        self.assertIsNone(retrieved_entities[0].access_controls)
+
     def test_get_all_in_collection_when_collection_contains_data_objects_and_collections(self):
         data_object = create_data_object(self.test_with_baton, NAMES[0], self.metadata_1)
         create_collection(self.test_with_baton, NAMES[1], self.metadata_2)
@@ -220,6 +384,60 @@ class _TestBatonIrodsEntityMapper(unittest.TestCase, metaclass=ABCMeta):
         self.assertEqual(len(retrieved_entities), 1)
         self.assertIsInstance(retrieved_entities[0], type(self.create_irods_entity(NAMES[2])))
 
+    def test_iter_by_metadata(self):
+        irods_entity_1 = self.create_irods_entity(NAMES[0], self.metadata_1_2)
+        irods_entity_2 = self.create_irods_entity(NAMES[1], self.metadata_1)
+        self.create_irods_entity(NAMES[2], IrodsMetadata())
+
+        retrieved_entities = self.create_mapper().iter_by_metadata(self.search_criterion_1)
+        self.assertNotIsInstance(retrieved_entities, list)
+        self.assertEqual(list(retrieved_entities), [irods_entity_1, irods_entity_2])
+
+    def test_iter_by_metadata_with_any_of(self):
+        irods_entity_1 = self.create_irods_entity(NAMES[0], self.metadata_1_2)
+        irods_entity_2 = self.create_irods_entity(NAMES[1], self.metadata_2)
+        self.create_irods_entity(NAMES[2], IrodsMetadata())
+
+        retrieved_entities = self.create_mapper().iter_by_metadata(
+            AnyOf(self.search_criterion_1, SearchCriterion(ATTRIBUTES[1], VALUES[1])))
+        self.assertEqual(sorted(retrieved_entities, key=lambda entity: entity.path), [irods_entity_1, irods_entity_2])
+
+    def test_iter_by_metadata_with_many_criteria_on_same_attribute(self):
+        irods_entity_1 = self.create_irods_entity(NAMES[0], self.metadata_1)
+        self.create_irods_entity(NAMES[1], IrodsMetadata({ATTRIBUTES[0]: {VALUES[0]}}))
+
+        search_criteria = [self.search_criterion_1, SearchCriterion(ATTRIBUTES[0], "something_else")]
+        retrieved_entities = self.create_mapper().iter_by_metadata(search_criteria, load_metadata=False)
+        irods_entity_1.metadata = None
+        self.assertEqual(list(retrieved_entities), [irods_entity_1])
+
+    def test_iter_by_path(self):
+        irods_entities = [self.create_irods_entity(NAMES[i], self.metadata_1) for i in range(len(NAMES))]
+        paths = [irods_entity.path for irods_entity in irods_entities]
+
+        retrieved_entities = self.create_mapper().iter_by_path(paths)
+        self.assertEqual(list(retrieved_entities), irods_entities)
+
+    def test_iter_by_path_with_generator(self):
+        irods_entities = [self.create_irods_entity(NAMES[i], self.metadata_1) for i in range(len(NAMES))]
+
+        retrieved_entities = self.create_mapper().iter_by_path(irods_entity.path for irods_entity in irods_entities)
+        self.assertEqual(list(retrieved_entities), irods_entities)
+
+    def test_iter_by_path_when_entity_does_not_exist(self):
+        irods_entity_1 = self.create_irods_entity(NAMES[0], self.metadata_1)
+
+        retrieved_entities = self.create_mapper().iter_by_path([irods_entity_1.path, "/invalid/name"])
+        self.assertEqual(next(retrieved_entities), irods_entity_1)
+        self.assertRaises(FileNotFoundError, next, retrieved_entities)
+
+    def test_iter_all_in_collection(self):
+        entity_1 = self.create_irods_entity(NAMES[0], self.metadata_1)
+        entity_2 = self.create_irods_entity(NAMES[1], self.metadata_2)
+
+        retrieved_entities = self.create_mapper().iter_all_in_collection(entity_1.get_collection_path())
+        self.assertEqual(list(retrieved_entities), [entity_1, entity_2])
+
     def test_access_control_property(self):
         self.assertIsInstance(self.create_mapper().access_control, AccessControlMapper)
 
@@ -228,8 +446,8 @@ class TestBatonDataObjectMapper(_TestBatonIrodsEntityMapper):
     """
     Tests for `BatonDataObjectMapper`.
     """
-    def create_mapper(self) -> BatonDataObjectMapper:
-        return BatonDataObjectMapper(self.test_with_baton.baton_location)
+    def create_mapper(self, **kwargs) -> BatonDataObjectMapper:
+        return BatonDataObjectMapper(self.test_with_baton.baton_location, **kwargs)
 
     def create_irods_entity(self, name: str, metadata: IrodsMetadata=IrodsMetadata()) -> DataObject:
         return create_data_object(self.test_with_baton, name, metadata)
@@ -249,8 +467,8 @@ class TestBatonCollectionMapper(_TestBatonIrodsEntityMapper):
     """
     Tests for `BatonCollectionMapper`.
     """
-    def create_mapper(self) -> BatonCollectionMapper:
-        return BatonCollectionMapper(self.test_with_baton.baton_location)
+    def create_mapper(self, **kwargs) -> BatonCollectionMapper:
+        return BatonCollectionMapper(self.test_with_baton.baton_location, **kwargs)
 
     def create_irods_entity(self, name: str, metadata: IrodsMetadata=IrodsMetadata()) -> Collection:
         return create_collection(self.test_with_baton, name, metadata)
@@ -265,6 +483,19 @@ class TestBatonCollectionMapper(_TestBatonIrodsEntityMapper):
     def test_metadata_property(self):
         self.assertIsInstance(self.create_mapper().metadata, BatonCollectionIrodsMetadataMapper)
 
+    def test_walk(self):
+        collection = self.create_irods_entity(NAMES[0], self.metadata_1)
+        data_object = create_data_object(self.test_with_baton, NAMES[1])
+        root_path = collection.get_collection_path()
+
+        walked = [(walked_collection.path, [subcollection.path for subcollection in subcollections],
+                   [walked_data_object.path for walked_data_object in data_objects])
+                  for walked_collection, subcollections, data_objects in self.create_mapper().walk(root_path)]
+        self.assertEqual(walked, [(root_path, [collection.path], [data_object.path]), (collection.path, [], [])])
+
+    def test_walk_when_collection_does_not_exist(self):
+        self.assertRaises(FileNotFoundError, list, self.create_mapper().walk("/%s" % UNUSED_VALUE))
+
 
 # Trick required to stop Python's unittest from running the abstract base classes as tests
 del _TestBatonIrodsEntityMapper
@@ -1,8 +1,12 @@
 import unittest
 from abc import abstractmethod
 from copy import deepcopy
+from datetime import timedelta
 from typing import List
+from unittest.mock import patch, call
 
+from baton._baton._cache import TimedLruCache, METADATA_CACHE_KIND
+from baton._baton._constants import BATON_METAMOD_OPERATION_ADD, BATON_METAMOD_OPERATION_REMOVE
 from baton._baton.baton_metadata_mappers import BatonDataObjectIrodsMetadataMapper, \
     BatonCollectionIrodsMetadataMapper, _BatonIrodsMetadataMapper
 from baton.collections import IrodsMetadata
@@ -19,9 +23,10 @@ class _TestBatonIrodsEntityMetadataMapper(unittest.TestCase):
     Tests for `_BatonIrodsMetadataMapper`.
     """
     @abstractmethod
-    def create_mapper(self) -> _BatonIrodsMetadataMapper:
+    def create_mapper(self, cache: TimedLruCache=None) -> _BatonIrodsMetadataMapper:
         """
         Creates a mapper to test with.
+        :param cache: the cache that the mapper should use
         :return: the created mapper
         """
 
@@ -84,6 +89,13 @@ class _TestBatonIrodsEntityMetadataMapper(unittest.TestCase):
         paths = [entity.path for entity in entities]
         self.assertEqual(self.mapper.get_all(paths), [entity.metadata for entity in entities])
 
+    def test_get_all_with_partial_results(self):
+        entity = self.create_irods_entity(NAMES[0], self.metadata)
+        batch_result = self.mapper.get_all([entity.path, "/invalid"], partial_results=True)
+        self.assertEqual(batch_result.successes, {entity.path: self.metadata})
+        self.assertEqual(list(batch_result.errors.keys()), ["/invalid"])
+        self.assertIsInstance(batch_result.errors["/invalid"], FileNotFoundError)
+
     def test_add_with_single_path_that_is_invalid(self):
         self.assertRaises(FileNotFoundError, self.mapper.add, "/invalid", self.metadata)
 
@@ -169,6 +181,23 @@ class _TestBatonIrodsEntityMetadataMapper(unittest.TestCase):
         self.assertEqual(self.mapper.get_all(entity_1.path), self.metadata)
         self.assertEqual(self.mapper.get_all(entity_2.path), self.metadata)
 
+    def test_set_when_metadata_unchanged(self):
+        entity = self.create_irods_entity(NAMES[0], self.metadata)
+        with patch.object(self.mapper, "_modify", wraps=self.mapper._modify) as modify:
+            self.mapper.set(entity.path, IrodsMetadata({"key_1": {"value_1", "value_2"}}))
+        modify.assert_not_called()
+        self.assertEqual(self.mapper.get_all(entity.path), self.metadata)
+
+    def test_set_only_changes_values_that_differ(self):
+        entity = self.create_irods_entity(NAMES[0], self.metadata)
+        with patch.object(self.mapper, "_modify", wraps=self.mapper._modify) as modify:
+            self.mapper.set(entity.path, IrodsMetadata({"key_1": {"value_2", "value_4"}}))
+        self.assertEqual(modify.call_args_list, [
+            call([entity.path], [IrodsMetadata({"key_1": {"value_1"}})], BATON_METAMOD_OPERATION_REMOVE),
+            call([entity.path], [IrodsMetadata({"key_1": {"value_4"}})], BATON_METAMOD_OPERATION_ADD)])
+        self.assertEqual(self.mapper.get_all(entity.path),
+                         IrodsMetadata({"key_1": {"value_2", "value_4"}, "key_2": {"value_3"}}))
+
     def test_remove_with_no_paths(self):
         self.mapper.remove([], self.metadata)
 
@@ -237,13 +266,29 @@ class _TestBatonIrodsEntityMetadataMapper(unittest.TestCase):
         self.mapper.remove_all(paths)
         self.assertEqual(self.mapper.get_all(paths), [IrodsMetadata() for _ in range(len(entities))])
 
+    def test_get_all_with_cache(self):
+        mapper = self.create_mapper(TimedLruCache({METADATA_CACHE_KIND: timedelta(minutes=1)}))
+        entity = self.create_irods_entity(NAMES[0], self.metadata)
+        mapper.get_all(entity.path).add("key_3", "value_4")
+        self.mapper.remove_all(entity.path)
+        self.assertEqual(mapper.get_all(entity.path), self.metadata)
+
+    def test_modification_invalidates_cache(self):
+        mapper = self.create_mapper(TimedLruCache({METADATA_CACHE_KIND: timedelta(minutes=1)}))
+        entity = self.create_irods_entity(NAMES[0], self.metadata)
+        mapper.get_all(entity.path)
+        mapper.set(entity.path, IrodsMetadata({"key_1": {"value_4"}}))
+        self.assertEqual(mapper.get_all(entity.path), IrodsMetadata({"key_1": {"value_4"}, "key_2": {"value_3"}}))
+        mapper.remove_all(entity.path)
+        self.assertEqual(mapper.get_all(entity.path), IrodsMetadata())
+
 
 class TestBatonDataObjectMapper(_TestBatonIrodsEntityMetadataMapper):
     """
     Tests for `BatonDataObjectIrodsMetadataMapper`.
     """
-    def create_mapper(self) -> BatonDataObjectIrodsMetadataMapper:
-        return BatonDataObjectIrodsMetadataMapper(self.test_with_baton.baton_location)
+    def create_mapper(self, cache: TimedLruCache=None) -> BatonDataObjectIrodsMetadataMapper:
+        return BatonDataObjectIrodsMetadataMapper(self.test_with_baton.baton_location, cache=cache)
 
     def create_irods_entity(self, name: str, metadata: IrodsMetadata=IrodsMetadata()) -> DataObject:
         return create_data_object(self.test_with_baton, name, metadata)
@@ -253,8 +298,8 @@ class TestBatonCollectionMapper(_TestBatonIrodsEntityMetadataMapper):
     """
     Tests for `BatonCollectionIrodsMetadataMapper`.
     """
-    def create_mapper(self) -> BatonCollectionIrodsMetadataMapper:
-        return BatonCollectionIrodsMetadataMapper(self.test_with_baton.baton_location)
+    def create_mapper(self, cache: TimedLruCache=None) -> BatonCollectionIrodsMetadataMapper:
+        return BatonCollectionIrodsMetadataMapper(self.test_with_baton.baton_location, cache=cache)
 
     def create_irods_entity(self, name: str, metadata: IrodsMetadata=IrodsMetadata()) -> Collection:
         return create_collection(self.test_with_baton, name, metadata)
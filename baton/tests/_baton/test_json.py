@@ -1,14 +1,25 @@
 import json
+import pickle
 import unittest
+from copy import deepcopy, copy
+from datetime import datetime
 
+from dateutil.parser import parser
 from frozendict import frozendict
 
+import baton._baton.json
+
 from baton._baton._constants import BATON_AVU_PROPERTY, BATON_ACL_PROPERTY, BATON_REPLICA_PROPERTY, \
     BATON_TIMESTAMP_PROPERTY
 from baton._baton.json import DataObjectReplicaJSONEncoder, AccessControlJSONEncoder, DataObjectJSONEncoder, \
     IrodsMetadataJSONEncoder, AccessControlJSONDecoder, DataObjectReplicaJSONDecoder, IrodsMetadataJSONDecoder, \
     DataObjectJSONDecoder, DataObjectReplicaCollectionJSONEncoder, DataObjectReplicaCollectionJSONDecoder, \
-    CollectionJSONEncoder, CollectionJSONDecoder
+    CollectionJSONEncoder, CollectionJSONDecoder, AccessControlSetJSONDecoder, data_object_from_baton_json, \
+    collection_from_baton_json, access_controls_from_baton_json, irods_metadata_from_baton_json, \
+    replicas_from_baton_json, parse_timestamp, irods_entity_columns_from_baton_json, \
+    irods_entity_stat_from_baton_json, set_timestamp_cache_size, _TIMESTAMP_CACHE_SIZE
+from baton.collections import IrodsEntityColumns
+from baton.models import IrodsEntityStat, AccessControl
 from baton.tests._baton._json_helpers import create_collection_with_baton_json_representation, \
     create_data_object_with_baton_json_representation
 
@@ -318,5 +329,231 @@ class TestCollectionJSONDecoder(unittest.TestCase):
         self.assertEqual(decoded, self.collection)
 
 
+class TestParseTimestamp(unittest.TestCase):
+    """
+    Tests for `parse_timestamp`.
+    """
+    def test_parse_baton_format(self):
+        self.assertEqual(parse_timestamp("2016-02-09T15:22:52"), parser().parse("2016-02-09T15:22:52"))
+
+    def test_parse_baton_format_in_utc(self):
+        parsed = parse_timestamp("2016-02-09T15:22:52Z")
+        self.assertEqual(parsed, parser().parse("2016-02-09T15:22:52Z"))
+        self.assertEqual(parsed.utcoffset(), parser().parse("2016-02-09T15:22:52Z").utcoffset())
+
+    def test_parse_other_format(self):
+        for timestamp in ("2016-02-09T15:22:52.123456", "2016-02-09T15:22:52+01:00", "9 February 2016 15:22"):
+            self.assertEqual(parse_timestamp(timestamp), parser().parse(timestamp))
+
+    def test_parse_invalid(self):
+        self.assertRaises(ValueError, parse_timestamp, "2016-13-09T15:22:52")
+        self.assertRaises(ValueError, parse_timestamp, "not a timestamp")
+
+
+class TestSetTimestampCacheSize(unittest.TestCase):
+    """
+    Tests for `set_timestamp_cache_size`.
+    """
+    def tearDown(self):
+        set_timestamp_cache_size(_TIMESTAMP_CACHE_SIZE)
+
+    def test_cached(self):
+        set_timestamp_cache_size(1)
+        self.assertIs(baton._baton.json._parse_timestamp_cached("2016-02-09T15:22:52"),
+                      baton._baton.json._parse_timestamp_cached("2016-02-09T15:22:52"))
+
+    def test_not_cached(self):
+        set_timestamp_cache_size(0)
+        self.assertIsNot(baton._baton.json._parse_timestamp_cached("2016-02-09T15:22:52"),
+                         baton._baton.json._parse_timestamp_cached("2016-02-09T15:22:52"))
+
+    def test_negative_size(self):
+        self.assertRaises(ValueError, set_timestamp_cache_size, -1)
+
+
+class TestFastPathDecoders(unittest.TestCase):
+    """
+    Tests that the fast path decoders (e.g. `data_object_from_baton_json`) are equivalent to the mapping decoders.
+    """
+    _DATA_OBJECT_AS_JSON = {
+        "collection": "/zone/collection",
+        "data_object": "data_object_name",
+        "access": [
+            {"owner": "user_1", "zone": "zone", "level": "own"},
+            {"owner": "user_2", "zone": "other_zone", "level": "read"},
+            {"owner": "group_1", "zone": "zone", "level": "write"},
+            {"owner": "user_3", "zone": "zone", "level": "null"}
+        ],
+        "avus": [
+            {"attribute": "attribute_a", "value": "value_1"},
+            {"attribute": "attribute_a", "value": "value_2"},
+            {"attribute": "attribute_b", "value": "value_3"}
+        ],
+        "replicates": [
+            {"number": 0, "checksum": "abc", "location": "host_1", "resource": "resource_1", "valid": True},
+            {"number": 1, "checksum": "abc", "valid": False}
+        ],
+        "timestamps": [
+            {"created": "2016-02-09T15:22:52", "replicates": 0},
+            {"modified": "2016-02-09T15:22:52", "replicates": 0},
+            {"created": "2016-02-10T09:01:02", "replicates": 1},
+            {"modified": "2016-02-11T10:11:12", "replicates": 1}
+        ]
+    }
+
+    def setUp(self):
+        self.data_object_as_json = deepcopy(TestFastPathDecoders._DATA_OBJECT_AS_JSON)
+        self.collection_as_json = deepcopy(TestFastPathDecoders._DATA_OBJECT_AS_JSON)
+        for key in ("data_object", "replicates", "timestamps"):
+            del self.collection_as_json[key]
+
+    def test_access_controls_from_baton_json(self):
+        access_controls_as_json = self.data_object_as_json[BATON_ACL_PROPERTY]
+        self.assertEqual(access_controls_from_baton_json(access_controls_as_json),
+                         AccessControlSetJSONDecoder().decode_parsed(access_controls_as_json))
+
+    def test_irods_metadata_from_baton_json(self):
+        avus_as_json = self.data_object_as_json[BATON_AVU_PROPERTY]
+        self.assertEqual(irods_metadata_from_baton_json(avus_as_json),
+                         IrodsMetadataJSONDecoder().decode_parsed(avus_as_json))
+
+    def test_replicas_from_baton_json(self):
+        replicas_as_json = self.data_object_as_json[BATON_REPLICA_PROPERTY]
+        self.assertEqual(replicas_from_baton_json(replicas_as_json),
+                         DataObjectReplicaCollectionJSONDecoder().decode_parsed(replicas_as_json))
+
+    def test_access_controls_are_interned(self):
+        access_controls_1 = access_controls_from_baton_json(self.data_object_as_json[BATON_ACL_PROPERTY])
+        access_controls_2 = AccessControlSetJSONDecoder().decode_parsed(
+            deepcopy(self.data_object_as_json[BATON_ACL_PROPERTY]))
+        self.assertEqual(access_controls_1, access_controls_2)
+        self.assertEqual({id(access_control) for access_control in access_controls_1},
+                         {id(access_control) for access_control in access_controls_2})
+
+    def test_users_are_interned(self):
+        access_controls_as_json = self.data_object_as_json[BATON_ACL_PROPERTY]
+        for access_control_as_json in access_controls_as_json:
+            access_control_as_json["owner"] = "user_1"
+            access_control_as_json["zone"] = "zone"
+        access_controls = access_controls_from_baton_json(access_controls_as_json)
+        self.assertEqual(len({id(access_control.user) for access_control in access_controls}), 1)
+
+    def test_interned_access_controls_cannot_be_modified(self):
+        access_controls_as_json = self.data_object_as_json[BATON_ACL_PROPERTY]
+        access_control = list(access_controls_from_baton_json(access_controls_as_json))[0]
+        self.assertRaises(AttributeError, setattr, access_control, "level", AccessControl.Level.NONE)
+        self.assertRaises(AttributeError, setattr, access_control, "user", "other#zone")
+        self.assertRaises(AttributeError, setattr, access_control.user, "name", "other")
+        self.assertEqual(access_controls_from_baton_json(access_controls_as_json),
+                         AccessControlSetJSONDecoder().decode_parsed(deepcopy(access_controls_as_json)))
+
+    def test_copies_of_interned_access_controls_can_be_modified(self):
+        access_controls_as_json = self.data_object_as_json[BATON_ACL_PROPERTY]
+        access_control = list(access_controls_from_baton_json(access_controls_as_json))[0]
+        level, name = access_control.level, access_control.user.name
+        for access_control_copy in (copy(access_control), deepcopy(access_control),
+                                    pickle.loads(pickle.dumps(access_control))):
+            self.assertEqual(access_control_copy, access_control)
+            access_control_copy.level = AccessControl.Level.WRITE if level != AccessControl.Level.WRITE \
+                else AccessControl.Level.READ
+            access_control_copy.user.name = "other"
+        self.assertEqual(access_control.level, level)
+        self.assertEqual(access_control.user.name, name)
+
+    def test_metadata_attributes_are_interned(self):
+        avus_as_json = self.data_object_as_json[BATON_AVU_PROPERTY]
+        # Build attribute name at runtime so that it is not interned as a constant
+        for avu_as_json in avus_as_json:
+            avu_as_json["attribute"] = "".join(["attribute", "_a"])
+        metadata_1 = irods_metadata_from_baton_json(avus_as_json)
+        metadata_2 = IrodsMetadataJSONDecoder().decode_parsed(deepcopy(avus_as_json))
+        self.assertIs(list(metadata_1.keys())[0], list(metadata_2.keys())[0])
+
+    def test_data_object_from_baton_json(self):
+        self._assert_data_object_decodes_equivalently()
+
+    def test_data_object_from_baton_json_when_no_metadata(self):
+        del self.data_object_as_json[BATON_AVU_PROPERTY]
+        self._assert_data_object_decodes_equivalently()
+
+    def test_data_object_from_baton_json_when_no_access_controls(self):
+        del self.data_object_as_json[BATON_ACL_PROPERTY]
+        self._assert_data_object_decodes_equivalently()
+
+    def test_data_object_from_baton_json_when_no_replicas(self):
+        del self.data_object_as_json[BATON_REPLICA_PROPERTY]
+        self._assert_data_object_decodes_equivalently()
+
+    def test_data_object_from_baton_json_when_replicas_but_no_timestamp(self):
+        del self.data_object_as_json[BATON_TIMESTAMP_PROPERTY]
+        self._assert_data_object_decodes_equivalently()
+
+    def test_data_object_from_baton_json_when_empty_collections(self):
+        for key in (BATON_ACL_PROPERTY, BATON_AVU_PROPERTY, BATON_REPLICA_PROPERTY, BATON_TIMESTAMP_PROPERTY):
+            self.data_object_as_json[key] = []
+        self._assert_data_object_decodes_equivalently()
+
+    def test_collection_from_baton_json(self):
+        self._assert_collection_decodes_equivalently()
+
+    def test_collection_from_baton_json_when_no_metadata_or_access_controls(self):
+        del self.collection_as_json[BATON_AVU_PROPERTY]
+        del self.collection_as_json[BATON_ACL_PROPERTY]
+        self._assert_collection_decodes_equivalently()
+
+    def test_data_object_from_baton_json_when_lazy(self):
+        decoded = data_object_from_baton_json(self.data_object_as_json, lazy=True)
+        self.assertEqual(decoded.path, "/zone/collection/data_object_name")
+        self.assertIsNotNone(decoded._lazy_loader)
+        self.assertEqual(decoded, DataObjectJSONDecoder().decode_parsed(self.data_object_as_json))
+        self.assertEqual(DataObjectJSONDecoder().decode_parsed(self.data_object_as_json),
+                         data_object_from_baton_json(self.data_object_as_json, lazy=True))
+
+    def test_data_object_from_baton_json_when_lazy_and_no_replicas(self):
+        del self.data_object_as_json[BATON_REPLICA_PROPERTY]
+        decoded = data_object_from_baton_json(self.data_object_as_json, lazy=True)
+        self.assertIsNone(decoded.replicas)
+        self.assertEqual(decoded.metadata, IrodsMetadataJSONDecoder().decode_parsed(
+            self.data_object_as_json[BATON_AVU_PROPERTY]))
+
+    def test_data_object_from_baton_json_when_lazy_can_be_pickled(self):
+        decoded = data_object_from_baton_json(self.data_object_as_json, lazy=True)
+        self.assertEqual(pickle.loads(pickle.dumps(decoded)), data_object_from_baton_json(self.data_object_as_json))
+
+    def test_collection_from_baton_json_when_lazy(self):
+        decoded = collection_from_baton_json(self.collection_as_json, lazy=True)
+        self.assertIsNotNone(decoded._lazy_loader)
+        self.assertEqual(decoded, CollectionJSONDecoder().decode_parsed(self.collection_as_json))
+
+    def test_irods_entity_columns_from_baton_json(self):
+        columns = irods_entity_columns_from_baton_json(
+            [self.data_object_as_json, self.collection_as_json], metadata_attributes=["attribute_a"])
+        self.assertEqual(columns.path, ["/zone/collection/data_object_name", "/zone/collection"])
+        self.assertEqual(columns.checksum, ["abc", None])
+        self.assertEqual(columns.resource_names, [("resource_1", None), ()])
+        self.assertEqual(columns.created[0], IrodsEntityColumns._to_microseconds(datetime(2016, 2, 9, 15, 22, 52)))
+        self.assertEqual(columns.last_modified[0],
+                         IrodsEntityColumns._to_microseconds(datetime(2016, 2, 11, 10, 11, 12)))
+        self.assertEqual(columns.created[1], IrodsEntityColumns.NO_TIMESTAMP)
+        self.assertEqual(columns.metadata, {"attribute_a": [("value_1", "value_2"), ("value_1", "value_2")]})
+
+    def test_irods_entity_stat_from_baton_json(self):
+        self.data_object_as_json["size"] = 123
+        self.data_object_as_json["checksum"] = "abc"
+        self.assertEqual(irods_entity_stat_from_baton_json(self.data_object_as_json), IrodsEntityStat(
+            "/zone/collection/data_object_name", 123, "abc", datetime(2016, 2, 9, 15, 22, 52),
+            datetime(2016, 2, 11, 10, 11, 12)))
+        self.assertEqual(irods_entity_stat_from_baton_json(self.collection_as_json),
+                         IrodsEntityStat("/zone/collection"))
+
+    def _assert_data_object_decodes_equivalently(self):
+        self.assertEqual(data_object_from_baton_json(self.data_object_as_json),
+                         DataObjectJSONDecoder().decode_parsed(self.data_object_as_json))
+
+    def _assert_collection_decodes_equivalently(self):
+        self.assertEqual(collection_from_baton_json(self.collection_as_json),
+                         CollectionJSONDecoder().decode_parsed(self.collection_as_json))
+
+
 if __name__ == "__main__":
     unittest.main()
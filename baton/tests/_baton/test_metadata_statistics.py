@@ -0,0 +1,74 @@
+import unittest
+from unittest.mock import MagicMock
+
+from baton._baton.metadata_statistics import IrodsMetadataStatistics
+from baton.collections import IrodsMetadata
+from baton.models import DataObject, Collection, SearchCriterion, IrodsEntity
+from hgicommon.enums import ComparisonOperator
+
+
+class TestIrodsMetadataStatistics(unittest.TestCase):
+    """
+    Tests for `IrodsMetadataStatistics`.
+    """
+    def setUp(self):
+        self.statistics = IrodsMetadataStatistics([
+            DataObject("/collection/data_object_%d" % i, metadata=IrodsMetadata({"target": {"1"}, "sample": {str(i)}}))
+            for i in range(10)])
+
+    def test_add(self):
+        self.statistics.add([DataObject("/collection/other", metadata=IrodsMetadata({"target": {"0"}})),
+                             DataObject("/collection/not_loaded")])
+        self.assertEqual(self.statistics.number_of_entities, 11)
+        self.assertAlmostEqual(self.statistics.estimate_selectivity(SearchCriterion("target", "0")), 1 / 11)
+
+    def test_estimate_selectivity_without_statistics(self):
+        self.assertIsNone(IrodsMetadataStatistics().estimate_selectivity(SearchCriterion("target", "1")))
+
+    def test_estimate_selectivity_of_equality(self):
+        self.assertEqual(self.statistics.estimate_selectivity(SearchCriterion("target", "1")), 1.0)
+        self.assertEqual(self.statistics.estimate_selectivity(SearchCriterion("sample", "3")), 0.1)
+
+    def test_estimate_selectivity_of_unsampled_value(self):
+        self.assertEqual(self.statistics.estimate_selectivity(SearchCriterion("target", "0")), 1.0)
+        self.assertEqual(self.statistics.estimate_selectivity(SearchCriterion("sample", "100")), 0.1)
+
+    def test_estimate_selectivity_of_unsampled_attribute(self):
+        self.assertIsNone(self.statistics.estimate_selectivity(SearchCriterion("other", "1")))
+
+    def test_estimate_selectivity_of_range(self):
+        self.assertEqual(self.statistics.estimate_selectivity(
+            SearchCriterion("sample", "5", ComparisonOperator.LESS_THAN)), 0.5)
+        self.assertEqual(self.statistics.estimate_selectivity(
+            SearchCriterion("target", "1", ComparisonOperator.GREATER_THAN)), 0.0)
+
+    def test_estimate_selectivity_with_unsupported_operator(self):
+        self.assertRaises(ValueError, self.statistics.estimate_selectivity,
+                          SearchCriterion("target", "1", ComparisonOperator.CONTAINS))
+
+    def test_crawl(self):
+        connection = MagicMock()
+        connection.data_object.get_all_in_collection.side_effect = lambda paths, **kwargs: [
+            DataObject("%s/data_object_%d" % (paths[0], i), metadata=IrodsMetadata({"target": {"1"}}))
+            for i in range(2)]
+        connection.collection.get_all_in_collection.side_effect = lambda paths, **kwargs: [
+            Collection("%s/collection" % paths[0], metadata=IrodsMetadata())]
+
+        statistics = IrodsMetadataStatistics()
+        statistics.crawl(connection, "/collection", max_entities=5)
+        self.assertEqual(statistics.number_of_entities, 5)
+        self.assertEqual(connection.data_object.get_all_in_collection.call_count, 2)
+
+    def test_crawl_only_loads_metadata(self):
+        connection = MagicMock()
+        connection.data_object.get_all_in_collection.return_value = []
+        connection.collection.get_all_in_collection.return_value = []
+
+        IrodsMetadataStatistics().crawl(connection, "/collection")
+        for mapper in (connection.data_object, connection.collection):
+            mapper.get_all_in_collection.assert_called_once_with(
+                ["/collection"], load_properties=[IrodsEntity.Property.METADATA])
+
+
+if __name__ == "__main__":
+    unittest.main()
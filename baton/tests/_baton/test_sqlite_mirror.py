@@ -0,0 +1,147 @@
+import unittest
+from copy import deepcopy
+from datetime import datetime
+from typing import Dict, List, Type
+from unittest.mock import MagicMock
+
+from baton._baton.sqlite_mirror import SqliteMirror
+from baton.collections import IrodsMetadata
+from baton.models import IrodsEntity, DataObject, Collection, DataObjectReplica, AccessControl, User, \
+    SearchCriterion, MirrorChanges
+from hgicommon.enums import ComparisonOperator
+
+_USER = User("user", "zone")
+
+
+def _create_data_object(path: str, metadata: IrodsMetadata, last_modified: datetime=datetime(2016, 1, 1)) \
+        -> DataObject:
+    replicas = [DataObjectReplica(0, "checksum", "host", "resource", True, datetime(2016, 1, 1), last_modified),
+                DataObjectReplica(1, "checksum", None, "other_resource", False)]
+    return DataObject(path, [AccessControl(_USER, AccessControl.Level.OWN)], metadata, replicas)
+
+
+def _create_connection(entities: Dict[str, IrodsEntity]) -> MagicMock:
+    """
+    Creates a mock connection to iRODS, which contains the given entities.
+    :param entities: the entities in iRODS, keyed by path (changes are seen by the connection)
+    :return: the mock connection
+    """
+    def copy(entity: IrodsEntity, load_metadata: bool) -> IrodsEntity:
+        entity = deepcopy(entity)
+        if not load_metadata:
+            entity.metadata = None
+        return entity
+
+    def get_all_in_collection(entity_type: Type[IrodsEntity], collection_paths: List[str], load_metadata: bool=True):
+        return [copy(entity, load_metadata) for path, entity in sorted(entities.items())
+                if isinstance(entity, entity_type) and entity.get_collection_path() in collection_paths]
+
+    connection = MagicMock()
+    connection.collection.get_by_path.side_effect = lambda path, load_metadata=True: copy(entities[path], load_metadata)
+    connection.data_object.get_all_in_collection.side_effect = \
+        lambda paths, load_metadata=True: get_all_in_collection(DataObject, paths, load_metadata)
+    connection.collection.get_all_in_collection.side_effect = \
+        lambda paths, load_metadata=True: get_all_in_collection(Collection, paths, load_metadata)
+    connection.data_object.metadata.get_all.side_effect = lambda paths: [entities[path].metadata for path in paths]
+    connection.collection.metadata.get_all.side_effect = lambda paths: [entities[path].metadata for path in paths]
+    return connection
+
+
+class TestSqliteMirror(unittest.TestCase):
+    """
+    Tests for `SqliteMirror`.
+    """
+    def setUp(self):
+        self.entities = {}  # type: Dict[str, IrodsEntity]
+        for entity in [
+                Collection("/zone", [], IrodsMetadata()),
+                Collection("/zone/collection", [], IrodsMetadata({"type": {"collection"}})),
+                _create_data_object("/zone/collection/data_object_1", IrodsMetadata({"size": {"10"}, "type": {"a"}})),
+                _create_data_object("/zone/collection/data_object_2", IrodsMetadata({"size": {"20"}})),
+                _create_data_object("/zone/data_object_3", IrodsMetadata({"size": {"30"}})),
+                _create_data_object("/zone_other/data_object", IrodsMetadata({"size": {"10"}}))]:
+            self.entities[entity.path] = entity
+        self.connection = _create_connection(self.entities)
+        self.mirror = SqliteMirror(self.connection)
+        self.mirror.build("/zone/")
+
+    def tearDown(self):
+        self.mirror.close()
+
+    def test_get_mirrored_collection_paths(self):
+        self.assertEqual(self.mirror.get_mirrored_collection_paths(), ["/zone"])
+
+    def test_get_by_path(self):
+        self.assertEqual(self.mirror.get_by_path("/zone/collection/data_object_1"),
+                         self.entities["/zone/collection/data_object_1"])
+        self.assertEqual(self.mirror.get_by_path(["/zone/collection", "/zone"]),
+                         [self.entities["/zone/collection"], self.entities["/zone"]])
+
+    def test_get_by_path_when_metadata_not_loaded(self):
+        self.assertIsNone(self.mirror.get_by_path("/zone/data_object_3", load_metadata=False).metadata)
+
+    def test_get_by_path_when_not_mirrored(self):
+        self.assertRaises(FileNotFoundError, self.mirror.get_by_path, "/zone_other/data_object")
+
+    def test_get_all(self):
+        self.assertEqual(self.mirror.get_all(), [self.entities[path] for path in sorted(self.entities.keys())
+                                                 if path != "/zone_other/data_object"])
+        self.assertEqual([entity.path for entity in self.mirror.get_all(entity_type=Collection)],
+                         ["/zone", "/zone/collection"])
+
+    def test_get_by_metadata(self):
+        retrieved = self.mirror.get_by_metadata(SearchCriterion("size", "10", ComparisonOperator.EQUALS))
+        self.assertEqual(retrieved, [self.entities["/zone/collection/data_object_1"]])
+
+    def test_get_by_metadata_with_multiple_criteria(self):
+        retrieved = self.mirror.get_by_metadata([SearchCriterion("size", "10", ComparisonOperator.GREATER_THAN),
+                                                 SearchCriterion("size", "30", ComparisonOperator.LESS_THAN)])
+        self.assertEqual([entity.path for entity in retrieved], ["/zone/collection/data_object_2"])
+
+    def test_get_by_metadata_of_entity_type(self):
+        criterion = SearchCriterion("type", "b", ComparisonOperator.LESS_THAN)
+        self.assertEqual(len(self.mirror.get_by_metadata(criterion)), 1)
+        self.assertEqual(self.mirror.get_by_metadata(criterion, entity_type=Collection), [])
+        self.assertEqual(len(self.mirror.get_by_metadata(criterion, entity_type=DataObject)), 1)
+
+    def test_get_by_metadata_with_unsupported_operator(self):
+        self.assertRaises(ValueError, self.mirror.get_by_metadata,
+                          SearchCriterion("size", "10", ComparisonOperator.CONTAINS))
+
+    def test_refresh_when_unchanged(self):
+        self.assertEqual(self.mirror.refresh(), MirrorChanges())
+        self.connection.data_object.metadata.get_all.assert_not_called()
+
+    def test_refresh_when_not_mirrored(self):
+        self.assertRaises(ValueError, self.mirror.refresh, "/zone_other")
+
+    def test_refresh(self):
+        self.entities["/zone/collection/data_object_4"] = _create_data_object(
+            "/zone/collection/data_object_4", IrodsMetadata({"size": {"40"}}))
+        self.entities["/zone/collection/data_object_1"] = _create_data_object(
+            "/zone/collection/data_object_1", IrodsMetadata({"size": {"11"}}), last_modified=datetime(2016, 2, 1))
+        del self.entities["/zone/data_object_3"]
+
+        changes = self.mirror.refresh()
+        self.assertEqual(changes, MirrorChanges(added=["/zone/collection/data_object_4"],
+                                                modified=["/zone/collection/data_object_1"],
+                                                removed=["/zone/data_object_3"]))
+        self.connection.data_object.metadata.get_all.assert_called_once_with(
+            ["/zone/collection/data_object_4", "/zone/collection/data_object_1"])
+        self.assertEqual(self.mirror.get_by_path("/zone/collection/data_object_1"),
+                         self.entities["/zone/collection/data_object_1"])
+        self.assertRaises(FileNotFoundError, self.mirror.get_by_path, "/zone/data_object_3")
+        self.assertEqual(len(self.mirror.get_by_metadata(SearchCriterion("size", "40", ComparisonOperator.EQUALS))),
+                         1)
+
+    def test_build_replaces_existing_mirror(self):
+        del self.entities["/zone/collection/data_object_2"]
+        self.entities["/zone/collection"].metadata = IrodsMetadata({"type": {"changed"}})
+        self.mirror.build("/zone")
+        self.assertRaises(FileNotFoundError, self.mirror.get_by_path, "/zone/collection/data_object_2")
+        self.assertEqual(self.mirror.get_by_path("/zone/collection").metadata, IrodsMetadata({"type": {"changed"}}))
+        self.assertEqual(self.mirror.get_mirrored_collection_paths(), ["/zone"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,17 @@
 import copy
 import unittest
+from datetime import datetime, timezone
 
-from baton.collections import DataObjectReplicaCollection, IrodsMetadata
-from baton.models import DataObjectReplica
+from baton.collections import DataObjectReplicaCollection, IrodsMetadata, IrodsEntityColumns, IrodsMetadataIndex, \
+    ExistenceBitmap
+from baton.models import DataObjectReplica, DataObject, Collection, SearchCriterion
+from hgicommon.enums import ComparisonOperator
+
+try:
+    import numpy
+    _NUMPY_INSTALLED = True
+except ImportError:
+    _NUMPY_INSTALLED = False
 
 
 class TestIrodsMetadata(unittest.TestCase):
@@ -105,5 +114,222 @@ class TestDataObjectReplicaCollection(unittest.TestCase):
         self.assertIn(self._replicas[0], self._collection)
 
 
+class TestIrodsEntityColumns(unittest.TestCase):
+    """
+    Tests for `IrodsEntityColumns`.
+    """
+    def setUp(self):
+        self.columns = IrodsEntityColumns()
+
+    def test_append(self):
+        self.columns.append("/collection/data_object", "checksum", ["resource_1", "resource_2"])
+        self.assertEqual(len(self.columns), 1)
+        self.assertEqual(self.columns.path, ["/collection/data_object"])
+        self.assertEqual(self.columns.collection, ["/collection"])
+        self.assertEqual(self.columns.checksum, ["checksum"])
+        self.assertEqual(list(self.columns.replica_count), [2])
+        self.assertEqual(self.columns.resource_names, [("resource_1", "resource_2")])
+
+    def test_append_with_timestamps(self):
+        self.columns.append("/collection", created=datetime(1970, 1, 1, 0, 0, 1),
+                            last_modified=datetime(1970, 1, 1, 0, 0, 2, 3, tzinfo=timezone.utc))
+        self.columns.append("/other_collection")
+        self.assertEqual(list(self.columns.created), [1000000, IrodsEntityColumns.NO_TIMESTAMP])
+        self.assertEqual(list(self.columns.last_modified), [2000003, IrodsEntityColumns.NO_TIMESTAMP])
+
+    def test_append_with_metadata(self):
+        self.columns.append("/collection_1")
+        self.columns.append("/collection_2", metadata={"attribute_1": {"value_1"}, "attribute_2": {"b", "a"}})
+        self.columns.append("/collection_3", metadata={"attribute_1": {"value_2"}})
+        self.assertEqual(self.columns.metadata, {
+            "attribute_1": [None, "value_1", "value_2"],
+            "attribute_2": [None, ("a", "b"), None]
+        })
+
+    def test_append_with_metadata_columns(self):
+        columns = IrodsEntityColumns(["attribute_1", "attribute_3"])
+        columns.append("/collection", metadata={"attribute_1": {"value_1"}, "attribute_2": {"value_2"}})
+        self.assertEqual(columns.metadata, {"attribute_1": ["value_1"], "attribute_3": [None]})
+
+    def test_get_columns(self):
+        self.columns.append("/collection", metadata={"attribute": {"value"}})
+        columns = self.columns.get_columns()
+        self.assertEqual(list(columns.keys()), ["path", "collection", "checksum", "replica_count", "resource_names",
+                                                "created", "last_modified", "metadata:attribute"])
+        self.assertEqual(columns["metadata:attribute"], ["value"])
+
+
+class TestIrodsMetadataIndex(unittest.TestCase):
+    """
+    Tests for `IrodsMetadataIndex`.
+    """
+    def setUp(self):
+        self.entities = [
+            Collection("/collection", metadata=IrodsMetadata({"type": {"collection"}})),
+            DataObject("/collection/data_object_1", metadata=IrodsMetadata({"size": {"10"}, "type": {"a", "b"}})),
+            DataObject("/collection/data_object_2", metadata=IrodsMetadata({"size": {"20"}, "type": {"a"}})),
+            DataObject("/collection/data_object_3", metadata=IrodsMetadata({"size": {"30"}}))]
+        self.index = IrodsMetadataIndex(self.entities)
+
+    def test_add_when_metadata_not_loaded(self):
+        self.assertRaises(ValueError, self.index.add, DataObject("/collection/data_object_4"))
+
+    def test_add_replaces_entity_with_same_path(self):
+        self.index.add(DataObject("/collection/data_object_1", metadata=IrodsMetadata({"size": {"11"}})))
+        self.assertEqual(len(self.index), 4)
+        self.assertEqual(self.index.get_paths_by_metadata(SearchCriterion("size", "10", ComparisonOperator.EQUALS)),
+                         set())
+        self.assertEqual(self.index.get_paths_by_metadata(SearchCriterion("type", "b", ComparisonOperator.EQUALS)),
+                         set())
+        self.assertEqual(self.index.get_paths_by_metadata(SearchCriterion("size", "11", ComparisonOperator.EQUALS)),
+                         {"/collection/data_object_1"})
+
+    def test_remove(self):
+        self.index.remove(["/collection/data_object_1", "/collection/data_object_2"])
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual(
+            self.index.get_paths_by_metadata(SearchCriterion("size", "0", ComparisonOperator.GREATER_THAN)),
+            {"/collection/data_object_3"})
+
+    def test_remove_when_not_indexed(self):
+        self.assertRaises(ValueError, self.index.remove, "/other")
+
+    def test_get_paths_by_metadata_with_equality(self):
+        self.assertEqual(self.index.get_paths_by_metadata(SearchCriterion("type", "a", ComparisonOperator.EQUALS)),
+                         {"/collection/data_object_1", "/collection/data_object_2"})
+        self.assertEqual(self.index.get_paths_by_metadata(SearchCriterion("other", "a", ComparisonOperator.EQUALS)),
+                         set())
+
+    def test_get_paths_by_metadata_with_range(self):
+        self.assertEqual(self.index.get_paths_by_metadata(SearchCriterion("size", "20", ComparisonOperator.LESS_THAN)),
+                         {"/collection/data_object_1"})
+        self.assertEqual(self.index.get_paths_by_metadata(
+            SearchCriterion("size", "20", ComparisonOperator.GREATER_THAN)), {"/collection/data_object_3"})
+
+    def test_get_paths_by_metadata_compares_as_text(self):
+        self.assertEqual(self.index.get_paths_by_metadata(SearchCriterion("size", "3", ComparisonOperator.LESS_THAN)),
+                         {"/collection/data_object_1", "/collection/data_object_2"})
+
+    def test_get_paths_by_metadata_with_many_criteria_on_same_attribute(self):
+        self.assertEqual(self.index.get_paths_by_metadata([
+            SearchCriterion("size", "10", ComparisonOperator.GREATER_THAN),
+            SearchCriterion("size", "30", ComparisonOperator.LESS_THAN)]), {"/collection/data_object_2"})
+        self.assertEqual(self.index.get_paths_by_metadata([
+            SearchCriterion("type", "a", ComparisonOperator.EQUALS),
+            SearchCriterion("type", "b", ComparisonOperator.EQUALS)]), {"/collection/data_object_1"})
+
+    def test_get_paths_by_metadata_with_range_straddled_by_values(self):
+        # Neither "a" nor "z" is between "m" and "n", although one is below and the other above
+        self.index.add(DataObject("/z/a", metadata=IrodsMetadata({"x": {"a", "z"}})))
+        range_criteria = [SearchCriterion("x", "m", ComparisonOperator.GREATER_THAN),
+                          SearchCriterion("x", "n", ComparisonOperator.LESS_THAN)]
+        self.assertEqual(self.index.get_paths_by_metadata(range_criteria), set())
+        self.assertEqual(self.index.get_paths_by_metadata(
+            range_criteria + [SearchCriterion("x", "a", ComparisonOperator.EQUALS)]), set())
+        self.index.add(DataObject("/z/b", metadata=IrodsMetadata({"x": {"a", "mm"}})))
+        self.assertEqual(self.index.get_paths_by_metadata(range_criteria), {"/z/b"})
+        self.assertEqual(self.index.get_paths_by_metadata(
+            range_criteria + [SearchCriterion("x", "a", ComparisonOperator.EQUALS)]), {"/z/b"})
+
+    def test_get_paths_by_metadata_with_equality_and_range_criteria(self):
+        self.assertEqual(self.index.get_paths_by_metadata([
+            SearchCriterion("size", "15", ComparisonOperator.GREATER_THAN),
+            SearchCriterion("type", "a", ComparisonOperator.EQUALS)]), {"/collection/data_object_2"})
+
+    def test_get_paths_by_metadata_with_unsupported_operator(self):
+        self.assertRaises(ValueError, self.index.get_paths_by_metadata,
+                          SearchCriterion("size", "10", ComparisonOperator.CONTAINS))
+
+    def test_get_paths_by_metadata_without_criteria(self):
+        self.assertRaises(ValueError, self.index.get_paths_by_metadata, [])
+
+    def test_get_by_metadata(self):
+        criterion = SearchCriterion("type", "0", ComparisonOperator.GREATER_THAN)
+        self.assertEqual(self.index.get_by_metadata(criterion), [self.entities[0], self.entities[1], self.entities[2]])
+        self.assertEqual(self.index.get_by_metadata(criterion, entity_type=Collection), [self.entities[0]])
+
+    def test_get_by_metadata_when_entities_not_kept(self):
+        index = IrodsMetadataIndex(self.entities, store_entities=False)
+        self.assertRaises(ValueError, index.get_by_metadata, SearchCriterion("size", "10", ComparisonOperator.EQUALS))
+
+
+
+class TestExistenceBitmap(unittest.TestCase):
+    """
+    Tests for `ExistenceBitmap`.
+    """
+    def setUp(self):
+        self.exists = [i % 3 == 0 for i in range(20)]
+        self.existence = ExistenceBitmap(self.exists)
+
+    def test_len(self):
+        self.assertEqual(len(self.existence), 20)
+        self.assertEqual(len(ExistenceBitmap()), 0)
+
+    def test_getitem(self):
+        self.assertEqual(list(self.existence), self.exists)
+        self.assertTrue(self.existence[-2])
+        self.assertEqual(self.existence[2:10:3], self.exists[2:10:3])
+
+    def test_getitem_when_out_of_range(self):
+        self.assertRaises(IndexError, self.existence.__getitem__, 20)
+        self.assertRaises(IndexError, self.existence.__getitem__, -21)
+
+    def test_append(self):
+        self.existence.append(True)
+        self.assertEqual(len(self.existence), 21)
+        self.assertTrue(self.existence[20])
+
+    def test_count_existing(self):
+        self.assertEqual(self.existence.count_existing(), 7)
+
+    def test_is_compact(self):
+        self.assertEqual(len(self.existence._bits), 3)
+
+    def test_equality(self):
+        self.assertEqual(self.existence, ExistenceBitmap(self.exists))
+        self.assertNotEqual(self.existence, ExistenceBitmap(self.exists[:-1]))
+
+
+@unittest.skipIf(not _NUMPY_INSTALLED, "NumPy is not installed")
+class TestIrodsEntityColumnsWithNumPy(unittest.TestCase):
+    """
+    Tests for the conversion of `IrodsEntityColumns` to NumPy arrays.
+    """
+    def setUp(self):
+        self.columns = IrodsEntityColumns()
+        self.columns.append("/collection/data_object", "checksum", ["resource_1", "resource_2"],
+                            created=datetime(2016, 2, 9, 15, 22, 52), metadata={"attribute": {"value_1", "value_2"}})
+        self.columns.append("/collection")
+
+    def test_to_numpy_columns(self):
+        numpy_columns = self.columns.to_numpy_columns()
+        self.assertEqual(list(numpy_columns["replica_count"]), [2, 0])
+        self.assertEqual(numpy_columns["created"][0], numpy.datetime64("2016-02-09T15:22:52", "us"))
+        self.assertTrue(numpy.isnat(numpy_columns["created"][1]))
+        self.assertEqual(numpy_columns["metadata:attribute"][0], ("value_1", "value_2"))
+
+    def test_to_numpy_columns_does_not_copy_numeric_columns(self):
+        numpy_columns = self.columns.to_numpy_columns()
+        self.columns.replica_count[0] = 5
+        self.assertEqual(numpy_columns["replica_count"][0], 5)
+
+    def test_to_numpy(self):
+        structured_array = self.columns.to_numpy()
+        self.assertEqual(len(structured_array), 2)
+        self.assertEqual(structured_array["path"][1], "/collection")
+        self.assertEqual(list(structured_array["replica_count"]), [2, 0])
+
+    def test_to_numpy_has_field_for_each_column(self):
+        structured_array = self.columns.to_numpy()
+        numpy_columns = self.columns.to_numpy_columns()
+        self.assertEqual(list(structured_array.dtype.names), list(numpy_columns.keys()))
+        self.assertEqual(structured_array["created"][0], numpy.datetime64("2016-02-09T15:22:52", "us"))
+        self.assertEqual(structured_array["metadata:attribute"][0], ("value_1", "value_2"))
+
+    def test_to_numpy_when_empty(self):
+        self.assertEqual(len(IrodsEntityColumns().to_numpy()), 0)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,7 +1,10 @@
 import copy
 import unittest
 
-from baton.models import DataObject, SpecificQuery, Collection, AccessControl, User
+from hgicommon.models import Model
+
+from baton.collections import IrodsMetadata
+from baton.models import DataObject, SpecificQuery, Collection, AccessControl, User, DataObjectReplica
 from baton.tests._stubs import StubIrodsEntity
 
 _COLLECTION = "/collection/sub_collection"
@@ -46,6 +49,41 @@ class TestIrodsEntity(unittest.TestCase):
         self.entity.access_controls = []
         self.assertEqual(self.entity.access_controls, set())
 
+    def test_load_lazily(self):
+        entity = StubIrodsEntity(self.path)
+        entity._load_lazily(lambda: {"access_controls": self.access_controls})
+        self.assertEqual(entity.access_controls, self.access_controls)
+        self.assertIsNone(entity.metadata)
+
+    def test_load_lazily_only_loads_once(self):
+        loads = []
+        entity = StubIrodsEntity(self.path)
+        entity._load_lazily(lambda: loads.append(True) or {"access_controls": self.access_controls})
+        self.assertEqual(entity.access_controls, self.access_controls)
+        self.assertEqual(entity.access_controls, self.access_controls)
+        self.assertEqual(len(loads), 1)
+
+    def test_set_when_loading_lazily(self):
+        entity = StubIrodsEntity(self.path)
+        entity._load_lazily(lambda: {"access_controls": self.access_controls})
+        entity.access_controls = set()
+        self.assertEqual(entity.access_controls, set())
+
+    def test_equality_when_loading_lazily(self):
+        entity = StubIrodsEntity(self.path)
+        entity._load_lazily(lambda: {"access_controls": self.access_controls})
+        self.assertEqual(entity, self.entity)
+        self.assertEqual(self.entity, entity)
+        self.assertEqual(hash(entity), hash(self.entity))
+
+    def test_hash_when_loading_lazily(self):
+        entity = StubIrodsEntity(self.path)
+        entity._load_lazily(lambda: {"access_controls": self.access_controls})
+        entities = {entity}
+        self.assertEqual(entity.access_controls, self.access_controls)
+        self.assertIn(entity, entities)
+        self.assertIn(self.entity, entities)
+
 
 class TestDataObject(unittest.TestCase):
     """
@@ -161,5 +199,54 @@ class TestUser(unittest.TestCase):
         self.assertNotEqual(hash(user_1), hash(user_2))
 
 
+class TestCompactModels(unittest.TestCase):
+    """
+    Tests for the models that store their properties in slots.
+    """
+    def setUp(self):
+        self.models = [
+            User(_NAME, _ZONE),
+            AccessControl(User(_NAME, _ZONE), AccessControl.Level.READ),
+            DataObjectReplica(1, _CHECKSUMS[0]),
+            DataObject("%s/%s" % (_COLLECTION, _FILE_NAME)),
+            Collection(_COLLECTION)
+        ]
+
+    def test_no_instance_dict(self):
+        for model in self.models:
+            self.assertFalse(hasattr(model, "__dict__"))
+
+    def test_is_model(self):
+        for model in self.models:
+            self.assertIsInstance(model, Model)
+
+    def test_equality(self):
+        for model in self.models:
+            self.assertEqual(copy.deepcopy(model), model)
+
+    def test_not_equal_when_different_property(self):
+        data_object_1 = DataObject("%s/%s" % (_COLLECTION, _FILE_NAME))
+        data_object_2 = DataObject("%s/%s" % (_COLLECTION, _FILE_NAME), metadata=IrodsMetadata())
+        self.assertNotEqual(data_object_1, data_object_2)
+
+    def test_equality_of_subclass_instance_properties(self):
+        entity_1 = StubIrodsEntity(_COLLECTION)
+        entity_1.extra = 1
+        entity_2 = StubIrodsEntity(_COLLECTION)
+        entity_2.extra = 2
+        self.assertNotEqual(entity_1, entity_2)
+        entity_2.extra = 1
+        self.assertEqual(entity_1, entity_2)
+
+    def test_str(self):
+        access_control = AccessControl(User(_NAME, _ZONE), AccessControl.Level.READ)
+        self.assertEqual(str(access_control), "{ level: %s, user: %s#%s }" % (AccessControl.Level.READ, _NAME, _ZONE))
+
+    def test_str_only_includes_public_properties(self):
+        data_object = DataObject("%s/%s" % (_COLLECTION, _FILE_NAME))
+        self.assertEqual(str(data_object), "{ access_controls: None, metadata: None, path: %s/%s, replicas: None }"
+                         % (_COLLECTION, _FILE_NAME))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,85 @@
+"""
+Measures the memory used per entity model when holding many decoded data objects, collections and their properties.
+
+Usage: python benchmarks/entity_memory.py [number_of_entities]
+"""
+import gc
+import sys
+import tracemalloc
+from copy import deepcopy
+from typing import Callable, List, Any
+
+from baton._baton.json import data_object_from_baton_json, collection_from_baton_json
+from baton.models import DataObject, Collection, AccessControl, User, DataObjectReplica
+
+_DEFAULT_NUMBER_OF_ENTITIES = 100000
+
+_DATA_OBJECT_AS_JSON = {
+    "collection": "/zone/collection",
+    "data_object": "data_object_name",
+    "access": [
+        {"owner": "rodsadmin", "zone": "zone", "level": "own"},
+        {"owner": "group_1", "zone": "zone", "level": "read"}
+    ],
+    "avus": [
+        {"attribute": "study", "value": "study_1"},
+        {"attribute": "sample", "value": "sample_1"}
+    ],
+    "replicates": [
+        {"number": 0, "checksum": "2c558824f250de9d55c07600291f4272", "location": "host_1", "resource": "resource_1",
+         "valid": True},
+        {"number": 1, "checksum": "2c558824f250de9d55c07600291f4272", "location": "host_2", "resource": "resource_2",
+         "valid": True}
+    ],
+    "timestamps": [
+        {"created": "2016-02-09T15:22:52", "replicates": 0},
+        {"modified": "2016-02-09T15:22:52", "replicates": 0},
+        {"created": "2016-02-09T15:22:53", "replicates": 1},
+        {"modified": "2016-02-09T15:22:53", "replicates": 1}
+    ]
+}
+
+
+def measure_bytes_per_item(number_of_items: int, create_items: Callable[[int], List[Any]]) -> float:
+    """
+    Measures the number of bytes allocated, and still held, per item created by the given function.
+    :param number_of_items: the number of items to create
+    :param create_items: function that creates the given number of items
+    :return: mean number of bytes per item
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        items = create_items(number_of_items)
+        gc.collect()
+        allocated, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert len(items) == number_of_items
+    return allocated / number_of_items
+
+
+def main(number_of_entities: int):
+    data_objects_as_json = [deepcopy(_DATA_OBJECT_AS_JSON) for _ in range(number_of_entities)]
+    for i, data_object_as_json in enumerate(data_objects_as_json):
+        data_object_as_json["data_object"] = "data_object_%d" % i
+    paths = ["/zone/collection/data_object_%d" % i for i in range(number_of_entities)]
+    user = User("rodsadmin", "zone")
+
+    benchmarks = [
+        ("User", lambda n: [User("rodsadmin", "zone") for _ in range(n)]),
+        ("AccessControl", lambda n: [AccessControl(user, AccessControl.Level.OWN) for _ in range(n)]),
+        ("DataObjectReplica", lambda n: [DataObjectReplica(0, "checksum", "host", "resource", True) for _ in range(n)]),
+        ("DataObject (path only)", lambda n: [DataObject(path) for path in paths[:n]]),
+        ("Collection (path only)", lambda n: [Collection(path) for path in paths[:n]]),
+        ("DataObject (decoded)", lambda n: [data_object_from_baton_json(data_object_as_json)
+                                            for data_object_as_json in data_objects_as_json[:n]]),
+        ("Collection (decoded)", lambda n: [collection_from_baton_json(data_object_as_json)
+                                            for data_object_as_json in data_objects_as_json[:n]])
+    ]
+    for name, create_items in benchmarks:
+        print("%s: %.0f bytes" % (name, measure_bytes_per_item(number_of_entities, create_items)))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else _DEFAULT_NUMBER_OF_ENTITIES)